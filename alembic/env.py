@@ -18,6 +18,7 @@ if config.config_file_name is not None:
 
 # ---- Importar tu metadata (Base) ----
 from app.config.database import Base
+from app.config.settings import settings
 
 # Esto permite autogenerate detectar tus modelos
 target_metadata = Base.metadata
@@ -51,9 +52,19 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # el DDL que espera un bloqueo exclusivo encola detras a todas las consultas de la app:
+            # mejor fallar rapido (app.infrastructure.online_migrations.run_ddl reintenta)
+            connection.exec_driver_sql(f"SET lock_timeout = '{settings.MIGRATION_LOCK_TIMEOUT}'")
+            connection.exec_driver_sql("SET statement_timeout = 0")
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            # cada revision en su propia transaccion: los bloques autocommit (CONCURRENTLY,
+            # backfills por lotes) no confirman a medias una revision anterior
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
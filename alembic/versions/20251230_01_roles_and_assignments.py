@@ -1 +1,37 @@
+"""roles and module assignments
 
+Revision ID: 20251230_01
+Revises: 20251217_01
+Create Date: 2025-12-30
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251230_01"
+down_revision = "20251217_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("modules", sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id"), nullable=True))
+
+    op.create_table(
+        "module_assignments",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("module_id", sa.Integer, sa.ForeignKey("modules.id"), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("assigned_by", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("assigned_at", sa.DateTime, server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.UniqueConstraint("user_id", "module_id", name="uq_user_module"),
+    )
+
+    # roles superadmin/leader y permisos training.*: python -m app.infrastructure.seed
+
+
+def downgrade() -> None:
+    op.drop_table("module_assignments")
+    op.drop_column("modules", "owner_id")
@@ -0,0 +1,38 @@
+"""hot path indexes
+
+Revision ID: 20261018_01
+Revises: 20251230_01
+Create Date: 2026-10-18
+"""
+
+from app.infrastructure.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_01"
+down_revision = "20251230_01"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_user_lesson_progress_user_completed", "user_lesson_progress", ["user_id", "completed"]),
+    ("ix_quiz_attempts_module_user_created", "quiz_attempts", ["module_id", "user_id", "created_at"]),
+    ("ix_module_assignments_user_id", "module_assignments", ["user_id"]),
+    ("ix_module_assignments_module_assigned_by", "module_assignments", ["module_id", "assigned_by"]),
+    ("ix_quiz_questions_module_order", "quiz_questions", ["module_id", "display_order"]),
+    ("ix_quiz_options_question_id", "quiz_options", ["question_id"]),
+    ("ix_checklist_items_section_id", "checklist_items", ["section_id"]),
+    ("ix_refresh_tokens_token", "refresh_tokens", ["token"]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY fuera de la transaccion: las tablas siguen escribibles durante la construccion
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        drop_index_concurrently(name, table)
@@ -0,0 +1,32 @@
+"""purge indexes
+
+Revision ID: 20261018_02
+Revises: 20261018_01
+Create Date: 2026-10-18
+"""
+
+from app.infrastructure.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_02"
+down_revision = "20261018_01"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_two_factor_codes_expires_at", "two_factor_codes", ["expires_at"]),
+    ("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"]),
+]
+
+
+def upgrade() -> None:
+    # expires_at: cada lote de las purgas del scheduler es un recorrido de indice
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        drop_index_concurrently(name, table)
@@ -0,0 +1,59 @@
+"""activity events
+
+Revision ID: 20261018_03
+Revises: 20261018_02
+Create Date: 2026-10-18
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_03"
+down_revision = "20261018_02"
+branch_labels = None
+depends_on = None
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    # PostgreSQL: particiones mensuales por occurred_at; las siguientes las crea el job activity_partitions
+    op.create_table(
+        "activity_events",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), sa.Identity(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("event_type", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("module_id", sa.Integer(), nullable=True),
+        sa.Column("lesson_id", sa.Integer(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id", "occurred_at"),
+        postgresql_partition_by="RANGE (occurred_at)",
+    )
+    # tabla nueva y vacia: no hace falta CONCURRENTLY (tampoco se admite en la tabla particionada)
+    op.create_index("ix_activity_events_user_occurred", "activity_events", ["user_id", "occurred_at"])
+    op.create_index("ix_activity_events_module_occurred", "activity_events", ["module_id", "occurred_at"])
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    current = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(2):
+        start = _add_months(current, offset)
+        op.execute(
+            f"CREATE TABLE activity_events_{start:%Y%m} PARTITION OF activity_events "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{_add_months(start, 1):%Y-%m-%d}')"
+        )
+    op.execute("CREATE TABLE activity_events_default PARTITION OF activity_events DEFAULT")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_activity_events_module_occurred", table_name="activity_events")
+    op.drop_index("ix_activity_events_user_occurred", table_name="activity_events")
+    op.drop_table("activity_events")
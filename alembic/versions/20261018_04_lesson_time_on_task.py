@@ -0,0 +1,37 @@
+"""lesson time on task
+
+Revision ID: 20261018_04
+Revises: 20261018_03
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_04"
+down_revision = "20261018_03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # totales por (usuario, leccion) del agregador de heartbeats (training_heartbeats)
+    op.create_table(
+        "lesson_time_on_task",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), nullable=False),
+        sa.Column("seconds", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("heartbeats", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_seen_at", sa.DateTime(), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("user_id", "lesson_id", name="uq_time_on_task_user_lesson"),
+    )
+    op.create_index("ix_lesson_time_on_task_lesson_id", "lesson_time_on_task", ["lesson_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_time_on_task_lesson_id", table_name="lesson_time_on_task")
+    op.drop_table("lesson_time_on_task")
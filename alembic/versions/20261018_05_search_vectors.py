@@ -0,0 +1,47 @@
+"""search vectors
+
+Revision ID: 20261018_05
+Revises: 20261018_04
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+from app.infrastructure.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_05"
+down_revision = "20261018_04"
+branch_labels = None
+depends_on = None
+
+
+# copia de app.modules.models.SEARCH_VECTORS al momento de esta revision
+SEARCH_VECTORS = {
+    "modules": (
+        "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(description, '')), 'B')"
+    ),
+    "lessons": "setweight(to_tsvector('spanish', coalesce(title, '')), 'A')",
+    "quiz_questions": "setweight(to_tsvector('spanish', coalesce(prompt, '')), 'B')",
+    "checklist_items": "setweight(to_tsvector('spanish', coalesce(text, '')), 'B')",
+}
+
+
+def upgrade() -> None:
+    # la columna generada reescribe la tabla con bloqueo exclusivo: tablas de catalogo, pocas filas
+    for table, expression in SEARCH_VECTORS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+    for table in SEARCH_VECTORS:
+        create_index_concurrently(f"ix_{table}_search_vector", table, ["search_vector"], using="gin")
+
+
+def downgrade() -> None:
+    for table in reversed(list(SEARCH_VECTORS)):
+        drop_index_concurrently(f"ix_{table}_search_vector", table)
+    for table in reversed(list(SEARCH_VECTORS)):
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,29 @@
+"""rate limit buckets
+
+Revision ID: 20261018_06
+Revises: 20261018_05
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_06"
+down_revision = "20261018_05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # RATE_LIMIT_BACKEND=postgres; el scheduler purga las filas ya recargadas
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("tat", sa.Float(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,119 @@
+"""quiz attempt partitions and summaries
+
+Revision ID: 20261018_07
+Revises: 20261018_06
+Create Date: 2026-10-18
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.infrastructure import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_07"
+down_revision = "20261018_06"
+branch_labels = None
+depends_on = None
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _attempt_columns() -> list:
+    return [
+        # la secuencia de la tabla original sigue numerando los intentos
+        sa.Column("id", sa.Integer, server_default=sa.text("nextval('quiz_attempts_id_seq')"), nullable=False),
+        sa.Column("user_id", sa.Integer, nullable=False),
+        sa.Column("module_id", sa.Integer, nullable=False),
+        sa.Column("score", sa.Integer, nullable=False),
+        sa.Column("correct_answers", sa.Integer, nullable=False),
+        sa.Column("total_questions", sa.Integer, nullable=False),
+        sa.Column("passed", sa.Boolean, nullable=False, server_default=sa.text("false")),
+        sa.Column("created_at", sa.DateTime, server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="quiz_attempts_user_id_fkey"),
+        sa.ForeignKeyConstraint(["module_id"], ["modules.id"], name="quiz_attempts_module_id_fkey"),
+    ]
+
+
+def _create_summaries() -> None:
+    op.create_table(
+        "quiz_attempt_summaries",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("module_id", sa.Integer, sa.ForeignKey("modules.id"), nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("best_score", sa.Integer, nullable=False),
+        sa.Column("first_passed_at", sa.DateTime, nullable=True),
+        sa.Column("first_pass_score", sa.Integer, nullable=True),
+        sa.Column("last_score", sa.Integer, nullable=False),
+        sa.Column("last_attempt_at", sa.DateTime, nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "module_id"),
+    )
+
+
+def upgrade() -> None:
+    # SQLite (sustituto local) se queda con la tabla sin particionar
+    if op.get_bind().dialect.name != "postgresql":
+        _create_summaries()
+        return
+
+    # sin copiar filas: la tabla actual se adjunta entera como particion quiz_attempts_legacy hasta el
+    # mes +2. El CHECK validado y el indice unico (id, created_at) se construyen antes sin bloquear
+    # escrituras, asi el ATTACH no recorre la tabla. El job quiz_attempts_archive resume y borra por
+    # lotes las filas de legacy a medida que pasan el corte de QUIZ_ATTEMPTS_HOT_MONTHS
+    bound = _add_months(datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0), 2)
+    check = "ck_quiz_attempts_legacy_range"
+    online.add_constraint_not_valid("quiz_attempts", check, f"CHECK (created_at < '{bound:%Y-%m-%d}')")
+    online.validate_constraint("quiz_attempts", check)
+    online.create_index_concurrently("quiz_attempts_legacy_pkey", "quiz_attempts", ["id", "created_at"], unique=True)
+
+    # cambio de tabla: solo renombres y catalogo, dentro de la transaccion de la revision (los pasos
+    # anteriores confirman por su cuenta y se pueden repetir). La PK (id, created_at) de la particion
+    # reutiliza el indice ya construido
+    _create_summaries()
+    op.rename_table("quiz_attempts", "quiz_attempts_legacy")
+    op.execute(
+        "ALTER TABLE quiz_attempts_legacy DROP CONSTRAINT quiz_attempts_pkey, "
+        "ADD CONSTRAINT quiz_attempts_legacy_pkey PRIMARY KEY USING INDEX quiz_attempts_legacy_pkey"
+    )
+    op.execute("ALTER INDEX ix_quiz_attempts_module_user_created RENAME TO ix_quiz_attempts_legacy_module_user_created")
+    op.create_table(
+        "quiz_attempts",
+        *_attempt_columns(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="quiz_attempts_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_quiz_attempts_module_user_created", "quiz_attempts", ["module_id", "user_id", "created_at"])
+    op.execute("ALTER SEQUENCE quiz_attempts_id_seq OWNED BY quiz_attempts.id")
+    op.execute("ALTER TABLE quiz_attempts_legacy ALTER COLUMN id DROP DEFAULT")
+    op.execute(
+        "ALTER TABLE quiz_attempts ATTACH PARTITION quiz_attempts_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{bound:%Y-%m-%d}')"
+    )
+    op.execute(f"ALTER TABLE quiz_attempts_legacy DROP CONSTRAINT {check}")
+
+    op.execute(
+        f"CREATE TABLE quiz_attempts_{bound:%Y%m} PARTITION OF quiz_attempts "
+        f"FOR VALUES FROM ('{bound:%Y-%m-%d}') TO ('{_add_months(bound, 1):%Y-%m-%d}')"
+    )
+    op.execute("CREATE TABLE quiz_attempts_default PARTITION OF quiz_attempts DEFAULT")
+
+
+def downgrade() -> None:
+    # copia las filas vivas a una tabla sin particionar; lo ya archivado no se restaura
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_table(
+            "quiz_attempts_flat", *_attempt_columns(), sa.PrimaryKeyConstraint("id", name="quiz_attempts_flat_pkey")
+        )
+        op.execute("INSERT INTO quiz_attempts_flat SELECT * FROM quiz_attempts")
+        op.execute("ALTER SEQUENCE quiz_attempts_id_seq OWNED BY quiz_attempts_flat.id")
+        op.drop_table("quiz_attempts")
+        op.rename_table("quiz_attempts_flat", "quiz_attempts")
+        op.execute("ALTER TABLE quiz_attempts RENAME CONSTRAINT quiz_attempts_flat_pkey TO quiz_attempts_pkey")
+        op.create_index("ix_quiz_attempts_module_user_created", "quiz_attempts", ["module_id", "user_id", "created_at"])
+    op.drop_table("quiz_attempt_summaries")
@@ -0,0 +1,24 @@
+"""refresh tokens revoked index
+
+Revision ID: 20261018_08
+Revises: 20261018_07
+Create Date: 2026-10-18
+"""
+
+from app.infrastructure.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "20261018_08"
+down_revision = "20261018_07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # segunda pasada de purge_refresh_tokens (la primera usa ix_refresh_tokens_expires_at)
+    create_index_concurrently("ix_refresh_tokens_revoked", "refresh_tokens", ["id"], where="revoked")
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_refresh_tokens_revoked", "refresh_tokens")
@@ -0,0 +1,29 @@
+"""cache versions
+
+Revision ID: 20261019_09
+Revises: 20261018_08
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_09"
+down_revision = "20261018_08"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # una fila por clave versionada (authz, checklist, quiz:<id>): los ETag coinciden en todos los workers
+    op.create_table(
+        "cache_versions",
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cache_versions")
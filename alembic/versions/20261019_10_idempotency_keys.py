@@ -0,0 +1,37 @@
+"""idempotency keys
+
+Revision ID: 20261019_10
+Revises: 20261019_09
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_10"
+down_revision = "20261019_09"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # IDEMPOTENCY_BACKEND=database; el scheduler purga las filas vencidas
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("sub", sa.String(64), primary_key=True),
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("fingerprint", sa.String(32), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("body", sa.LargeBinary(), nullable=True),
+        sa.Column("media_type", sa.String(255), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,257 @@
+"""Append-only activity log (audit trail) with batched write-behind."""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.metrics import activity_buffer_events, activity_events_total, registry
+from app.core.partitions import add_months, attached_partitions, current_month, ensure_monthly_partitions
+
+logger = logging.getLogger("sst.activity")
+
+_PENDING_KEY = "sst_activity"
+
+
+class ActivityBuffer:
+    """Bounded FIFO shared by the committing requests and the writer thread."""
+
+    def __init__(self, capacity: int, batch_size: int):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self._events: deque = deque()
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, item: dict, timeout: float) -> bool:
+        with self._cond:
+            if len(self._events) >= self.capacity:
+                self._cond.notify_all()
+                deadline = time.monotonic() + timeout
+                while len(self._events) >= self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            self._events.append(item)
+            if len(self._events) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def take(self, timeout: float) -> List[dict]:
+        """Up to batch_size events; waits at most `timeout` for a full batch."""
+        with self._cond:
+            if len(self._events) < self.batch_size:
+                self._cond.wait(timeout)
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            if batch:
+                self._cond.notify_all()  # hay espacio para los que esperaban
+            return batch
+
+    def requeue(self, batch: List[dict]) -> None:
+        with self._cond:
+            self._events.extendleft(reversed(batch))
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+
+class ActivityWriter:
+    def __init__(self, buffer: ActivityBuffer, flush_seconds: float):
+        self.buffer = buffer
+        self.flush_seconds = flush_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sst-activity", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self.buffer.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        # lo que quede en el buffer se escribe aqui mismo; si la base no responde se descarta
+        while True:
+            batch = self.buffer.take(0)
+            if not batch:
+                return
+            try:
+                write_batch(batch)
+            except Exception as exc:
+                dropped = len(batch) + len(self.buffer)
+                while self.buffer.take(0):
+                    pass
+                logger.error("No se pudieron escribir %s eventos al apagar: %s", dropped, exc)
+                activity_events_total.inc(dropped, result="dropped")
+                return
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            batch = self.buffer.take(self.flush_seconds)
+            while batch and not self._stop.is_set():
+                try:
+                    write_batch(batch)
+                    batch = []
+                    backoff = 0.5
+                except Exception as exc:
+                    # se reintenta el mismo lote; mientras tanto el buffer se llena y aplica back-pressure
+                    logger.warning("Escritura de actividad fallo (%s eventos): %s", len(batch), exc)
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 10.0)
+            if batch:
+                # apagando con la base caida: stop() reintenta con lo que siga en el buffer
+                self.buffer.requeue(batch)
+
+
+def write_batch(batch: List[dict]) -> None:
+    from app.config.database import get_engine
+    from app.modules.models import ActivityEvent
+
+    table = ActivityEvent.__table__
+    engine = get_engine()
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            # SQLite (sustituto local) no genera ids en una PK compuesta: MAX(id) + n dentro del mismo
+            # INSERT, que ya tiene el bloqueo de escritura; otro proceso sobre el mismo archivo no repite ids
+            last_id = select(func.coalesce(func.max(table.c.id), 0)).scalar_subquery()
+            rows = [{**item, "id": last_id + offset} for offset, item in enumerate(batch, 1)]
+            connection.execute(insert(table).values(rows))
+        else:
+            connection.execute(insert(table), batch)
+    activity_events_total.inc(len(batch), result="written")
+
+
+_buffer: ActivityBuffer | None = None
+_writer: ActivityWriter | None = None
+_lock = threading.Lock()
+
+
+def _get_writer() -> ActivityWriter:
+    global _buffer, _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _buffer = ActivityBuffer(settings.ACTIVITY_BUFFER_SIZE, settings.ACTIVITY_BATCH_SIZE)
+                _writer = ActivityWriter(_buffer, settings.ACTIVITY_FLUSH_SECONDS)
+                _writer.start()
+    return _writer
+
+
+def start_activity() -> None:
+    if settings.ACTIVITY_ENABLED:
+        _get_writer()
+
+
+def stop_activity() -> None:
+    if _writer is not None:
+        _writer.stop()
+
+
+def log_event(
+    db: Session,
+    event_type: str,
+    user_id: int | None,
+    module_id: int | None = None,
+    lesson_id: int | None = None,
+    **data,
+) -> None:
+    """Queues an audit event that is written only if `db` commits."""
+    if not settings.ACTIVITY_ENABLED:
+        return
+    db.info.setdefault(_PENDING_KEY, []).append(
+        {
+            "occurred_at": datetime.utcnow(),
+            "event_type": event_type,
+            "user_id": user_id,
+            "module_id": module_id,
+            "lesson_id": lesson_id,
+            "data": data or None,
+        }
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_after_commit(session: Session) -> None:
+    events = session.info.pop(_PENDING_KEY, None)
+    if not events:
+        return
+    buffer = _get_writer().buffer
+    # buffer lleno: se espera al escritor hasta ACTIVITY_BACKPRESSURE_SECONDS antes de descartar
+    for item in events:
+        if not buffer.put(item, settings.ACTIVITY_BACKPRESSURE_SECONDS):
+            activity_events_total.inc(result="dropped")
+            logger.error("Buffer de actividad lleno: evento %s descartado", item["event_type"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _collect_buffer() -> None:
+    activity_buffer_events.set(len(_buffer) if _buffer is not None else 0)
+
+
+registry.add_collector(_collect_buffer)
+atexit.register(stop_activity)
+
+if hasattr(os, "register_at_fork"):
+    # el hilo escritor no sobrevive al fork: cada worker arranca el suyo
+    def _reset_after_fork() -> None:
+        global _buffer, _writer
+        _buffer, _writer = None, None
+
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# -------------------------
+# Particiones y retencion
+# -------------------------
+def maintain_partitions(db: Session) -> int:
+    """Creates upcoming monthly partitions and applies retention; returns partitions/rows affected."""
+    cutoff = add_months(current_month(), -settings.ACTIVITY_RETENTION_MONTHS)
+    if db.get_bind().dialect.name != "postgresql":
+        return _delete_older_than(db, cutoff)
+
+    affected = ensure_monthly_partitions(db, "activity_events", settings.ACTIVITY_PARTITIONS_AHEAD)
+    for name, (_, upper) in sorted(attached_partitions(db, "activity_events").items()):
+        if upper is not None and upper <= cutoff:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            logger.info("Particion %s retirada (retencion %s meses)", name, settings.ACTIVITY_RETENTION_MONTHS)
+            affected += 1
+    db.commit()
+    return affected
+
+
+def _delete_older_than(db: Session, cutoff: datetime) -> int:
+    from app.modules.models import ActivityEvent
+
+    deleted = 0
+    batch_size = settings.SCHEDULER_BATCH_SIZE
+    while True:
+        ids = [
+            row_id
+            for (row_id,) in db.query(ActivityEvent.id).filter(ActivityEvent.occurred_at < cutoff).limit(batch_size)
+        ]
+        if not ids:
+            return deleted
+        db.query(ActivityEvent).filter(ActivityEvent.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
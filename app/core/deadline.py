@@ -0,0 +1,99 @@
+"""Per-request time budgets, propagated to the database as statement_timeout."""
+
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.core.exceptions import DeadlineExceeded
+
+QUERY_CANCELED = "57014"  # SQLSTATE de statement_timeout
+
+_deadline: ContextVar["RequestDeadline | None"] = ContextVar("sst_deadline", default=None)
+
+
+@dataclass
+class RequestDeadline:
+    started: float
+    seconds: float | None
+    # "database" (cancelada por statement_timeout) | "application" (no se envio la sentencia)
+    exceeded: str | None = None
+
+    def remaining(self) -> float | None:
+        if self.seconds is None:
+            return None
+        return self.started + self.seconds - time.monotonic()
+
+
+def start_deadline(seconds: float | None) -> tuple[RequestDeadline, Token]:
+    current = RequestDeadline(time.monotonic(), seconds)
+    return current, _deadline.set(current)
+
+
+def stop_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def deadline(seconds: float | None):
+    """Route dependency declaring the time budget of the endpoint (None: no limit), counted from arrival."""
+
+    async def dependency() -> None:
+        current = _deadline.get()
+        if current is not None:
+            current.seconds = seconds
+
+    return dependency
+
+
+def install_deadline_hooks(engine, session_factory) -> None:
+    if event.contains(engine, "before_cursor_execute", _check_deadline):
+        return
+    event.listen(engine, "before_cursor_execute", _check_deadline)
+    if engine.dialect.name == "postgresql":
+        event.listen(session_factory, "after_begin", _set_statement_timeout)
+
+
+def _check_deadline(conn, cursor, statement, parameters, context, executemany):
+    current = _deadline.get()
+    remaining = current.remaining() if current is not None else None
+    if remaining is not None and remaining <= 0:
+        current.exceeded = "application"
+        raise DeadlineExceeded(f"Tiempo limite de {current.seconds:g} s agotado antes de la consulta")
+
+
+def _set_statement_timeout(session, transaction, connection) -> None:
+    current = _deadline.get()
+    remaining = current.remaining() if current is not None else None
+    if remaining is None:
+        return
+    # SET LOCAL dura lo que la transaccion: cada transaccion nueva recibe el tiempo que queda
+    milliseconds = max(1, int(remaining * 1000))
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {milliseconds}",
+        execution_options={"sst_uncounted": True},
+    )
+
+
+def _timeout_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "La solicitud excedio su tiempo limite, intente de nuevo"},
+    )
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    return _timeout_response()
+
+
+async def operational_error_handler(request: Request, exc: OperationalError) -> JSONResponse:
+    orig = exc.orig
+    if (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) != QUERY_CANCELED:
+        raise exc
+    current = _deadline.get()
+    if current is not None and current.exceeded is None:
+        current.exceeded = "database"
+    return _timeout_response()
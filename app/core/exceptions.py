@@ -0,0 +1,10 @@
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request issues more SQL statements than its route allows."""
+
+
+class LazyLoadError(RuntimeError):
+    """Raised in strict mode when a relationship is lazy loaded during a request."""
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when a request tries to reach the database after its time budget ran out."""
@@ -0,0 +1,40 @@
+"""Readiness probe: the worker finished its warm-up, is not draining and the DB answers."""
+
+from sqlalchemy import text
+
+from app.config.database import get_engine
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+def check_readiness(state) -> tuple[bool, dict]:
+    """(ready, detail) for /health/ready; `state` is app.state (ready/draining flags)."""
+    detail: dict = {"warm": getattr(state, "ready", False), "draining": getattr(state, "draining", False)}
+    if not detail["warm"] or detail["draining"]:
+        return False, detail
+
+    engine = get_engine()
+    pool = pool_status(engine)
+    detail["pool"] = pool
+    # con el pool agotado un SELECT 1 esperaria pool_timeout: se reporta sin esperar
+    if pool and pool["checked_out"] >= pool["size"] + getattr(engine.pool, "_max_overflow", 0):
+        detail["database"] = "pool agotado"
+        return False, detail
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        detail["database"] = f"error: {exc.__class__.__name__}"
+        return False, detail
+    detail["database"] = "ok"
+    return True, detail
@@ -0,0 +1,131 @@
+"""Version-tagged ETags for read endpoints whose data rarely changes."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List
+
+from fastapi import Request, Response
+
+from app.config.settings import settings
+from app.core.invalidation import bus_healthy, versions
+from app.core.metrics import record_cache_lookup
+from app.core.security import decode_claims
+
+
+def version_etag(keys: Iterable[str], variant: str = "") -> str:
+    """Same data, same ETag in every worker and across restarts (versions persisted by the bus)."""
+    parts = [settings.HTTP_CACHE_EPOCH, variant] + [f"{key}={versions.get(key)}" for key in keys]
+    return '"' + hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+class BodyCache:
+    """Bounded LRU of serialized bodies keyed by ETag."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str) -> tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag: str, body: bytes, media_type: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[etag] = (body, media_type)
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# por ETag: una escritura cambia la version y con ella la clave, no hace falta invalidar
+body_cache = BodyCache(settings.HTTP_CACHE_BODY_ENTRIES)
+
+
+class CacheHit(Exception):
+    """Raised by http_cache() to answer from the cache; handled by cache_hit_handler."""
+
+    def __init__(self, response: Response):
+        self.response = response
+
+
+async def cache_hit_handler(request: Request, exc: CacheHit) -> Response:
+    return exc.response
+
+
+def http_cache(
+    keys: Callable[[dict], List[str]] | List[str],
+    permissions: List[str],
+    per_user: bool = False,
+):
+    """Route dependency adding ETag/Cache-Control and answering If-None-Match with 304."""
+    # keys: claves de version (o callable con los path params); per_user: el ETag incluye el usuario
+
+    async def dependency(request: Request, response: Response) -> None:
+        if not settings.HTTP_CACHE_ENABLED or not bus_healthy():
+            # sin bus no hay garantia de enterarse de escrituras de otros workers
+            return
+        claims = _access_claims(request)
+        if claims is None or not set(permissions).issubset(claims.get("permissions") or []):
+            return
+
+        resolved = keys(request.path_params) if callable(keys) else keys
+        # la query (pagina, cursor, envelope) forma parte de la variante
+        variant = f"{request.url.path}?{request.url.query}|{claims['sub'] if per_user else ''}"
+        etag = version_etag(["authz", *resolved], variant)
+        headers = {"ETag": etag, "Cache-Control": cache_control()}
+        if per_user:
+            headers["Vary"] = "Authorization"
+
+        matched = etag_matches(request.headers.get("if-none-match"), etag)
+        record_cache_lookup("http_etag", matched is not None)
+        if matched:
+            # el cliente puede tener la variante comprimida (ETag con sufijo de encoding)
+            raise CacheHit(Response(status_code=304, headers={**headers, "ETag": matched}))
+        if body_cache.max_entries > 0:
+            cached = body_cache.get(etag)
+            record_cache_lookup("http_body", cached is not None)
+            if cached is not None:
+                raise CacheHit(Response(content=cached[0], media_type=cached[1], headers=headers))
+        response.headers.update(headers)
+        # HTTPBodyCacheMiddleware solo guarda respuestas marcadas aqui (no archivos ni streams)
+        request.state.http_cache_etag = etag
+
+    return dependency
+
+
+def cache_control() -> str:
+    if settings.HTTP_CACHE_MAX_AGE > 0:
+        return f"private, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate"
+    return "private, no-cache"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> str | None:
+    """Returns the matching validator sent by the client, ignoring encoding suffixes."""
+    if not if_none_match:
+        return None
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        tag = candidate.removeprefix("W/")
+        if tag == etag or (tag.startswith(etag[:-1] + "-") and tag.endswith('"')):
+            return candidate
+    return None
+
+
+def _access_claims(request: Request) -> dict | None:
+    auth_header = request.headers.get("authorization")
+    if not auth_header or not auth_header.lower().startswith("bearer "):
+        return None
+    return decode_claims(auth_header.split(" ", 1)[1])
@@ -0,0 +1,269 @@
+"""Idempotency-Key support for retried writes (quiz submission, lesson completion)."""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import DateTime, bindparam, text
+
+from app.config.settings import settings
+from app.core.http_cache import CacheHit
+from app.core.metrics import record_cache_lookup
+from app.core.security import decode_claims
+
+logger = logging.getLogger("sst.idempotency")
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+SHARED_POLL_SECONDS = 0.2
+
+StoredResponse = Tuple[int, bytes, str]  # (status, cuerpo, content-type)
+
+
+@dataclass(eq=False)
+class Entry:
+    fingerprint: str
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    response: StoredResponse | None = None
+    expires_at: float = 0.0
+
+
+# en memoria por worker: frente local de DatabaseStore, que decide entre workers. La clave queda atada
+# al metodo, la ruta y el hash del cuerpo; reutilizarla para otra peticion es un 422
+class IdempotencyStore:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Tuple[str, str], fingerprint: str) -> Tuple[Entry, bool]:
+        """(entry, owner): owner=True when the caller must execute the request and then finish() it."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.response is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, False
+            entry = Entry(fingerprint)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                # la mas antigua; si aun esta en curso, su finish() despierta igual a quienes esperan
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def finish(self, key: Tuple[str, str], entry: Entry, response: StoredResponse | None) -> None:
+        """Stores the response (None: the request failed and the key is released) and wakes the waiters."""
+        with self._lock:
+            if response is None:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            else:
+                entry.response = response
+                entry.expires_at = time.monotonic() + self.ttl_seconds
+        entry.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _with_times(statement: str, *names: str):
+    return text(statement).bindparams(*(bindparam(name, type_=DateTime) for name in names))
+
+
+# se reclama la clave nueva o la vencida (respuesta caducada, o ejecucion de un worker caido)
+_CLAIM = _with_times(
+    "INSERT INTO idempotency_keys (sub, key, fingerprint, status, expires_at) "
+    "VALUES (:sub, :key, :fingerprint, 'running', :expires_at) "
+    "ON CONFLICT (sub, key) DO UPDATE SET fingerprint = excluded.fingerprint, status = 'running', "
+    "status_code = NULL, body = NULL, media_type = NULL, expires_at = excluded.expires_at "
+    "WHERE idempotency_keys.expires_at < :now "
+    "RETURNING sub",
+    "now",
+    "expires_at",
+)
+_FETCH = text(
+    "SELECT fingerprint, status, status_code, body, media_type FROM idempotency_keys WHERE sub = :sub AND key = :key"
+)
+_COMPLETE = _with_times(
+    "UPDATE idempotency_keys SET status = 'done', status_code = :status_code, body = :body, "
+    "media_type = :media_type, expires_at = :expires_at "
+    "WHERE sub = :sub AND key = :key AND fingerprint = :fingerprint AND status = 'running'",
+    "expires_at",
+)
+_RELEASE = text(
+    "DELETE FROM idempotency_keys "
+    "WHERE sub = :sub AND key = :key AND fingerprint = :fingerprint AND status = 'running'"
+)
+
+
+class DatabaseStore:
+    """Claims and stored responses in idempotency_keys, shared by every worker and host."""
+
+    def __init__(self, ttl_seconds: float, lease_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+
+    def claim(self, key: Tuple[str, str], fingerprint: str):
+        """(True, None) when the caller owns the key, else (False, the current row or None)."""
+        from app.config.database import get_engine
+
+        now = datetime.utcnow()
+        params = {
+            "sub": key[0],
+            "key": key[1],
+            "fingerprint": fingerprint,
+            "now": now,
+            "expires_at": now + timedelta(seconds=self.lease_seconds),
+        }
+        with get_engine().begin() as conn:
+            if conn.execute(_CLAIM, params).first() is not None:
+                return True, None
+            return False, conn.execute(_FETCH, params).first()
+
+    def finish(self, key: Tuple[str, str], fingerprint: str, response: StoredResponse | None) -> None:
+        from app.config.database import get_engine
+
+        params = {"sub": key[0], "key": key[1], "fingerprint": fingerprint}
+        with get_engine().begin() as conn:
+            if response is None:
+                conn.execute(_RELEASE, params)
+                return
+            status_code, body, media_type = response
+            expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            params.update(status_code=status_code, body=body, media_type=media_type, expires_at=expires_at)
+            conn.execute(_COMPLETE, params)
+
+
+store = IdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+shared = (
+    DatabaseStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_LEASE_SECONDS)
+    if settings.IDEMPOTENCY_BACKEND == "database"
+    else None
+)
+
+
+async def _in_executor(function, *args):
+    # fuera del contexto de la peticion: no cuenta en el query budget del endpoint
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+async def _claim_shared(key: Tuple[str, str], entry: Entry) -> bool:
+    """Claims `key` in every worker; when another one holds it, settles the local entry from the shared row."""
+    try:
+        claimed, row = await _in_executor(shared.claim, key, entry.fingerprint)
+    except Exception as exc:
+        logger.warning("Claves de idempotencia compartidas no disponibles, se usa la local: %s", exc)
+        return True
+    if claimed:
+        return True
+    if row is not None and row.fingerprint != entry.fingerprint:
+        store.finish(key, entry, None)
+        raise _reused()
+    response = None
+    if row is not None and row.status == "done":
+        response = (row.status_code, bytes(row.body), row.media_type)
+    store.finish(key, entry, response)
+    return False
+
+
+async def finish(key: Tuple[str, str], entry: Entry, response: StoredResponse | None) -> None:
+    """Stores the response of a claimed request (None releases the key) before it reaches the client."""
+    if shared is not None:
+        try:
+            await _in_executor(shared.finish, key, entry.fingerprint, response)
+        except Exception as exc:
+            logger.warning("No se pudo guardar la respuesta idempotente compartida: %s", exc)
+    store.finish(key, entry, response)
+
+
+def _reused() -> HTTPException:
+    return HTTPException(status_code=422, detail=f"La {HEADER} ya se uso con otra solicitud")
+
+
+def idempotent(permissions: List[str]):
+    """Route dependency honoring the Idempotency-Key header."""
+    # sin `permissions` en el token la peticion sigue a las dependencias normales (401/403)
+
+    async def dependency(request: Request) -> None:
+        raw_key = request.headers.get(HEADER)
+        if not settings.IDEMPOTENCY_ENABLED or raw_key is None:
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres",
+            )
+        claims = _access_claims(request)
+        if claims is None or not set(permissions).issubset(claims.get("permissions") or []):
+            return
+
+        key = (str(claims["sub"]), raw_key)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{request.method} {request.url.path}\n".encode())
+        digest.update(await request.body())
+        fingerprint = digest.hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            entry, owner = store.acquire(key, fingerprint)
+            if entry.fingerprint != fingerprint:
+                raise _reused()
+            if owner and shared is not None:
+                owner = await _claim_shared(key, entry)
+            if owner:
+                record_cache_lookup("idempotency", False)
+                # IdempotencyMiddleware guarda la respuesta (o libera la clave) al terminar
+                request.state.idempotency = (key, entry)
+                return
+            if entry.response is not None:
+                record_cache_lookup("idempotency", True)
+                status_code, body, media_type = entry.response
+                headers = {"Idempotent-Replayed": "true"}
+                raise CacheHit(Response(content=body, status_code=status_code, media_type=media_type, headers=headers))
+            if entry.done.is_set():
+                # la ejecuta otro worker: se consulta de nuevo la fila compartida
+                if time.monotonic() >= deadline:
+                    raise _in_progress()
+                await asyncio.sleep(min(SHARED_POLL_SECONDS, deadline - time.monotonic()))
+                continue
+            try:
+                # la primera ejecucion sigue en curso: se espera su resultado en vez de repetirla
+                await asyncio.wait_for(entry.done.wait(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                raise _in_progress()
+
+    return dependency
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Hay una solicitud en curso con la misma {HEADER}",
+    )
+
+
+def purge_keys(db) -> int:
+    """Deletes expired shared keys (scheduler job)."""
+    statement = _with_times("DELETE FROM idempotency_keys WHERE expires_at < :now", "now")
+    result = db.execute(statement, {"now": datetime.utcnow()})
+    db.commit()
+    return result.rowcount
+
+
+def _access_claims(request: Request) -> dict | None:
+    auth_header = request.headers.get("authorization")
+    if not auth_header or not auth_header.lower().startswith("bearer "):
+        return None
+    return decode_claims(auth_header.split(" ", 1)[1])
@@ -0,0 +1,130 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.exceptions import LazyLoadError
+
+logger = logging.getLogger("sst.sql")
+
+_query_stats: ContextVar["QueryStats | None"] = ContextVar("sst_query_stats", default=None)
+
+
+@dataclass
+class QueryStats:
+    """SQL counters for a single request; filled by the engine/session event hooks."""
+
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+    lazy_loads: int = 0
+    budget: int | None = None
+    # solo se llena dentro de capture_statements() (chequeos de EXPLAIN)
+    statements: list | None = None
+
+    def record(self, statement: str, parameters, elapsed_ms: float) -> None:
+        if self.statements is not None:
+            self.statements.append((statement, parameters))
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_ms:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_ms:.2f}"
+        )
+
+    def log_fields(self) -> dict:
+        statement = self.slowest_statement
+        if statement and len(statement) > settings.SQL_LOG_STATEMENT_CHARS:
+            statement = statement[: settings.SQL_LOG_STATEMENT_CHARS] + "..."
+        return {
+            "db_queries": self.count,
+            "db_time_ms": round(self.total_ms, 2),
+            "db_slowest_ms": round(self.slowest_ms, 2),
+            "db_slowest_statement": statement,
+            "db_lazy_loads": self.lazy_loads,
+            "db_query_budget": self.budget,
+        }
+
+
+def start_query_stats() -> tuple[QueryStats, Token]:
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def stop_query_stats(token: Token) -> None:
+    _query_stats.reset(token)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+@contextmanager
+def capture_statements() -> Iterator[QueryStats]:
+    """Collects (statement, parameters) of everything executed inside the block."""
+    stats = QueryStats(statements=[])
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def query_budget(max_queries: int):
+    """Route dependency declaring how many SQL statements the endpoint may issue."""
+
+    async def dependency() -> None:
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    dependency.max_queries = max_queries  # benchmarks.bench_endpoints --strict localiza asi las rutas
+    return dependency
+
+
+def install_query_instrumentation(engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sst_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sst_query_start"].pop()
+    stats = _query_stats.get()
+    # sentencias de control de la propia app (SET LOCAL del tiempo limite): no cuentan en el presupuesto
+    if stats is not None and not (context is not None and context.execution_options.get("sst_uncounted")):
+        stats.record(statement, parameters, (time.perf_counter() - started) * 1000)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_lazy_load(orm_execute_state) -> None:
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    stats = _query_stats.get()
+    if stats is None:
+        return
+    stats.lazy_loads += 1
+    if settings.SQL_STRICT_MODE:
+        mapper = orm_execute_state.lazy_loaded_from.mapper
+        raise LazyLoadError(f"Lazy load desde {mapper.class_.__name__}; use joinedload/selectinload")
@@ -0,0 +1,289 @@
+"""Cross-worker cache invalidation bus (LISTEN/NOTIFY on PostgreSQL)."""
+
+import json
+import logging
+import os
+import secrets
+import select
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+
+logger = logging.getLogger("sst.invalidation")
+
+CHANNEL = "sst_invalidation"
+_PENDING_KEY = "sst_invalidate"
+_VERSIONS_KEY = "sst_invalidate_versions"
+
+# claves cuya version se guarda en cache_versions, en la misma transaccion que la escritura: los ETag de
+# app.core.http_cache salen de ellas y coinciden en todos los workers y entre reinicios
+VERSIONED_PREFIXES = ("authz", "checklist", "quiz:")
+
+_BUMP_VERSIONS = (
+    "INSERT INTO cache_versions (key, version) VALUES {values} "
+    "ON CONFLICT (key) DO UPDATE SET version = cache_versions.version + 1 "
+    "RETURNING key, version"
+)
+_LOAD_VERSIONS = "SELECT key, version FROM cache_versions"
+
+_subscribers: List[tuple[Callable[[Iterable[str]], None], Callable[[], None] | None, tuple[str, ...] | None]] = []
+
+
+def subscribe(
+    on_invalidate: Callable[[Iterable[str]], None],
+    on_flush: Callable[[], None] | None = None,
+    prefixes: tuple[str, ...] | None = None,
+) -> None:
+    """on_invalidate(keys) for each committed write; on_flush() when messages may have been lost."""
+    # prefixes: solo se entregan las claves que empiezan por alguno (None: todas)
+    _subscribers.append((on_invalidate, on_flush, prefixes))
+
+
+class KeyVersions:
+    """Committed versions of the VERSIONED_PREFIXES keys (0 when the key was never published)."""
+
+    def __init__(self):
+        self.loaded = False
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def apply(self, versions: dict) -> None:
+        # las versiones solo crecen: un aviso atrasado o repetido no hace retroceder a nadie
+        with self._lock:
+            for key, version in versions.items():
+                if version > self._versions.get(key, 0):
+                    self._versions[key] = version
+
+    def load(self, rows: Iterable[tuple[str, int]]) -> None:
+        self.apply(dict(rows))
+        self.loaded = True
+
+
+versions = KeyVersions()
+
+
+def _dispatch(keys: Iterable[str]) -> None:
+    keys = list(keys)
+    for on_invalidate, _, prefixes in _subscribers:
+        selected = keys if prefixes is None else [key for key in keys if key.startswith(prefixes)]
+        if not selected:
+            continue
+        try:
+            on_invalidate(selected)
+        except Exception:  # pragma: no cover - un suscriptor roto no debe frenar a los demas
+            logger.exception("Suscriptor de invalidacion fallo")
+
+
+def _flush_all() -> None:
+    for _, on_flush, _ in _subscribers:
+        if on_flush is None:
+            continue
+        try:
+            on_flush()
+        except Exception:  # pragma: no cover
+            logger.exception("Flush de cache fallo")
+
+
+class InMemoryBus:
+    """Single-process bus (SQLite, scripts): local delivery only."""
+
+    @property
+    def healthy(self) -> bool:
+        return versions.loaded
+
+    def notify_in_transaction(self, db: Session, keys: List[str], bumped: dict) -> None:
+        return
+
+    def start(self) -> None:
+        from app.config.database import get_engine
+
+        try:
+            with get_engine().connect() as connection:
+                versions.load(connection.execute(text(_LOAD_VERSIONS)).all())
+        except Exception as exc:
+            # sin versiones no hay ETag fiables: http_cache queda desactivado
+            logger.warning("No se pudieron leer las versiones de cache: %s", exc)
+
+    def stop(self) -> None:
+        return
+
+
+class PostgresBus:
+    def __init__(self, engine, poll_seconds: float, heartbeat_seconds: float):
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.origin = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._connected = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def healthy(self) -> bool:
+        return self._connected
+
+    def notify_in_transaction(self, db: Session, keys: List[str], bumped: dict) -> None:
+        payload = json.dumps({"o": self.origin, "k": keys, "v": bumped})
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sst-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 1)
+        self._connected = False
+
+    def _connect(self):
+        from app.config.database import dedicated_connection
+
+        connection = dedicated_connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+            # despues del LISTEN: lo confirmado antes esta en la tabla y lo posterior llega como aviso
+            cursor.execute(_LOAD_VERSIONS)
+            versions.load(cursor.fetchall())
+        return connection
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                self._connected = True
+                backoff = 0.5
+                # pudo haber mensajes perdidos mientras no escuchabamos
+                _flush_all()
+                self._listen(connection)
+            except Exception as exc:
+                if self._connected:
+                    logger.warning("Bus de invalidacion desconectado: %s", exc)
+                self._connected = False
+                _flush_all()
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                self._connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _listen(self, connection) -> None:
+        last_heartbeat = time.monotonic()
+        while not self._stop.is_set():
+            readable, _, _ = select.select([connection], [], [], self.poll_seconds)
+            if readable:
+                connection.poll()
+                while connection.notifies:
+                    self._handle(connection.notifies.pop(0).payload)
+            elif time.monotonic() - last_heartbeat >= self.heartbeat_seconds:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                last_heartbeat = time.monotonic()
+
+    def _handle(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("o") == self.origin:
+            return  # ya aplicado localmente en after_commit
+        versions.apply(message.get("v") or {})
+        _dispatch(message.get("k") or [])
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = _create_bus()
+    return _bus
+
+
+def _create_bus():
+    from app.config.database import get_engine
+
+    engine = get_engine()
+    backend = settings.INVALIDATION_BUS
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresBus(engine, settings.INVALIDATION_POLL_SECONDS, settings.INVALIDATION_HEARTBEAT_SECONDS)
+    return InMemoryBus()
+
+
+def start_bus() -> None:
+    get_bus().start()
+
+
+def stop_bus() -> None:
+    if _bus is not None:
+        _bus.stop()
+
+
+# conexion LISTEN caida (o versiones sin leer): las caches no deben servir hasta reconectar
+def bus_healthy() -> bool:
+    return get_bus().healthy
+
+
+def publish(db: Session, *keys: str) -> None:
+    """Invalidates `keys` in every worker once `db` commits; call it before commit()."""
+    if not keys:
+        return
+    db.info.setdefault(_PENDING_KEY, set()).update(keys)
+    bumped = _bump_versions(db, sorted({key for key in keys if key.startswith(VERSIONED_PREFIXES)}))
+    db.info.setdefault(_VERSIONS_KEY, {}).update(bumped)
+    get_bus().notify_in_transaction(db, list(keys), bumped)
+
+
+def _bump_versions(db: Session, keys: List[str]) -> dict:
+    # orden fijo de claves: dos escrituras que versionan las mismas filas no se bloquean en cruz
+    if not keys:
+        return {}
+    values = ", ".join(f"(:key{index}, 1)" for index in range(len(keys)))
+    params = {f"key{index}": key for index, key in enumerate(keys)}
+    return dict(db.execute(text(_BUMP_VERSIONS.format(values=values)), params).all())
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_after_commit(session: Session) -> None:
+    keys = session.info.pop(_PENDING_KEY, None)
+    versions.apply(session.info.pop(_VERSIONS_KEY, None) or {})
+    if keys:
+        _dispatch(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_VERSIONS_KEY, None)
+
+
+if hasattr(os, "register_at_fork"):
+    # el hilo y la conexion LISTEN no sobreviven al fork: cada worker crea su bus
+    def _reset_after_fork() -> None:
+        global _bus
+        _bus = None
+
+    os.register_at_fork(after_in_child=_reset_after_fork)
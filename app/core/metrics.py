@@ -0,0 +1,346 @@
+"""Prometheus text metrics without external services."""
+
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.config.settings import settings
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEFAULT_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+EXITED_FILE = "metrics_exited.json"  # acumulado de los workers que ya salieron
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+        registry.maybe_flush()
+
+
+class Gauge(_Metric):
+    """Gauges are summed across live processes only."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self.values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+        registry.maybe_flush()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Callbacks run before every snapshot, e.g. to sample connection-pool gauges."""
+        self.collectors.append(collector)
+
+    # -------------------------
+    # Multiprocess store
+    # -------------------------
+    def _directory(self) -> str | None:
+        return settings.METRICS_MULTIPROC_DIR
+
+    def snapshot(self) -> dict:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:  # pragma: no cover - un collector roto no debe tumbar /metrics
+                pass
+        data = {}
+        for name, metric in self.metrics.items():
+            with metric._lock:
+                values = [[list(key), value] for key, value in metric.values.items()]
+            data[name] = values
+        return data
+
+    def maybe_flush(self) -> None:
+        if not self._directory():
+            return
+        now = time.monotonic()
+        if now - self._last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        if self._flush_lock.acquire(blocking=False):
+            try:
+                self._last_flush = now
+                self.flush()
+            finally:
+                self._flush_lock.release()
+
+    def flush(self) -> None:
+        # un JSON por pid, reemplazado atomicamente; /metrics suma los de todos los workers
+        directory = self._directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot()}, fh)
+        os.replace(tmp_path, path)
+
+    def _load_snapshots(self) -> Iterable[Tuple[bool, dict]]:
+        directory = self._directory()
+        if not directory:
+            yield True, self.snapshot()
+            return
+        self.flush()
+        for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    payload = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            yield _pid_alive(payload.get("pid")), payload.get("metrics", {})
+
+    def collect(self) -> Dict[str, Dict[LabelValues, object]]:
+        merged: Dict[str, Dict[LabelValues, object]] = {name: {} for name in self.metrics}
+        for alive, snapshot in self._load_snapshots():
+            self._merge(merged, snapshot, alive)
+        return merged
+
+    def _merge(self, merged: Dict[str, Dict[LabelValues, object]], snapshot: dict, alive: bool) -> None:
+        for name, values in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.kind == "gauge" and not alive):
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in values:
+                key = tuple(key)
+                if metric.kind == "histogram":
+                    current = target.get(key)
+                    target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = target.get(key, 0.0) + value
+
+    def fold_exited(self, pid: int) -> None:
+        """Adds the counters of the exited worker `pid` to EXITED_FILE and deletes its snapshot."""
+        directory = self._directory()
+        if not directory:
+            return
+        path = os.path.join(directory, f"metrics_{pid}.json")
+        exited_path = os.path.join(directory, EXITED_FILE)
+        merged: Dict[str, Dict[LabelValues, object]] = {}
+        for source in (exited_path, path):
+            try:
+                with open(source, encoding="utf-8") as fh:
+                    self._merge(merged, json.load(fh).get("metrics", {}), alive=False)
+            except (OSError, ValueError):
+                continue
+        tmp_path = f"{exited_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            metrics = {name: [[list(key), value] for key, value in values.items()] for name, values in merged.items()}
+            json.dump({"pid": None, "metrics": metrics}, fh)
+        os.replace(tmp_path, exited_path)
+        # un pid reutilizado empieza de cero en vez de restar del contador anterior
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def render(self) -> str:
+        merged = self.collect()
+        lines: List[str] = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged[name].items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == "histogram":
+                    cumulative = 0.0
+                    for bound, count in zip(metric.buckets, value):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {_format_value(cumulative)}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {_format_value(value[-1])}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        lines.extend(_cache_ratio_lines(merged.get("sst_cache_requests_total", {})))
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _cache_ratio_lines(cache_requests: Dict[LabelValues, object]) -> List[str]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for (cache, result), value in cache_requests.items():
+        totals.setdefault(cache, {}).setdefault(result, 0.0)
+        totals[cache][result] += value
+    if not totals:
+        return []
+    lines = [
+        "# HELP sst_cache_hit_ratio Fraccion de lecturas de cache servidas sin ir a la base",
+        "# TYPE sst_cache_hit_ratio gauge",
+    ]
+    for cache, results in sorted(totals.items()):
+        lookups = sum(results.values())
+        ratio = results.get("hit", 0.0) / lookups if lookups else 0.0
+        lines.append(f"sst_cache_hit_ratio{_format_labels({'cache': cache})} {_format_value(round(ratio, 4))}")
+    return lines
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+http_requests_total = registry.register(
+    Counter("sst_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+)
+http_request_duration = registry.register(
+    Histogram("sst_http_request_duration_seconds", "Latencia por ruta", ("method", "route"))
+)
+http_requests_in_flight = registry.register(Gauge("sst_http_requests_in_flight", "Peticiones en curso"))
+http_response_size = registry.register(
+    Histogram("sst_http_response_size_bytes", "Tamano de respuesta por ruta", ("method", "route"), DEFAULT_SIZE_BUCKETS)
+)
+db_queries_per_request = registry.register(
+    Histogram("sst_db_queries_per_request", "Sentencias SQL por peticion", ("method", "route"), DEFAULT_COUNT_BUCKETS)
+)
+db_pool_connections = registry.register(
+    Gauge("sst_db_pool_connections", "Conexiones del pool SQLAlchemy por estado", ("state",))
+)
+cache_requests_total = registry.register(
+    Counter("sst_cache_requests_total", "Lecturas de cache por resultado", ("cache", "result"))
+)
+
+job_runs_total = registry.register(
+    Counter("sst_job_runs_total", "Ejecuciones de jobs del scheduler por resultado", ("job", "result"))
+)
+job_duration = registry.register(
+    Histogram("sst_job_duration_seconds", "Duracion de jobs del scheduler", ("job",))
+)
+job_rows_total = registry.register(Counter("sst_job_rows_total", "Filas afectadas por jobs del scheduler", ("job",)))
+activity_events_total = registry.register(
+    Counter("sst_activity_events_total", "Eventos de actividad escritos o descartados", ("result",))
+)
+rate_limited_total = registry.register(
+    Counter("sst_rate_limited_total", "Peticiones rechazadas con 429 por ruta y alcance", ("route", "scope"))
+)
+deadline_exceeded_total = registry.register(
+    Counter("sst_deadline_exceeded_total", "Peticiones cortadas con 503 por tiempo limite", ("route", "stage"))
+)
+activity_buffer_events = registry.register(Gauge("sst_activity_buffer_events", "Eventos de actividad pendientes de escribir"))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def register_pool_collector(engine) -> None:
+    pool = engine.pool
+
+    def collect() -> None:
+        if not hasattr(pool, "checkedout"):
+            return
+        db_pool_connections.set(pool.size(), state="size")
+        db_pool_connections.set(pool.checkedout(), state="checked_out")
+        db_pool_connections.set(pool.checkedin(), state="idle")
+        db_pool_connections.set(max(pool.overflow(), 0), state="overflow")
+
+    registry.add_collector(collect)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -1,9 +1,35 @@
+import gzip
+import logging
+import time
+import zlib
 from typing import Iterable, Set
-from jose import jwt, JWTError
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from starlette.responses import Response
 
 from app.config.settings import settings
+from app.core.deadline import start_deadline, stop_deadline
+from app.core.exceptions import QueryBudgetExceeded
+from app.core.http_cache import body_cache
+from app.core.idempotency import finish as finish_idempotent
+from app.core.instrumentation import start_query_stats, stop_query_stats
+from app.core.metrics import (
+    db_queries_per_request,
+    deadline_exceeded_total,
+    http_request_duration,
+    http_requests_in_flight,
+    http_requests_total,
+    http_response_size,
+)
+from app.core.security import decode_claims
+
+try:  # brotli es opcional; sin el paquete solo se ofrece gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+sql_logger = logging.getLogger("sst.sql")
 
 
 class JWTAuthMiddleware(BaseHTTPMiddleware):
@@ -21,19 +47,258 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             or path.startswith("/docs")
             or path.startswith("/redoc")
             or path.startswith("/openapi")
-            or path == "/health"
+            or path.startswith("/health")
+            or path == "/metrics"
         ):
             return await call_next(request)
 
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.lower().startswith("bearer "):
-            token = auth_header.split(" ", 1)[1]
-            try:
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                if payload.get("type") == "access" and payload.get("sub"):
-                    request.state.user_id = int(payload["sub"])
-            except JWTError:
-                pass
+            payload = decode_claims(auth_header.split(" ", 1)[1])
+            if payload:
+                request.state.user_id = int(payload["sub"])
 
         return await call_next(request)
 
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Tracks SQL count/time per request and exposes it as Server-Timing and log fields."""
+
+    async def dispatch(self, request: Request, call_next):
+        stats, token = start_query_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            stop_query_stats(token)
+
+        response.headers["Server-Timing"] = stats.server_timing()
+        db_queries_per_request.observe(stats.count, method=request.method, route=route_template(request))
+        fields = stats.log_fields()
+        fields.update({"method": request.method, "path": request.url.path, "status_code": response.status_code})
+        level = logging.WARNING if stats.over_budget or stats.lazy_loads else logging.INFO
+        sql_logger.log(
+            level,
+            "sql %s %s queries=%s db_ms=%s lazy=%s budget=%s",
+            request.method,
+            request.url.path,
+            stats.count,
+            fields["db_time_ms"],
+            stats.lazy_loads,
+            stats.budget,
+            extra=fields,
+        )
+
+        if settings.SQL_STRICT_MODE and stats.over_budget:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.url.path} ejecuto {stats.count} consultas (presupuesto {stats.budget})"
+            )
+        return response
+
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Starts the request's time budget (see app.core.deadline) and counts the requests cut by it."""
+
+    async def dispatch(self, request: Request, call_next):
+        current, token = start_deadline(settings.REQUEST_DEADLINE_SECONDS)
+        try:
+            response = await call_next(request)
+        finally:
+            stop_deadline(token)
+        if current.exceeded is not None:
+            deadline_exceeded_total.inc(route=route_template(request), stage=current.exceeded)
+        return response
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """Records per-route latency, status codes, response sizes and in-flight requests."""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            http_requests_in_flight.dec()
+            route = route_template(request)
+            http_requests_total.inc(method=request.method, route=route, status=str(status_code))
+            http_request_duration.observe(time.perf_counter() - started, method=request.method, route=route)
+
+        content_length = response.headers.get("content-length")
+        if content_length is not None:
+            http_response_size.observe(int(content_length), method=request.method, route=route)
+        return response
+
+
+class HTTPBodyCacheMiddleware(BaseHTTPMiddleware):
+    """Keeps the serialized body of 200 responses tagged by http_cache() so the next miss skips the endpoint."""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        etag = response.headers.get("etag")
+        if request.method != "GET" or response.status_code != 200 or not etag:
+            return response
+        if etag != getattr(request.state, "http_cache_etag", None):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        body_cache.put(etag, body, response.headers.get("content-type", "application/json"))
+        return Response(
+            content=body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            background=response.background,
+        )
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """Stores the response of requests claimed by idempotent() so retries with the same key replay it."""
+
+    async def dispatch(self, request: Request, call_next):
+        stored = None
+        try:
+            response = await call_next(request)
+            claimed = getattr(request.state, "idempotency", None)
+            if claimed is None or not 200 <= response.status_code < 300:
+                return response
+            # solo los exitos: un error libera la clave y el reintento vuelve a ejecutar
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            stored = (response.status_code, body, response.headers.get("content-type", "application/json"))
+            return Response(
+                content=body,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                background=response.background,
+            )
+        finally:
+            claimed = getattr(request.state, "idempotency", None)
+            if claimed is not None:
+                await finish_idempotent(*claimed, stored)
+
+
+class CompressionMiddleware:
+    """gzip/brotli for JSON/text responses of at least COMPRESSION_MINIMUM_SIZE bytes."""
+    # con Content-Length se comprime de una vez (y se reescribe la longitud); sin ella, por fragmentos.
+    # Los ETag fuertes llevan sufijo de codificacion: cada representacion conserva su validador
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        buffered: list[bytes] = []
+        mode = None  # None: decidiendo | "identity" | "buffer" | "stream"
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, mode, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not _compressible(headers.get("content-type", ""))
+                    or int(headers.get("content-length", self.minimum_size)) < self.minimum_size
+                ):
+                    mode = "identity"
+                    await send(message)
+                else:
+                    mode = "buffer" if "content-length" in headers else "stream"
+                return
+            if message["type"] != "http.response.body" or mode == "identity":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if mode == "buffer":
+                buffered.append(body)
+                if more_body:
+                    return
+                compressed = self._compress(b"".join(buffered), encoding)
+                self._rewrite_headers(start_message, encoding, len(compressed))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            if compressor is None:
+                compressor = self._compressor(encoding)
+                self._rewrite_headers(start_message, encoding, None)
+                await send(start_message)
+            chunk = _compress_chunk(compressor, encoding, body, more_body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _rewrite_headers(self, start_message, encoding: str, content_length: int | None) -> None:
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers["Content-Encoding"] = encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and etag.endswith('"') and not etag.startswith("W/"):
+            headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return brotli.Compressor(quality=self.brotli_quality)
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _compress_chunk(compressor, encoding: str, body: bytes, more_body: bool) -> bytes:
+    if encoding == "br":
+        return compressor.process(body) + (compressor.flush() if more_body else compressor.finish())
+    return compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(("application/json", "text/")) and not content_type.startswith("text/event-stream")
+
+
+def route_template(request: Request) -> str:
+    """Route path template (e.g. /training/modules/{module_id}) to keep label cardinality bounded."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
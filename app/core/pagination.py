@@ -0,0 +1,87 @@
+"""Keyset (cursor) pagination shared by the list endpoints."""
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import Generic, List, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+from app.config.settings import settings
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+@dataclass
+class PageParams:
+    limit: int | None = None
+    cursor: str | None = None
+    with_total: bool = False
+    envelope: bool = False
+
+
+def page_params(
+    limit: int | None = Query(None, ge=1, le=settings.PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None),
+    total: bool = Query(False, description="contar el total (una consulta extra)"),
+    envelope: bool = Query(False, description="responder {items, next_cursor, total} en vez de un arreglo"),
+) -> PageParams:
+    # sin envelope ni cursor se mantiene el arreglo historico: sin limit devuelve todo salvo PAGE_LEGACY_LIMIT
+    if limit is None:
+        limit = settings.PAGE_DEFAULT_LIMIT if envelope or cursor else settings.PAGE_LEGACY_LIMIT
+    return PageParams(limit=limit, cursor=cursor, with_total=total, envelope=envelope)
+
+
+def encode_cursor(values: Sequence) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido")
+    return values
+
+
+def paginate(query, order_by: Sequence, params: PageParams | None) -> tuple[list, str | None, int | None]:
+    """Runs `query` keyset-paginated on `order_by` (unique as a whole); returns (rows, next_cursor, total)."""
+    params = params or PageParams()
+    total = query.order_by(None).count() if params.with_total else None
+    if params.cursor:
+        values = decode_cursor(params.cursor, len(order_by))
+        if len(order_by) == 1:
+            query = query.filter(order_by[0] > values[0])
+        else:
+            query = query.filter(tuple_(*order_by) > tuple_(*values))
+    query = query.order_by(*order_by)
+    if params.limit is None:
+        return query.all(), None, total
+
+    rows = query.limit(params.limit + 1).all()
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in order_by])
+    return rows, next_cursor, total
+
+
+def page_response(page: Page, params: PageParams, response: Response):
+    """The envelope or, for existing clients, the bare items with the paging data in headers."""
+    if params.envelope:
+        return page
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
+    return page.items
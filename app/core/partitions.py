@@ -0,0 +1,68 @@
+"""Monthly RANGE partitions (PostgreSQL) shared by activity_events and quiz_attempts."""
+
+import re
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+
+Bounds = Tuple[datetime | None, datetime | None]  # (desde, hasta); None = MINVALUE/MAXVALUE o DEFAULT
+
+_RANGE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> datetime:
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bound(value: str) -> datetime | None:
+    value = value.strip("'")
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value)
+
+
+def attached_partitions(db, table: str) -> Dict[str, Bounds]:
+    """Partitions of `table` with their (from, to) bounds; the DEFAULT partition maps to (None, None)."""
+    # limites leidos del catalogo, no del nombre: cubre tablas adjuntadas enteras y la DEFAULT
+    partitions: Dict[str, Bounds] = {}
+    rows = db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    for name, bound in rows:
+        match = _RANGE.search(bound)
+        partitions[name] = (_bound(match.group(1)), _bound(match.group(2))) if match else (None, None)
+    return partitions
+
+
+def ensure_monthly_partitions(db, table: str, ahead: int) -> int:
+    """Creates the partitions of the current month and `ahead` months after it, plus DEFAULT; returns how many."""
+    existing = attached_partitions(db, table)
+    ranges = [bounds for name, bounds in existing.items() if name != f"{table}_default"]
+    created = 0
+    start = current_month()
+    for offset in range(ahead + 1):
+        month = add_months(start, offset)
+        end = add_months(month, 1)
+        # un rango ya cubierto (p. ej. la tabla anterior adjuntada entera) no se vuelve a crear
+        if any((lo is None or lo < end) and (hi is None or hi > month) for lo, hi in ranges):
+            continue
+        db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {table}_{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+        )
+        created += 1
+    if f"{table}_default" not in existing:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    return created
@@ -0,0 +1,167 @@
+"""Admission control (GCRA rate limits) for the expensive unauthenticated endpoints."""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import text
+
+from app.config.settings import settings
+from app.core.metrics import rate_limited_total
+
+logger = logging.getLogger("sst.rate_limit")
+
+SCOPES = ("ip", "account", "global")
+Rule = Dict[str, Tuple[int, float]]
+
+
+def parse_rule(spec: str) -> Rule:
+    """"ip=60/60,account=10/300" -> {"ip": (60, 60.0), "account": (10, 300.0)}."""
+    rule: Rule = {}
+    for part in filter(None, (chunk.strip() for chunk in spec.split(","))):
+        scope, _, limit = part.partition("=")
+        count, _, period = limit.partition("/")
+        if scope not in SCOPES or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Regla de limite invalida: {part!r}")
+        rule[scope] = (int(count), float(period or 1))
+    return rule
+
+
+class MemoryLimiter:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: float) -> float:
+        """Takes one token; returns 0 when allowed, else the seconds until the next one."""
+        # GCRA: por clave solo se guarda el instante teorico de llegada (tat)
+        interval = period / limit
+        now = time.monotonic()
+        with self._lock:
+            # pop + reinsercion: el dict queda ordenado por uso reciente
+            previous = self._tat.pop(key, now)
+            tat = max(previous, now) + interval
+            if tat - now > period:
+                self._tat[key] = previous
+                return tat - now - period
+            self._tat[key] = tat
+            if len(self._tat) > self.max_keys:
+                self._sweep(now)
+            return 0.0
+
+    def _sweep(self, now: float) -> None:
+        # primero las claves ya recargadas (equivalen a no tener entrada); si no alcanza, las menos recientes
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+        excess = len(self._tat) - self.max_keys // 2
+        if excess > 0:
+            for key in list(self._tat)[:excess]:
+                del self._tat[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tat.clear()
+
+
+_NOW = "EXTRACT(EPOCH FROM clock_timestamp())"
+_UPSERT = text(
+    f"INSERT INTO rate_limit_buckets AS b (key, tat) VALUES (:key, {_NOW} + :interval) "
+    f"ON CONFLICT (key) DO UPDATE SET tat = GREATEST(b.tat, {_NOW}) + :interval "
+    f"WHERE GREATEST(b.tat, {_NOW}) + :interval - {_NOW} <= :period "
+    "RETURNING tat"
+)
+_RETRY_AFTER = text(f"SELECT tat - {_NOW} - :period + :interval FROM rate_limit_buckets WHERE key = :key")
+
+
+# compartido entre workers y hosts con el reloj de la base; si la base no responde, memoria
+class PostgresLimiter:
+    def __init__(self, fallback: MemoryLimiter):
+        self.fallback = fallback
+
+    def hit(self, key: str, limit: int, period: float) -> float:
+        from app.config.database import get_engine
+
+        params = {"key": key, "interval": period / limit, "period": period}
+        try:
+            with get_engine().begin() as conn:
+                if conn.execute(_UPSERT, params).first() is not None:
+                    return 0.0
+                return max(float(conn.execute(_RETRY_AFTER, params).scalar() or 0.0), 0.0) or params["interval"]
+        except Exception as exc:
+            logger.warning("Limite compartido no disponible, se usa el local: %s", exc)
+            return self.fallback.hit(key, limit, period)
+
+
+memory_limiter = MemoryLimiter(settings.RATE_LIMIT_MAX_KEYS)
+_limiter = PostgresLimiter(memory_limiter) if settings.RATE_LIMIT_BACKEND == "postgres" else memory_limiter
+_rules: Dict[str, Rule] = {}
+
+
+def get_rule(route: str) -> Rule:
+    if route not in _rules:
+        _rules[route] = parse_rule(settings.RATE_LIMIT_RULES.get(route, ""))
+    return _rules[route]
+
+
+def check_limits(route: str, keys: Dict[str, str]) -> Tuple[str, float] | None:
+    """(scope, retry after) of the first exhausted bucket, or None."""
+    # ip, account, global y se corta en el primer rechazo: un cliente abusivo no agota el bucket global
+    rule = get_rule(route)
+    for scope in SCOPES:
+        value = keys.get(scope)
+        if scope not in rule or value is None:
+            continue
+        limit, period = rule[scope]
+        retry_after = _limiter.hit(f"{route}:{scope}:{value}", limit, period)
+        if retry_after > 0:
+            return scope, retry_after
+    return None
+
+
+def rate_limit(route: str, account: Callable[[dict], str | None] | None = None):
+    """Route dependency enforcing RATE_LIMIT_RULES[route]; `account` extracts the account key from the JSON body."""
+
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED or not get_rule(route):
+            return
+        keys = {"ip": request.client.host if request.client else "-", "global": "*"}
+        if account is not None and "account" in get_rule(route):
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            # un cuerpo invalido lo rechaza la validacion del endpoint; aqui solo falta la clave de cuenta
+            value = account(body) if isinstance(body, dict) else None
+            if value:
+                keys["account"] = value
+
+        if _limiter is memory_limiter:
+            denied = check_limits(route, keys)
+        else:
+            # fuera del contexto de la peticion: no cuenta en el query budget del endpoint
+            denied = await asyncio.get_running_loop().run_in_executor(None, check_limits, route, keys)
+        if denied is None:
+            return
+        scope, retry_after = denied
+        rate_limited_total.inc(route=route, scope=scope)
+        seconds = max(1, math.ceil(retry_after))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Demasiados intentos, intente de nuevo en {seconds} s",
+            headers={"Retry-After": str(seconds)},
+        )
+
+    return dependency
+
+
+def purge_buckets(db) -> int:
+    """Deletes shared buckets already refilled (scheduler job)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    result = db.execute(text(f"DELETE FROM rate_limit_buckets WHERE tat < {_NOW}"))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,106 @@
+"""Direct JSON encoding for service output that already is the declared response model."""
+
+import functools
+import inspect
+import types
+import typing
+from typing import Any, Callable
+
+import orjson
+import pydantic_core
+from fastapi import Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app.config.settings import settings
+
+_RESPONSE_PARAM = "_sst_response"
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if isinstance(content, BaseModel) or (isinstance(content, list) and content and isinstance(content[0], BaseModel)):
+        return pydantic_core.to_json(content)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _trusted_shape(response_model) -> list[tuple[type, bool]] | None:
+    """[(model, is_list), ...] when the declared response_model (every member, for a Union) can be trusted."""
+    if typing.get_origin(response_model) in (typing.Union, types.UnionType):
+        shapes = [_trusted_shape(member) for member in typing.get_args(response_model)]
+        if not all(shapes):
+            return None
+        return [shape for member in shapes for shape in member]
+    if inspect.isclass(response_model) and issubclass(response_model, BaseModel):
+        return [(response_model, False)]
+    if typing.get_origin(response_model) in (list, typing.List):
+        (item,) = typing.get_args(response_model) or (None,)
+        if inspect.isclass(item) and issubclass(item, BaseModel):
+            return [(item, True)]
+    return None
+
+
+def _is_trusted(result: Any, model: type, is_list: bool) -> bool:
+    if is_list:
+        return isinstance(result, list) and all(type(item) is model for item in result)
+    return type(result) is model
+
+
+def _trusted_endpoint(endpoint: Callable, shapes: list[tuple[type, bool]], status_code: int | None) -> Callable:
+    signature = inspect.signature(endpoint)
+    # FastAPI inyecta un solo parametro Response: si el endpoint ya declara uno se reutiliza
+    own = next((name for name, param in signature.parameters.items() if param.annotation is Response), None)
+    extra = inspect.Parameter(_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+
+    def take_response(kwargs: dict) -> Response:
+        return kwargs[own] if own else kwargs.pop(_RESPONSE_PARAM)
+
+    def finish(result: Any, response: Response):
+        if not any(_is_trusted(result, model, is_list) for model, is_list in shapes):
+            return result
+        fast = FastJSONResponse(result, status_code=status_code or response.status_code or 200)
+        # cabeceras fijadas por dependencias (ETag, Cache-Control...) sobre el sub-response
+        for key, value in response.headers.items():
+            if key.lower() not in ("content-length", "content-type"):
+                fast.headers[key] = value
+        return fast
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            response = take_response(kwargs)
+            return finish(await endpoint(*args, **kwargs), response)
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            response = take_response(kwargs)
+            return finish(endpoint(*args, **kwargs), response)
+
+    if own is None:
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), extra])
+    return wrapper
+
+
+class TrustedJSONRoute(APIRoute):
+    """APIRoute that skips response_model re-validation for matching service output."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        shape = _trusted_shape(kwargs.get("response_model"))
+        if settings.FAST_SERIALIZATION and shape is not None:
+            endpoint = _trusted_endpoint(endpoint, shape, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
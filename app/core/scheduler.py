@@ -0,0 +1,229 @@
+"""In-process maintenance scheduler; on PostgreSQL only the advisory-lock leader runs jobs.
+
+    python -m app.core.scheduler                      # run every job once and exit
+    python -m app.core.scheduler --job purge_expired_otps
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.metrics import job_duration, job_rows_total, job_runs_total
+
+logger = logging.getLogger("sst.scheduler")
+
+LEADER_LOCK_KEY = zlib.crc32(b"sst_scheduler")
+
+
+@dataclass
+class Job:
+    name: str
+    interval_seconds: float
+    run: Callable[[Session], int]
+    next_run: float = 0.0
+
+
+_jobs: Dict[str, Job] = {}
+
+
+def register_job(name: str, interval_seconds: float, run: Callable[[Session], int]) -> None:
+    _jobs[name] = Job(name=name, interval_seconds=interval_seconds, run=run)
+
+
+def run_job(job: Job) -> int:
+    """Runs one job in its own session; returns rows affected and records metrics."""
+    from app.config.database import SessionLocal
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        rows = job.run(db) or 0
+    except Exception:
+        db.rollback()
+        job_runs_total.inc(job=job.name, result="error")
+        raise
+    finally:
+        db.close()
+        elapsed = time.perf_counter() - started
+        job_duration.observe(elapsed, job=job.name)
+    job_runs_total.inc(job=job.name, result="ok")
+    job_rows_total.inc(rows, job=job.name)
+    logger.info("Job %s: %s filas en %.1fms", job.name, rows, elapsed * 1000)
+    return rows
+
+
+class Scheduler:
+    def __init__(self, tick_seconds: float):
+        self.tick_seconds = tick_seconds
+        self._lock_connection = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_connection is not None or not self._uses_advisory_lock()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sst-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            # un job en curso termina su lote actual; no se espera mas que un tick
+            self._thread.join(timeout=self.tick_seconds + 5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._acquire():
+                    self._run_due()
+            except Exception as exc:
+                logger.warning("Scheduler: %s", exc)
+                self._release()
+            self._stop.wait(self.tick_seconds)
+        self._release()
+
+    def _run_due(self) -> None:
+        for job in list(_jobs.values()):
+            if self._stop.is_set():
+                return
+            now = time.monotonic()
+            if now < job.next_run:
+                continue
+            job.next_run = now + job.interval_seconds
+            try:
+                run_job(job)
+            except Exception:
+                logger.exception("Job %s fallo", job.name)
+
+    def _uses_advisory_lock(self) -> bool:
+        return settings.DATABASE_URL.startswith("postgresql")
+
+    def _acquire(self) -> bool:
+        if not self._uses_advisory_lock():
+            return True
+        if self._lock_connection is not None:
+            # si la conexion murio el servidor ya libero el lock: se detecta aqui
+            with self._lock_connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+
+        from app.config.database import dedicated_connection
+
+        connection = dedicated_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (LEADER_LOCK_KEY,))
+            acquired = cursor.fetchone()[0]
+        if not acquired:
+            connection.close()
+            return False
+        logger.info("Scheduler: este worker es el lider")
+        self._lock_connection = connection
+        for job in _jobs.values():
+            job.next_run = 0.0
+        return True
+
+    def _release(self) -> None:
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            connection.close()  # cerrar la sesion libera el advisory lock
+        except Exception:
+            pass
+
+
+_scheduler: Scheduler | None = None
+
+
+def start_scheduler() -> None:
+    global _scheduler
+    if not settings.SCHEDULER_ENABLED:
+        return
+    if _scheduler is None:
+        _scheduler = Scheduler(settings.SCHEDULER_TICK_SECONDS)
+    _scheduler.start()
+
+
+def stop_scheduler() -> None:
+    if _scheduler is not None:
+        _scheduler.stop()
+
+
+# -------------------------
+# Jobs
+# -------------------------
+def _purge_expired_otps(db: Session) -> int:
+    from app.modules.auth.auth_service import AuthService
+
+    return AuthService(db).purge_expired_otps(settings.SCHEDULER_BATCH_SIZE)
+
+
+def _purge_refresh_tokens(db: Session) -> int:
+    from app.modules.auth.auth_service import AuthService
+
+    return AuthService(db).purge_refresh_tokens(settings.SCHEDULER_BATCH_SIZE)
+
+
+def _maintain_activity_partitions(db: Session) -> int:
+    from app.core.activity import maintain_partitions
+
+    return maintain_partitions(db)
+
+
+def _purge_rate_limits(db: Session) -> int:
+    from app.core.rate_limit import purge_buckets
+
+    return purge_buckets(db)
+
+
+def _purge_idempotency_keys(db: Session) -> int:
+    from app.core.idempotency import purge_keys
+
+    return purge_keys(db)
+
+
+def _archive_quiz_attempts(db: Session) -> int:
+    from app.modules.training.training_archive import archive_attempts
+
+    return archive_attempts(db, settings.SCHEDULER_BATCH_SIZE)
+
+
+register_job("purge_expired_otps", settings.SCHEDULER_PURGE_OTPS_SECONDS, _purge_expired_otps)
+register_job("purge_refresh_tokens", settings.SCHEDULER_PURGE_REFRESH_TOKENS_SECONDS, _purge_refresh_tokens)
+register_job("activity_partitions", settings.SCHEDULER_ACTIVITY_PARTITIONS_SECONDS, _maintain_activity_partitions)
+register_job("purge_rate_limits", settings.SCHEDULER_PURGE_RATE_LIMITS_SECONDS, _purge_rate_limits)
+register_job("purge_idempotency_keys", settings.SCHEDULER_PURGE_IDEMPOTENCY_SECONDS, _purge_idempotency_keys)
+register_job("quiz_attempts_archive", settings.SCHEDULER_QUIZ_ATTEMPTS_ARCHIVE_SECONDS, _archive_quiz_attempts)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--job", action="append", choices=sorted(_jobs), help="repetible; por defecto todos")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level="INFO", format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    failed = False
+    for name in args.job or sorted(_jobs):
+        try:
+            run_job(_jobs[name])
+        except Exception:
+            logger.exception("Job %s fallo", name)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import hashlib
+import multiprocessing
 import secrets
+import threading
 import bcrypt
-from jose import jwt, JWTError
 from fastapi import HTTPException, status
 
 from app.config.settings import settings
@@ -14,6 +16,41 @@ def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_workers = 0
+_hash_pool_lock = threading.Lock()
+
+
+def _get_hash_pool(workers: int) -> ProcessPoolExecutor:
+    global _hash_pool, _hash_pool_workers
+    with _hash_pool_lock:
+        if _hash_pool is None or _hash_pool_workers != workers:
+            if _hash_pool is not None:
+                _hash_pool.shutdown(wait=False)
+            # spawn: el proceso (uvicorn) ya tiene hilos y un fork los dejaria a medias. Arrancar los
+            # procesos cuesta ~1 s: el pool se crea en la primera carga de usuarios y se reutiliza
+            context = multiprocessing.get_context("spawn")
+            _hash_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _hash_pool_workers = workers
+        return _hash_pool
+
+
+def hash_passwords(passwords: list[str], workers: int) -> list[str]:
+    """hash_password for many passwords in a process pool; bcrypt is pure CPU."""
+    if workers <= 1 or len(passwords) < 2 * workers:
+        return [hash_password(password) for password in passwords]
+    pool = _get_hash_pool(workers)
+    return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def stop_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True, cancel_futures=True)
+            _hash_pool = None
+
+
 def verify_password(password: str, hashed_password: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
@@ -25,7 +62,11 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
+# python-jose se importa al usar un token (no al importar la app): ~50ms de arranque
+
 def create_access_token(payload: dict, expires_minutes: int | None = None) -> str:
+    from jose import jwt
+
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = payload.copy()
     to_encode.update({"exp": expire, "type": "access"})
@@ -39,12 +80,16 @@ def create_refresh_token(sub: int, expires_days: int | None = None) -> tuple[str
 
 
 def create_pending_token(user_id: int, otp_id: int, expires_minutes: int | None = None) -> str:
+    from jose import jwt
+
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes or settings.OTP_EXPIRE_MINUTES)
     payload = {"sub": str(user_id), "otp_id": otp_id, "type": "pending", "exp": expire}
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHM)
 
 
 def decode_token(token: str, expected_type: str) -> dict:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         if payload.get("type") != expected_type:
@@ -52,3 +97,16 @@ def decode_token(token: str, expected_type: str) -> dict:
         return payload
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido o expirado")
+
+
+def decode_claims(token: str, expected_type: str = "access") -> dict | None:
+    """Like decode_token but returns None instead of raising (middlewares, cache checks)."""
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != expected_type or not payload.get("sub"):
+        return None
+    return payload
@@ -0,0 +1,194 @@
+"""Helpers for Alembic revisions that run against a live database (PostgreSQL)."""
+
+import logging
+import time
+from typing import List, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import OperationalError
+
+from app.config.settings import settings
+
+logger = logging.getLogger("alembic.online")
+
+LOCK_NOT_AVAILABLE = "55P03"  # SQLSTATE de lock_timeout
+
+
+def run_ddl(statement: str, attempts: int = 5, backoff: float = 2.0) -> None:
+    """Runs one DDL statement in its own transaction, retrying when it times out waiting for its lock."""
+    for attempt in range(1, attempts + 1):
+        try:
+            with op.get_context().autocommit_block():
+                op.execute(statement)
+            return
+        except OperationalError as exc:
+            if getattr(exc.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            wait = backoff * attempt
+            logger.warning("Bloqueo no disponible (intento %s/%s), reintento en %.0f s: %s", attempt, attempts, wait, statement)
+            time.sleep(wait)
+
+
+# -------------------------
+# Indices
+# -------------------------
+def _drop_if_invalid(name: str) -> None:
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence,
+    unique: bool = False,
+    where: str | None = None,
+    using: str | None = None,
+) -> None:
+    with op.get_context().autocommit_block():
+        _drop_if_invalid(name)
+        op.create_index(
+            name,
+            table,
+            list(columns),
+            unique=unique,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text(where) if where else None,
+            postgresql_using=using,
+            if_not_exists=True,
+        )
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+# -------------------------
+# Restricciones
+# -------------------------
+def _constraint_exists(table: str, name: str) -> bool:
+    return bool(
+        op.get_bind().execute(
+            sa.text("SELECT 1 FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND conname = :name"),
+            {"table": table, "name": name},
+        ).scalar()
+    )
+
+
+def add_constraint_not_valid(table: str, name: str, definition: str) -> None:
+    """ALTER TABLE ... ADD CONSTRAINT name <definition> NOT VALID (CHECK or FOREIGN KEY); new rows are checked."""
+    if not _constraint_exists(table, name):
+        run_ddl(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID')
+
+
+def validate_constraint(table: str, name: str) -> None:
+    """Checks the existing rows; holds SHARE UPDATE EXCLUSIVE, so reads and writes continue."""
+    with op.get_context().autocommit_block():
+        op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"')
+
+
+def set_not_null(table: str, column: str) -> None:
+    """SET NOT NULL without a scan under ACCESS EXCLUSIVE: PostgreSQL 12+ trusts the validated CHECK."""
+    check = f"ck_{table}_{column}_not_null"
+    add_constraint_not_valid(table, check, f"CHECK ({column} IS NOT NULL)")
+    validate_constraint(table, check)
+    run_ddl(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    run_ddl(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS "{check}"')
+
+
+# -------------------------
+# Datos
+# -------------------------
+def backfill(
+    table: str,
+    assignments: str,
+    where: str | None = None,
+    key: str = "id",
+    batch_size: int | None = None,
+    pause: float | None = None,
+    params: dict | None = None,
+) -> int:
+    """UPDATE table SET <assignments> [WHERE <where>] in ranges of batch_size keys; returns the rows updated."""
+    # una transaccion por lote: se puede interrumpir y relanzar si `where` excluye lo ya hecho
+    statement = sa.text(
+        f"UPDATE {table} SET {assignments} WHERE {key} >= :_lo AND {key} < :_hi" + (f" AND ({where})" if where else "")
+    )
+    return _in_batches(table, statement, where, key, batch_size, pause, params)
+
+
+def copy_rows(
+    source: str,
+    target: str,
+    columns: List[str],
+    where: str | None = None,
+    key: str = "id",
+    batch_size: int | None = None,
+    pause: float | None = None,
+    params: dict | None = None,
+) -> int:
+    """INSERT INTO target SELECT ... FROM source in key ranges (ON CONFLICT DO NOTHING: re-runnable)."""
+    names = ", ".join(columns)
+    statement = sa.text(
+        f"INSERT INTO {target} ({names}) SELECT {names} FROM {source} WHERE {key} >= :_lo AND {key} < :_hi"
+        + (f" AND ({where})" if where else "")
+        + " ON CONFLICT DO NOTHING"
+    )
+    return _in_batches(source, statement, where, key, batch_size, pause, params)
+
+
+def _in_batches(
+    table: str,
+    statement,
+    where: str | None,
+    key: str,
+    batch_size: int | None,
+    pause: float | None,
+    params: dict | None,
+) -> int:
+    batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+    pause = settings.MIGRATION_BATCH_PAUSE if pause is None else pause
+    params = params or {}
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(
+            sa.text(f"SELECT MIN({key}), MAX({key}) FROM {table}" + (f" WHERE {where}" if where else "")), params
+        ).one()
+        if low is None:
+            logger.info("%s: nada que procesar", table)
+            return 0
+
+        span = high - low + 1
+        started = last_report = time.monotonic()
+        for lower in range(low, high + 1, batch_size):
+            upper = min(lower + batch_size, high + 1)
+            total += bind.execute(statement, {**params, "_lo": lower, "_hi": upper}).rowcount
+            now = time.monotonic()
+            if now - last_report >= 10 or upper > high:
+                done = upper - low
+                elapsed = max(now - started, 1e-6)
+                logger.info(
+                    "%s: %.0f%% (%s de %s..%s), %s filas, %.0f filas/s, faltan ~%.0f s",
+                    table,
+                    100 * done / span,
+                    upper - 1,
+                    low,
+                    high,
+                    total,
+                    total / elapsed,
+                    (span - done) * elapsed / done,
+                )
+                last_report = now
+            # respiro para el autovacuum, las replicas y las consultas de la app
+            if pause and upper <= high:
+                time.sleep(pause)
+    return total
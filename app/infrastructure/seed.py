@@ -0,0 +1,200 @@
+"""Initial data (RBAC catalog, demo user and demo training content), outside the migrations.
+
+    alembic upgrade head
+    python -m app.infrastructure.seed             # RBAC + contenido de demostracion
+    python -m app.infrastructure.seed --rbac-only # solo roles y permisos (produccion)
+"""
+
+import argparse
+import logging
+import sys
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("sst.seed")
+
+Rows = List[dict]
+
+
+def _rows(columns: Tuple[str, ...], values: List[tuple]) -> Rows:
+    return [dict(zip(columns, row)) for row in values]
+
+
+RBAC: Dict[str, Rows] = {
+    "roles": _rows(
+        ("id", "name", "code", "description"),
+        [
+            (1, "Administrador", "admin", "Acceso total al sistema"),
+            (2, "Supervisor SST", "supervisor", "Gestiona capacitaciones y checklist"),
+            (3, "Colaborador", "worker", "Consulta y completa capacitaciones"),
+            (4, "Superadministrador", "superadmin", "Acceso total, incluido el avance de todos los modulos"),
+            (5, "Lider SST", "leader", "Crea, asigna y monitorea modulos"),
+        ],
+    ),
+    "permissions": _rows(
+        ("id", "code", "module", "action", "description"),
+        [
+            (1, "training.view", "training", "view", "Ver modulos y lecciones"),
+            (2, "training.complete", "training", "complete", "Marcar lecciones como completadas"),
+            (3, "training.quiz", "training", "quiz", "Presentar y enviar quiz"),
+            (4, "checklist.view", "checklist", "view", "Consultar checklist"),
+            (5, "roles.manage", "admin", "manage_roles", "CRUD roles y permisos"),
+            (6, "users.manage", "admin", "manage_users", "Asignar roles a usuarios"),
+            (7, "training.manage", "training", "manage", "Crear y editar modulos"),
+            (8, "training.assign", "training", "assign", "Asignar modulos a usuarios"),
+            (9, "training.monitor", "training", "monitor", "Ver avance de los asignados"),
+        ],
+    ),
+    "role_permissions": _rows(
+        ("role_id", "permission_id"),
+        [(1, p) for p in range(1, 7)]
+        + [(2, p) for p in range(1, 5)]
+        + [(3, 1), (3, 2), (3, 3)]
+        + [(4, p) for p in range(1, 10)]
+        + [(5, 1), (5, 4), (5, 7), (5, 8), (5, 9)],
+    ),
+}
+
+DEMO: Dict[str, Rows] = {
+    "users": _rows(
+        ("id", "email", "name", "hashed_password", "is_active", "two_factor_enabled"),
+        [(1, "demo@sst.local", "Demo User", "$2b$12$GpCCwcoiFkeI1PhhXONhXeF/qUckNEKZ5HS4edhg9x0BLSldjWFqC", True, True)],
+    ),
+    "user_roles": _rows(("user_id", "role_id"), [(1, 1)]),
+    "checklist_sections": _rows(
+        ("id", "title", "status", "items_completed", "items_total", "percentage"),
+        [
+            (1, "Liderazgo y compromiso", "deficiente", 2, 6, 33),
+            (2, "Participacion de trabajadores", "deficiente", 3, 6, 50),
+            (3, "Investigacion de incidentes", "deficiente", 1, 4, 25),
+            (4, "Capacitacion y formacion", "aprobado", 5, 6, 83),
+            (5, "Auditorias y mejora", "pendiente", 3, 5, 60),
+            (6, "Gestion documental", "pendiente", 2, 4, 50),
+        ],
+    ),
+    "checklist_items": _rows(
+        ("id", "section_id", "text", "status"),
+        [
+            (1, 1, "El empleador proporciona recursos necesarios", "compliant"),
+            (2, 1, "Se realizan reuniones del comite de SST", "compliant"),
+            (3, 1, "Existe liderazgo visible en seguridad", "non-compliant"),
+            (4, 2, "Se consulta a trabajadores sobre SST", "compliant"),
+            (5, 2, "Hay participacion activa de trabajadores", "non-compliant"),
+            (6, 3, "Se investigan accidentes e incidentes", "non-compliant"),
+            (7, 4, "Existe programa anual de capacitacion", "compliant"),
+            (8, 5, "Se realizan auditorias internas", "non-compliant"),
+        ],
+    ),
+    "modules": _rows(
+        ("id", "title", "description", "icon", "color", "due_to_checklist", "checklist_section_id", "quiz_required"),
+        [
+            (1, "Liderazgo en SST", "Rol de la gerencia y comunicacion efectiva en seguridad", "S1", "#2563EB", True, 1, True),
+            (2, "Participacion de trabajadores", "Derechos, consultas y comite de SST", "S2", "#10B981", True, 2, True),
+            (3, "Investigacion de incidentes", "Reporte, investigacion y acciones correctivas", "S3", "#F97316", True, 3, True),
+            (4, "Capacitacion anual", "Planificacion y registro de capacitaciones", "S4", "#F59E0B", False, 4, True),
+            (5, "Auditorias internas", "Plan, ejecucion y seguimiento de auditorias", "S5", "#A855F7", False, 5, True),
+            (6, "Gestion documental", "Politicas, procedimientos y registros clave", "S6", "#4B5563", False, 6, True),
+        ],
+    ),
+    "lessons": _rows(
+        ("id", "module_id", "title", "duration", "type", "image", "display_order"),
+        [
+            (1, 1, "Introduccion al liderazgo en SST", "8 min", "video", "https://images.unsplash.com/photo-1520607162513-77705c0f0d4a", 1),
+            (2, 1, "Comunicacion efectiva y roles", "12 min", "document", "https://images.unsplash.com/photo-1498050108023-c5249f4df085", 2),
+            (3, 1, "Participacion de trabajadores", "10 min", "interactive", "https://images.unsplash.com/photo-1556761175-4b46a572b786", 3),
+            (4, 1, "Plan de accion y seguimiento", "9 min", "video", "https://images.unsplash.com/photo-1497366754035-f200968a6e72", 4),
+            (5, 2, "Derechos y deberes en SST", "10 min", "video", None, 1),
+            (6, 2, "Comite y reuniones de SST", "8 min", "document", None, 2),
+            (7, 2, "Consulta y participacion", "7 min", "interactive", None, 3),
+            (8, 3, "Reporte de incidentes", "9 min", "video", None, 1),
+            (9, 3, "Investigacion y hallazgos", "11 min", "document", None, 2),
+            (10, 3, "Acciones correctivas", "6 min", "interactive", None, 3),
+            (11, 4, "Plan anual de capacitacion", "10 min", "video", None, 1),
+            (12, 4, "Registro y evidencias", "8 min", "document", None, 2),
+            (13, 5, "Plan de auditoria", "10 min", "video", None, 1),
+            (14, 5, "Informe y seguimiento", "12 min", "document", None, 2),
+            (15, 6, "Politicas y procedimientos", "9 min", "document", None, 1),
+            (16, 6, "Control de cambios", "7 min", "interactive", None, 2),
+        ],
+    ),
+    "quiz_questions": _rows(
+        ("id", "module_id", "prompt", "display_order"),
+        [
+            (1, 1, "Quien es el principal responsable de garantizar la seguridad en el trabajo?", 1),
+            (2, 1, "Que debe hacer la gerencia para demostrar liderazgo en SST?", 2),
+            (3, 1, "Que documentacion es clave para evidenciar la capacitacion?", 3),
+        ],
+    ),
+    "quiz_options": _rows(
+        ("id", "question_id", "text", "is_correct"),
+        [
+            (1, 1, "El empleador", True),
+            (2, 1, "Solo el area de seguridad", False),
+            (3, 1, "Cada trabajador individual", False),
+            (4, 1, "El comite de SST", False),
+            (5, 2, "Asignar recursos y participar activamente", True),
+            (6, 2, "Delegar todo al area de seguridad", False),
+            (7, 2, "Publicar un cartel una vez al ano", False),
+            (8, 2, "Esperar a las inspecciones", False),
+            (9, 3, "Registros de asistencia y materiales", True),
+            (10, 3, "Solo correos informales", False),
+            (11, 3, "No se necesita documentacion", False),
+            (12, 3, "Una foto de la sala de capacitacion", False),
+        ],
+    ),
+}
+
+
+def load(db: Session, demo: bool = True) -> Dict[str, int]:
+    """Inserts the missing seed rows (parents first) and commits; returns rows inserted per table."""
+    import app.modules.models  # noqa: F401 - registra las tablas en Base.metadata
+    from app.config.database import Base
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    datasets = {**RBAC, **(DEMO if demo else {})}
+    inserted: Dict[str, int] = {}
+    for table in Base.metadata.sorted_tables:
+        rows = datasets.get(table.name)
+        if not rows:
+            continue
+        # idempotente: nunca pisa filas editadas despues de la carga
+        inserted[table.name] = db.execute(insert(table).values(rows).on_conflict_do_nothing()).rowcount
+        if dialect == "postgresql" and "id" in rows[0]:
+            # ids explicitos: la secuencia se adelanta para los inserts de la API, nunca se retrocede
+            db.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), MAX(id)) FROM {table.name} "
+                    f"HAVING MAX(id) >= (SELECT last_value FROM {table.name}_id_seq)"
+                )
+            )
+    db.commit()
+    return inserted
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Carga los datos iniciales (idempotente)")
+    parser.add_argument("--rbac-only", action="store_true", help="solo roles, permisos y sus relaciones")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level="INFO", format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    from app.config.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        inserted = load(db, demo=not args.rbac_only)
+    finally:
+        db.close()
+    for table, count in inserted.items():
+        print(f"{table}: {count} filas nuevas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
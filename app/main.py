@@ -1,19 +1,159 @@
-from fastapi import FastAPI
-from app.core.middleware import JWTAuthMiddleware
-from app.modules.auth.auth_router import router as auth_router
-from app.modules.training.training_router import router as training_router
-from app.modules.checklist.checklist_router import router as checklist_router
-
-app = FastAPI(title="SST Backend")
-#app.add_middleware(
-#    JWTAuthMiddleware,
-#    excluded_paths={"/auth/login", "/auth/verify-otp", "/auth/refresh", "/health", "/docs", "/openapi.json"},
-#)
-
-app.include_router(auth_router)
-app.include_router(training_router)
-app.include_router(checklist_router)
-
-@app.get("/health")
-def health_check():
-    return {"status": "ok", "service": "sst-backend"}
+"""Application factory; nothing heavy is imported at module level."""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger("sst.app")
+
+
+def warm_up() -> None:
+    """Creates the engine, configures mappers and opens DB_POOL_PREWARM pooled connections."""
+    from sqlalchemy import text
+    from sqlalchemy.orm import configure_mappers
+
+    from app.config.database import get_engine
+    import app.modules.models  # noqa: F401 - registra los mappers antes de configurarlos
+
+    engine = get_engine()
+    configure_mappers()
+    connections = []
+    try:
+        for _ in range(min(settings.DB_POOL_PREWARM, settings.DB_POOL_SIZE)):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    except Exception as exc:
+        # el worker arranca igual; /health/ready reportara la base caida
+        logger.warning("No se pudo precalentar el pool: %s", exc)
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+@asynccontextmanager
+async def lifespan(app: "FastAPI"):
+    from starlette.concurrency import run_in_threadpool
+
+    from app.core.activity import start_activity, stop_activity
+    from app.core.invalidation import start_bus, stop_bus
+    from app.core.scheduler import start_scheduler, stop_scheduler
+    from app.core.security import stop_hash_pool
+    from app.modules.training.training_certificates import stop_certificates
+    from app.modules.training.training_heartbeats import start_heartbeats, stop_heartbeats
+
+    await run_in_threadpool(warm_up)
+    start_bus()
+    start_activity()
+    start_heartbeats()
+    start_scheduler()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    from app.config.database import get_engine
+    from app.core.metrics import registry
+
+    stop_scheduler()
+    stop_certificates()
+    stop_hash_pool()
+    stop_heartbeats()
+    stop_activity()
+    stop_bus()
+    registry.flush()
+    get_engine().dispose()
+
+
+def create_app() -> "FastAPI":
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    from sqlalchemy.exc import OperationalError
+
+    from app.core.deadline import deadline_exceeded_handler, operational_error_handler
+    from app.core.exceptions import DeadlineExceeded
+    from app.core.http_cache import CacheHit, cache_hit_handler
+    from app.core.metrics import render_metrics
+    from app.core.middleware import (
+        CompressionMiddleware,
+        DeadlineMiddleware,
+        HTTPBodyCacheMiddleware,
+        IdempotencyMiddleware,
+        JWTAuthMiddleware,
+        MetricsMiddleware,
+        QueryStatsMiddleware,
+    )
+    from app.modules.auth.auth_router import router as auth_router
+    from app.modules.training.training_router import router as training_router
+    from app.modules.checklist.checklist_router import router as checklist_router
+    from app.modules.search.search_router import router as search_router
+
+    app = FastAPI(title="SST Backend", lifespan=lifespan)
+    #app.add_middleware(
+    #    JWTAuthMiddleware,
+    #    excluded_paths={"/auth/login", "/auth/verify-otp", "/auth/refresh", "/health", "/docs", "/openapi.json"},
+    #)
+
+    if settings.HTTP_CACHE_ENABLED and settings.HTTP_CACHE_BODY_ENTRIES > 0:
+        app.add_middleware(HTTPBodyCacheMiddleware)
+    if settings.IDEMPOTENCY_ENABLED:
+        app.add_middleware(IdempotencyMiddleware)
+    if settings.SQL_INSTRUMENTATION:
+        app.add_middleware(QueryStatsMiddleware)
+    if settings.DEADLINES_ENABLED:
+        app.add_middleware(DeadlineMiddleware)
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        )
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    app.add_exception_handler(CacheHit, cache_hit_handler)
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    app.add_exception_handler(OperationalError, operational_error_handler)
+
+    app.include_router(auth_router)
+    app.include_router(training_router)
+    app.include_router(checklist_router)
+    app.include_router(search_router)
+
+    @app.get("/health")
+    def health_check():
+        # liveness: el proceso responde; no toca la base
+        return {"status": "ok", "service": "sst-backend"}
+
+    @app.get("/health/ready")
+    def readiness_check():
+        from fastapi.responses import JSONResponse
+
+        from app.core.health import check_readiness
+
+        ready, detail = check_readiness(app.state)
+        return JSONResponse({"status": "ready" if ready else "unavailable", **detail}, status_code=200 if ready else 503)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return app
+
+
+_app: "FastAPI | None" = None
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` y `from app.main import app` construyen la app en el primer acceso
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,231 @@
+"""Bulk user provisioning from CSV or JSON, also behind POST /auth/users/import.
+
+    python -m app.modules.auth.auth_provisioning cuadrilla.csv
+    python -m app.modules.auth.auth_provisioning cuadrilla.json --dry-run --hash-workers 8
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.activity import log_event
+from app.core.security import hash_passwords
+from app.modules.auth.auth_schema import UserImportError, UserImportResult, UserImportRow
+from app.modules.auth.auth_service import validate_password_policy
+from app.modules.models import Role, User, UserRole
+
+logger = logging.getLogger("sst.provisioning")
+
+ROLE_SEPARATOR = ";"
+
+
+def parse_users(payload: bytes, content_type: str = "") -> List[dict]:
+    """Raw rows from a CSV or JSON document (format by content type, else sniffed)."""
+    try:
+        document = payload.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo debe estar en UTF-8")
+    is_json = "json" in content_type if content_type else document.lstrip()[:1] in ("[", "{")
+    if is_json:
+        try:
+            data = json.loads(document)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"JSON invalido: {exc}")
+        if isinstance(data, dict):
+            data = data.get("users")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Se esperaba una lista de usuarios")
+        rows = [row if isinstance(row, dict) else {} for row in data]
+        for row in rows:
+            if isinstance(row.get("roles"), str):
+                row["roles"] = _split_roles(row["roles"])
+        return rows
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(document)):
+        row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+        row["roles"] = _split_roles(row.get("roles", ""))
+        if row.get("two_factor_enabled") == "":
+            del row["two_factor_enabled"]
+        rows.append(row)
+    return rows
+
+
+def _split_roles(value: str) -> List[str]:
+    return [code.strip() for code in value.split(ROLE_SEPARATOR) if code.strip()]
+
+
+class UserImporter:
+    def __init__(self, db: Session, hash_workers: int | None = None):
+        self.db = db
+        self.hash_workers = hash_workers or settings.USER_IMPORT_HASH_WORKERS
+        self._role_ids: dict = {}
+
+    def run(self, raw_rows: List[dict], actor_id: int | None = None, dry_run: bool = False) -> UserImportResult:
+        valid, errors = self.validate(raw_rows)
+        result = UserImportResult(received=len(raw_rows), created=0, dry_run=dry_run, errors=errors)
+        # el hash tarda segundos: la conexion no queda "idle in transaction" mientras tanto
+        self.db.rollback()
+        if dry_run or not valid:
+            return result
+
+        started = time.perf_counter()
+        hashes = hash_passwords([row.password for _, row in valid], self.hash_workers)
+        hashed_at = time.perf_counter()
+        result.created, skipped = self._load(valid, hashes, actor_id)
+        result.errors = sorted(errors + skipped, key=lambda error: error.row)
+        logger.info(
+            "Importados %s usuarios (%s rechazados): hash %.1fs, carga %.1fs",
+            result.created,
+            len(result.errors),
+            hashed_at - started,
+            time.perf_counter() - hashed_at,
+        )
+        return result
+
+    def validate(self, raw_rows: List[dict]) -> Tuple[List[Tuple[int, UserImportRow]], List[UserImportError]]:
+        """(row number, row) for the valid rows and the errors of the rest; row numbers start at 1."""
+        self._role_ids = role_ids = dict(self.db.query(Role.code, Role.id).all())
+        emails = [row["email"].strip() for row in raw_rows if isinstance(row.get("email"), str)]
+        existing = {email for (email,) in self.db.query(User.email).filter(User.email.in_(emails))} if emails else set()
+
+        valid: List[Tuple[int, UserImportRow]] = []
+        errors: List[UserImportError] = []
+        seen = set()
+        for number, raw in enumerate(raw_rows, start=1):
+            email = raw.get("email") if isinstance(raw.get("email"), str) else None
+            try:
+                row = UserImportRow.model_validate(raw)
+                row.email, row.name = row.email.strip(), row.name.strip()
+                self._check_row(row, role_ids, existing, seen)
+            except ValidationError as exc:
+                first = exc.errors()[0]
+                field = ".".join(str(part) for part in first["loc"]) or "fila"
+                errors.append(UserImportError(row=number, email=email, detail=f"{field}: {first['msg']}"))
+                continue
+            except HTTPException as exc:
+                errors.append(UserImportError(row=number, email=email, detail=exc.detail))
+                continue
+            seen.add(row.email)
+            valid.append((number, row))
+        return valid, errors
+
+    def _check_row(self, row: UserImportRow, role_ids: dict, existing: set, seen: set) -> None:
+        local, _, domain = row.email.partition("@")
+        if not local or not domain or " " in row.email:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email invalido")
+        if not row.name:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El nombre es obligatorio")
+        if row.email in existing:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El email ya esta registrado")
+        if row.email in seen:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email repetido en el archivo")
+        if not row.roles:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe indicar al menos un rol")
+        unknown = sorted(set(row.roles) - set(role_ids))
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Roles no encontrados: {unknown}")
+        validate_password_policy(row.password)
+
+    def _load(
+        self, valid: List[Tuple[int, UserImportRow]], hashes: List[str], actor_id: int | None
+    ) -> Tuple[int, List[UserImportError]]:
+        """Inserts the rows; emails registered since validate() are skipped and reported as errors."""
+        role_ids = self._role_ids
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+
+            # seed_data inserta ids explicitos sin mover la secuencia: solo se adelanta, nunca se retrocede
+            self.db.execute(
+                text(
+                    "SELECT setval('users_id_seq', MAX(id)) FROM users "
+                    "HAVING MAX(id) >= (SELECT last_value FROM users_id_seq)"
+                )
+            )
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        try:
+            # insertmanyvalues: INSERT multi-fila por lotes con RETURNING de los ids
+            statement = insert(User).on_conflict_do_nothing(index_elements=[User.email])
+            created = dict(
+                self.db.execute(
+                    statement.returning(User.email, User.id),
+                    [
+                        {
+                            "email": row.email,
+                            "name": row.name,
+                            "hashed_password": hashed,
+                            "is_active": True,
+                            "two_factor_enabled": row.two_factor_enabled,
+                        }
+                        for (_, row), hashed in zip(valid, hashes)
+                    ],
+                ).all()
+            )
+            user_roles = [
+                {"user_id": created[row.email], "role_id": role_ids[code]}
+                for _, row in valid
+                if row.email in created
+                for code in dict.fromkeys(row.roles)
+            ]
+            if user_roles:
+                self.db.execute(insert(UserRole), user_roles)
+            log_event(self.db, "users_imported", actor_id, created=len(created))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        # creados por otra solicitud entre la validacion y la carga
+        skipped = [
+            UserImportError(row=number, email=row.email, detail="El email ya esta registrado")
+            for number, row in valid
+            if row.email not in created
+        ]
+        return len(created), skipped
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "path", help='archivo .csv (email,name,password,roles[,two_factor_enabled]; roles separados por ";") o .json'
+    )
+    parser.add_argument("--dry-run", action="store_true", help="solo validar, no crear usuarios")
+    parser.add_argument("--hash-workers", type=int, help="procesos para el hash (por defecto: CPUs disponibles)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level="INFO", format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    from app.config.database import SessionLocal
+    from app.serve import available_cpus
+
+    with open(args.path, "rb") as fh:
+        payload = fh.read()
+    content_type = "application/json" if args.path.lower().endswith(".json") else "text/csv"
+    db = SessionLocal()
+    try:
+        importer = UserImporter(db, args.hash_workers or available_cpus())
+        result = importer.run(parse_users(payload, content_type), dry_run=args.dry_run)
+    except HTTPException as exc:
+        logger.error("%s", exc.detail)
+        return 1
+    finally:
+        db.close()
+    for error in result.errors:
+        print(f"fila {error.row} ({error.email or '-'}): {error.detail}")
+    print(f"{result.received} filas, {result.created} creados, {len(result.errors)} con error")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,16 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from app.config.settings import settings
+
+from app.core.http_cache import http_cache
+from app.core.instrumentation import query_budget
+from app.core.pagination import Page, PageParams, page_params, page_response
+from app.core.rate_limit import rate_limit
+from app.core.responses import TrustedJSONRoute
+from app.core.security import decode_claims
 from app.infrastructure.respository import get_db
 from app.modules.auth.auth_schema import (
     AssignPermissionsRequest,
@@ -16,49 +25,82 @@ from app.modules.auth.auth_schema import (
     RoleCreateRequest,
     RoleOut,
     RoleUpdateRequest,
+    UserImportResult,
     UserOut,
 )
+from app.modules.auth.auth_provisioning import UserImporter, parse_users
 from app.modules.auth.auth_service import AuthService, get_current_user, require_permissions
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=TrustedJSONRoute)
+
+
+def _login_account(body: dict) -> str | None:
+    email = body.get("email")
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+def _otp_account(body: dict) -> str | None:
+    # el usuario del pending token: limita los intentos de codigo aunque se repita el login
+    claims = decode_claims(body["pending_token"], "pending") if isinstance(body.get("pending_token"), str) else None
+    return claims["sub"] if claims else None
 
 
-@router.post("/login", response_model=LoginChallenge | AuthResponse)
+@router.post(
+    "/login",
+    response_model=LoginChallenge | AuthResponse,
+    dependencies=[Depends(rate_limit("login", _login_account)), Depends(query_budget(6))],
+)
 def login(payload: LoginRequest, db: Session = Depends(get_db)):
     service = AuthService(db)
     return service.login(payload.email, payload.password)
 
 
-@router.post("/verify-otp", response_model=AuthResponse)
+@router.post(
+    "/verify-otp",
+    response_model=AuthResponse,
+    dependencies=[Depends(rate_limit("verify-otp", _otp_account)), Depends(query_budget(8))],
+)
 def verify_otp(payload: OTPVerifyRequest, db: Session = Depends(get_db)):
     service = AuthService(db)
     return service.verify_otp(payload.pending_token, payload.code)
 
 
-@router.post("/refresh", response_model=AuthResponse)
+@router.post(
+    "/refresh",
+    response_model=AuthResponse,
+    dependencies=[Depends(query_budget(5))],
+)
 def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
     service = AuthService(db)
     return service.refresh_session(payload.refresh_token)
 
 
-@router.get("/me", response_model=UserOut)
+@router.get(
+    "/me",
+    response_model=UserOut,
+    dependencies=[Depends(query_budget(2))],
+)
 def me(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
     return AuthService(db)._serialize_user(current_user)  # type: ignore
 
 
 @router.get(
     "/roles",
-    response_model=List[RoleOut],
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    response_model=List[RoleOut] | Page[RoleOut],
+    dependencies=[
+        Depends(http_cache([], ["roles.manage"])),
+        Depends(query_budget(4)),
+        Depends(require_permissions(["roles.manage"])),
+    ],
 )
-def list_roles(db: Session = Depends(get_db)):
-    return AuthService(db).list_roles()
+def list_roles(response: Response, page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
+    return page_response(AuthService(db).list_roles(page), page, response)
 
 
 @router.post(
     "/roles",
     response_model=RoleOut,
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    dependencies=[Depends(query_budget(9)), Depends(require_permissions(["roles.manage"]))],
 )
 def create_role(payload: RoleCreateRequest, db: Session = Depends(get_db)):
     return AuthService(db).create_role(payload)
@@ -67,7 +109,7 @@ def create_role(payload: RoleCreateRequest, db: Session = Depends(get_db)):
 @router.put(
     "/roles/{role_id}",
     response_model=RoleOut,
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    dependencies=[Depends(query_budget(8)), Depends(require_permissions(["roles.manage"]))],
 )
 def update_role(role_id: int, payload: RoleUpdateRequest, db: Session = Depends(get_db)):
     return AuthService(db).update_role(role_id, payload)
@@ -76,7 +118,7 @@ def update_role(role_id: int, payload: RoleUpdateRequest, db: Session = Depends(
 @router.post(
     "/roles/{role_id}/permissions",
     response_model=RoleOut,
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    dependencies=[Depends(query_budget(8)), Depends(require_permissions(["roles.manage"]))],
 )
 def assign_role_permissions(role_id: int, payload: AssignPermissionsRequest, db: Session = Depends(get_db)):
     return AuthService(db).assign_permissions(role_id, payload)
@@ -84,17 +126,21 @@ def assign_role_permissions(role_id: int, payload: AssignPermissionsRequest, db:
 
 @router.get(
     "/permissions",
-    response_model=List[PermissionOut],
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    response_model=List[PermissionOut] | Page[PermissionOut],
+    dependencies=[
+        Depends(http_cache([], ["roles.manage"])),
+        Depends(query_budget(4)),
+        Depends(require_permissions(["roles.manage"])),
+    ],
 )
-def list_permissions(db: Session = Depends(get_db)):
-    return AuthService(db).list_permissions()
+def list_permissions(response: Response, page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
+    return page_response(AuthService(db).list_permissions(page), page, response)
 
 
 @router.post(
     "/permissions",
     response_model=PermissionOut,
-    dependencies=[Depends(require_permissions(["roles.manage"]))],
+    dependencies=[Depends(query_budget(5)), Depends(require_permissions(["roles.manage"]))],
 )
 def create_permission(payload: PermissionCreateRequest, db: Session = Depends(get_db)):
     return AuthService(db).create_permission(payload)
@@ -103,8 +149,30 @@ def create_permission(payload: PermissionCreateRequest, db: Session = Depends(ge
 @router.post(
     "/users/{user_id}/roles",
     response_model=UserOut,
-    dependencies=[Depends(require_permissions(["users.manage"]))],
+    dependencies=[Depends(query_budget(8)), Depends(require_permissions(["users.manage"]))],
 )
 def assign_roles_to_user(user_id: int, payload: AssignUserRolesRequest, db: Session = Depends(get_db)):
     user = AuthService(db).assign_roles_to_user(user_id, payload)
     return AuthService(db)._serialize_user(user)  # type: ignore
+
+
+@router.post(
+    "/users/import",
+    response_model=UserImportResult,
+    # USER_IMPORT_MAX_ROWS acota el hash a la fecha limite general; las cargas grandes van por el comando
+    dependencies=[Depends(query_budget(20))],
+)
+async def import_users(
+    request: Request,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["users.manage"])),
+):
+    """CSV (text/csv) or JSON body; rejected rows are reported, the rest created in one transaction."""
+    rows = parse_users(await request.body(), request.headers.get("content-type", ""))
+    if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Maximo {settings.USER_IMPORT_MAX_ROWS} usuarios por solicitud; use el comando de importacion",
+        )
+    return await run_in_threadpool(UserImporter(db).run, rows, current_user.id, dry_run)
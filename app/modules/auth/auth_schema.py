@@ -86,3 +86,24 @@ class AuthResponse(BaseModel):
 
 class RefreshRequest(BaseModel):
     refresh_token: str
+
+
+class UserImportRow(BaseModel):
+    email: str
+    name: str
+    password: str
+    roles: List[str] = []
+    two_factor_enabled: bool = True
+
+
+class UserImportError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    detail: str
+
+
+class UserImportResult(BaseModel):
+    received: int
+    created: int
+    dry_run: bool = False
+    errors: List[UserImportError] = []
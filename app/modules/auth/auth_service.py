@@ -4,10 +4,12 @@ from typing import Iterable, List, Set
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError
 from sqlalchemy.orm import Session, joinedload
 
 from app.config.settings import settings
+from app.core.activity import log_event
+from app.core.invalidation import publish
+from app.core.pagination import Page, PageParams, paginate
 from app.core.security import (
     create_access_token,
     create_pending_token,
@@ -22,7 +24,9 @@ from app.modules.auth.auth_schema import (
     AssignPermissionsRequest,
     AssignUserRolesRequest,
     PermissionCreateRequest,
+    PermissionOut,
     RoleCreateRequest,
+    RoleOut,
     RoleUpdateRequest,
     TokenResponse,
     UserOut,
@@ -64,6 +68,7 @@ class AuthService:
 
         # Si 2FA está desactivado, saltamos OTP para entornos de prueba.
         if not user.two_factor_enabled:
+            log_event(self.db, "login", user.id, two_factor=False)
             return self._build_auth_response(user)
 
         otp, _raw_code = self._create_otp(user)
@@ -96,8 +101,9 @@ class AuthService:
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
         user.last_login_at = datetime.utcnow()
+        log_event(self.db, "login", user.id, two_factor=True)
         self.db.commit()
-        self.db.refresh(user)
+        user = self._get_user_with_relations(user_id=user_id)
 
         return self._build_auth_response(user)
 
@@ -120,26 +126,34 @@ class AuthService:
         if not user or not user.is_active:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
 
+        # la revocacion se confirma junto con el nuevo refresh token
         token_row.revoked = True
-        self.db.commit()
         return self._build_auth_response(user)
 
     def me(self, user: User) -> dict:
         return {"user": self._serialize_user(user)}
 
-    def list_roles(self) -> List[Role]:
-        return self.db.query(Role).options(joinedload(Role.permissions)).all()
+    def list_roles(self, page: PageParams | None = None) -> Page[RoleOut]:
+        roles, next_cursor, total = paginate(self.db.query(Role).options(joinedload(Role.permissions)), [Role.id], page)
+        return Page[RoleOut](
+            items=[RoleOut.model_validate(role) for role in roles], next_cursor=next_cursor, total=total
+        )
 
-    def list_permissions(self) -> List[Permission]:
-        return self.db.query(Permission).all()
+    def list_permissions(self, page: PageParams | None = None) -> Page[PermissionOut]:
+        permissions, next_cursor, total = paginate(self.db.query(Permission), [Permission.id], page)
+        return Page[PermissionOut](
+            items=[PermissionOut.model_validate(permission) for permission in permissions],
+            next_cursor=next_cursor,
+            total=total,
+        )
 
     def create_role(self, payload: RoleCreateRequest) -> Role:
         role = Role(name=payload.name, code=payload.code, description=payload.description)
+        if payload.permission_codes:
+            role.permissions = self._permissions_by_code(payload.permission_codes)
         self.db.add(role)
+        publish(self.db, "authz")
         self.db.commit()
-        self.db.refresh(role)
-        if payload.permission_codes:
-            self._sync_role_permissions(role, payload.permission_codes)
         return self._get_role_with_permissions(role.id)
 
     def update_role(self, role_id: int, payload: RoleUpdateRequest) -> Role:
@@ -149,14 +163,17 @@ class AuthService:
         role.name = payload.name
         role.code = payload.code
         role.description = payload.description
-        self.db.commit()
+        publish(self.db, "authz")
         if payload.permission_codes is not None:
             self._sync_role_permissions(role, payload.permission_codes)
+        else:
+            self.db.commit()
         return self._get_role_with_permissions(role_id)
 
     def create_permission(self, payload: PermissionCreateRequest) -> Permission:
         perm = Permission(code=payload.code, module=payload.module, action=payload.action, description=payload.description)
         self.db.add(perm)
+        publish(self.db, "authz")
         self.db.commit()
         self.db.refresh(perm)
         return perm
@@ -165,31 +182,62 @@ class AuthService:
         role = self._get_role_with_permissions(role_id)
         if not role:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rol no encontrado")
+        publish(self.db, "authz")
         self._sync_role_permissions(role, payload.permission_codes)
         return self._get_role_with_permissions(role_id)
 
     def assign_roles_to_user(self, user_id: int, payload: AssignUserRolesRequest) -> User:
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.query(User).options(joinedload(User.roles)).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
         roles = self.db.query(Role).filter(Role.code.in_(payload.role_codes)).all()
         if not roles:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Roles no encontrados")
         user.roles = roles
+        publish(self.db, "authz")
         self.db.commit()
-        self.db.refresh(user)
-        return self._get_user_with_relations(user_id=user.id)
+        return self._get_user_with_relations(user_id=user_id)
+
+    # -------------------------
+    # Mantenimiento (scheduler)
+    # -------------------------
+    def purge_expired_otps(self, batch_size: int) -> int:
+        condition = TwoFactorCode.expires_at < datetime.utcnow()
+        return self._delete_in_batches(TwoFactorCode, condition, TwoFactorCode.expires_at, batch_size)
+
+    def purge_refresh_tokens(self, batch_size: int) -> int:
+        """Deletes expired and revoked refresh tokens."""
+        # dos pasadas, cada una por su indice (un OR entre ambas recorre la tabla completa)
+        condition = RefreshToken.expires_at < datetime.utcnow()
+        deleted = self._delete_in_batches(RefreshToken, condition, RefreshToken.expires_at, batch_size)
+        return deleted + self._delete_in_batches(RefreshToken, RefreshToken.revoked, RefreshToken.id, batch_size)
+
+    def _delete_in_batches(self, model, condition, key, batch_size: int) -> int:
+        # lotes cortos con commit propio: no se retienen locks sobre la tabla completa. Cada lote sigue
+        # desde la ultima `key` borrada en vez de recorrer el indice desde el principio (>= por los
+        # empates: lo ya borrado no vuelve a salir)
+        deleted = 0
+        last = None
+        while True:
+            query = self.db.query(model.id, key).filter(condition)
+            if last is not None:
+                query = query.filter(key >= last)
+            rows = query.order_by(key).limit(batch_size).all()
+            if not rows:
+                return deleted
+            ids = [row_id for row_id, _ in rows]
+            last = rows[-1][1]
+            self.db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            self.db.commit()
+            deleted += len(ids)
+            if len(ids) < batch_size:
+                return deleted
 
     # -------------------------
     # Helpers
     # -------------------------
     def _create_otp(self, user: User) -> tuple[TwoFactorCode, str]:
-        # limpiar tokens vencidos previos
-        self.db.query(TwoFactorCode).filter(
-            TwoFactorCode.user_id == user.id,
-            TwoFactorCode.purpose == "login",
-            TwoFactorCode.expires_at < datetime.utcnow(),
-        ).delete()
+        # los codigos vencidos los purga el scheduler (purge_expired_otps), no el login
         code = f"{random.randint(0, 999999):06d}"
         hashed_code = hash_token(code)
         expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
@@ -266,10 +314,11 @@ class AuthService:
         return f"{name[0]}***{name[-1]}@{domain}"
 
     def _sync_role_permissions(self, role: Role, permission_codes: Iterable[str]) -> None:
-        perms = self.db.query(Permission).filter(Permission.code.in_(list(permission_codes))).all()
-        role.permissions = perms
+        role.permissions = self._permissions_by_code(permission_codes)
         self.db.commit()
-        self.db.refresh(role)
+
+    def _permissions_by_code(self, permission_codes: Iterable[str]) -> List[Permission]:
+        return self.db.query(Permission).filter(Permission.code.in_(list(permission_codes))).all()
 
     def _get_user_with_relations(self, user_id: int | None = None, email: str | None = None) -> User | None:
         query = self.db.query(User).options(joinedload(User.roles).joinedload(Role.permissions))
@@ -296,12 +345,7 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token")
 
     token = credentials.credentials
-    try:
-        payload = decode_token(token, expected_type="access")
-    except HTTPException:
-        raise
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
+    payload = decode_token(token, expected_type="access")
 
     user_id = payload.get("sub")
     if not user_id:
@@ -332,3 +376,20 @@ def require_permissions(permissions: List[str]):
         return user
 
     return wrapper
+
+
+def require_claims(permissions: List[str]):
+    """Like require_permissions but trusts the access token claims and skips the DB."""
+    # solo endpoints de alta frecuencia (heartbeats): un rol revocado sigue valiendo hasta que expira el token
+
+    def wrapper(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+        if credentials is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token")
+        payload = decode_token(credentials.credentials, expected_type="access")
+        if not payload.get("sub"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
+        if not set(permissions).issubset(payload.get("permissions") or []):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permisos insuficientes")
+        return payload
+
+    return wrapper
@@ -1,24 +1,38 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
+from app.core.http_cache import http_cache
+from app.core.instrumentation import query_budget
+from app.core.pagination import Page, PageParams, page_params, page_response
+from app.core.responses import TrustedJSONRoute
 from app.infrastructure.respository import get_db
 from app.modules.auth.auth_service import require_permissions
 from app.modules.checklist.checklist_schema import ChecklistDetail, ChecklistSectionOut
 from app.modules.checklist.checklist_service import ChecklistService
 
-router = APIRouter(prefix="/checklist", tags=["Checklist"])
+router = APIRouter(prefix="/checklist", tags=["Checklist"], route_class=TrustedJSONRoute)
 
 
-@router.get("/", response_model=list[ChecklistSectionOut])
+@router.get(
+    "/",
+    response_model=list[ChecklistSectionOut] | Page[ChecklistSectionOut],
+    dependencies=[Depends(http_cache(["checklist"], ["checklist.view"])), Depends(query_budget(4))],
+)
 def list_sections(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user=Depends(require_permissions(["checklist.view"])),
 ):
     service = ChecklistService(db)
-    return service.list_sections()
+    return page_response(service.list_sections(page), page, response)
 
 
-@router.get("/{section_id}", response_model=ChecklistDetail)
+@router.get(
+    "/{section_id}",
+    response_model=ChecklistDetail,
+    dependencies=[Depends(http_cache(["checklist"], ["checklist.view"])), Depends(query_budget(4))],
+)
 def get_section(
     section_id: int,
     db: Session = Depends(get_db),
@@ -1,7 +1,8 @@
 from typing import List
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
+from app.core.pagination import Page, PageParams, paginate
 from app.modules.models import ChecklistItem, ChecklistSection
 from app.modules.checklist.checklist_schema import ChecklistDetail, ChecklistItemOut, ChecklistSectionOut
 
@@ -10,8 +11,10 @@ class ChecklistService:
     def __init__(self, db: Session):
         self.db = db
 
-    def list_sections(self) -> List[ChecklistSectionOut]:
-        sections = self.db.query(ChecklistSection).all()
+    def list_sections(self, page: PageParams | None = None) -> Page[ChecklistSectionOut]:
+        sections, next_cursor, total = paginate(
+            self.db.query(ChecklistSection).options(joinedload(ChecklistSection.module)), [ChecklistSection.id], page
+        )
         response: List[ChecklistSectionOut] = []
         for section in sections:
             linked_module_id = None
@@ -29,10 +32,15 @@ class ChecklistService:
                     checklist_module_id=linked_module_id,
                 )
             )
-        return response
+        return Page[ChecklistSectionOut](items=response, next_cursor=next_cursor, total=total)
 
     def section_detail(self, section_id: int) -> ChecklistDetail:
-        section = self.db.query(ChecklistSection).filter(ChecklistSection.id == section_id).first()
+        section = (
+            self.db.query(ChecklistSection)
+            .options(joinedload(ChecklistSection.module))
+            .filter(ChecklistSection.id == section_id)
+            .first()
+        )
         if not section:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sección no encontrada")
 
@@ -1,8 +1,9 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Identity, Index, Integer, LargeBinary, String, Text, UniqueConstraint, event, func, select, text
 from sqlalchemy.orm import relationship
 
 from app.config.database import Base
+from app.core.partitions import ensure_monthly_partitions
 
 
 class User(Base):
@@ -19,6 +20,7 @@ class User(Base):
 
     lesson_progress = relationship("UserLessonProgress", back_populates="user", cascade="all, delete-orphan")
     quiz_attempts = relationship("QuizAttempt", back_populates="user", cascade="all, delete-orphan")
+    quiz_attempt_summaries = relationship("QuizAttemptSummary", back_populates="user", cascade="all, delete-orphan")
     roles = relationship("Role", secondary="user_roles", back_populates="users")
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
     two_factor_codes = relationship("TwoFactorCode", back_populates="user", cascade="all, delete-orphan")
@@ -80,6 +82,11 @@ class RolePermission(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+        # purga de revocados: indice parcial, solo crece con las sesiones cerradas
+        Index("ix_refresh_tokens_revoked", "id", postgresql_where=text("revoked"), sqlite_where=text("revoked")),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -93,6 +100,7 @@ class RefreshToken(Base):
 
 class TwoFactorCode(Base):
     __tablename__ = "two_factor_codes"
+    __table_args__ = (Index("ix_two_factor_codes_expires_at", "expires_at"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -122,6 +130,7 @@ class ChecklistSection(Base):
 
 class ChecklistItem(Base):
     __tablename__ = "checklist_items"
+    __table_args__ = (Index("ix_checklist_items_section_id", "section_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     section_id = Column(Integer, ForeignKey("checklist_sections.id"), nullable=False)
@@ -148,13 +157,18 @@ class Module(Base):
     lessons = relationship("Lesson", back_populates="module", cascade="all, delete-orphan")
     quiz_questions = relationship("QuizQuestion", back_populates="module", cascade="all, delete-orphan")
     quiz_attempts = relationship("QuizAttempt", back_populates="module", cascade="all, delete-orphan")
+    quiz_attempt_summaries = relationship("QuizAttemptSummary", back_populates="module", cascade="all, delete-orphan")
     owner = relationship("User", foreign_keys=[owner_id])
     assignments = relationship("ModuleAssignment", back_populates="module", cascade="all, delete-orphan")
 
 
 class ModuleAssignment(Base):
     __tablename__ = "module_assignments"
-    __table_args__ = (UniqueConstraint("user_id", "module_id", name="uq_user_module"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "module_id", name="uq_user_module"),
+        Index("ix_module_assignments_user_id", "user_id"),
+        Index("ix_module_assignments_module_assigned_by", "module_id", "assigned_by"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
@@ -184,7 +198,10 @@ class Lesson(Base):
 
 class UserLessonProgress(Base):
     __tablename__ = "user_lesson_progress"
-    __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson"),
+        Index("ix_user_lesson_progress_user_completed", "user_id", "completed"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -196,8 +213,28 @@ class UserLessonProgress(Base):
     lesson = relationship("Lesson", back_populates="progresses")
 
 
+class LessonTimeOnTask(Base):
+    """Seconds spent per (user, lesson), upserted in batches from the heartbeat aggregator."""
+
+    __tablename__ = "lesson_time_on_task"
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_time_on_task_user_lesson"),
+        Index("ix_lesson_time_on_task_lesson_id", "lesson_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # sin FK: un flush pendiente no debe fallar si la leccion se borro entre tanto
+    user_id = Column(Integer, nullable=False)
+    lesson_id = Column(Integer, nullable=False)
+    seconds = Column(Integer, nullable=False, default=0)
+    heartbeats = Column(Integer, nullable=False, default=0)
+    first_seen_at = Column(DateTime, nullable=False)
+    last_seen_at = Column(DateTime, nullable=False)
+
+
 class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
+    __table_args__ = (Index("ix_quiz_questions_module_order", "module_id", "display_order"),)
 
     id = Column(Integer, primary_key=True, index=True)
     module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
@@ -210,6 +247,7 @@ class QuizQuestion(Base):
 
 class QuizOption(Base):
     __tablename__ = "quiz_options"
+    __table_args__ = (Index("ix_quiz_options_question_id", "question_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(Integer, ForeignKey("quiz_questions.id"), nullable=False)
@@ -220,16 +258,139 @@ class QuizOption(Base):
 
 
 class QuizAttempt(Base):
+    """Append-only quiz history; on PostgreSQL partitioned by month, old months rolled up into QuizAttemptSummary."""
+
     __tablename__ = "quiz_attempts"
+    __table_args__ = (
+        Index("ix_quiz_attempts_module_user_created", "module_id", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # PostgreSQL exige la columna de particion en la PK
+    id = Column(Integer, Identity(), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
     score = Column(Integer, nullable=False)  # percentage
     correct_answers = Column(Integer, nullable=False)
     total_questions = Column(Integer, nullable=False)
     passed = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
 
     user = relationship("User", back_populates="quiz_attempts")
     module = relationship("Module", back_populates="quiz_attempts")
+
+
+class QuizAttemptSummary(Base):
+    """Rollup of archived quiz attempts (training_archive); each attempt is counted here or in quiz_attempts."""
+
+    __tablename__ = "quiz_attempt_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    module_id = Column(Integer, ForeignKey("modules.id"), primary_key=True)
+    attempts = Column(Integer, nullable=False)
+    best_score = Column(Integer, nullable=False)
+    first_passed_at = Column(DateTime, nullable=True)
+    first_pass_score = Column(Integer, nullable=True)
+    last_score = Column(Integer, nullable=False)
+    last_attempt_at = Column(DateTime, nullable=False)
+
+    user = relationship("User", back_populates="quiz_attempt_summaries")
+    module = relationship("Module", back_populates="quiz_attempt_summaries")
+
+
+@event.listens_for(QuizAttempt, "before_insert")
+def _next_quiz_attempt_id(mapper, connection, target) -> None:
+    # SQLite (sustituto local) no genera ids en una PK compuesta: MAX(id) + 1 dentro del mismo INSERT
+    if target.id is None and connection.dialect.name == "sqlite":
+        table = QuizAttempt.__table__
+        target.id = select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery()
+
+
+class RateLimitBucket(Base):
+    """Shared GCRA buckets of app.core.rate_limit (RATE_LIMIT_BACKEND=postgres)."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)  # <ruta>:<alcance>:<valor>
+    tat = Column(Float, nullable=False)  # theoretical arrival time, epoch en segundos
+
+
+class IdempotencyKey(Base):
+    """Idempotency-Key claims and stored responses of app.core.idempotency (IDEMPOTENCY_BACKEND=database)."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    sub = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(32), nullable=False)  # metodo, ruta y hash del cuerpo
+    status = Column(String(16), nullable=False)  # running | done
+    status_code = Column(Integer, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    media_type = Column(String(255), nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class CacheVersion(Base):
+    """Committed version of each cache key in app.core.invalidation.VERSIONED_PREFIXES (HTTP ETags)."""
+
+    __tablename__ = "cache_versions"
+
+    key = Column(String(255), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+
+
+class ActivityEvent(Base):
+    """Append-only audit trail, written in batches by app.core.activity (never through the ORM session)."""
+
+    __tablename__ = "activity_events"
+    __table_args__ = (
+        Index("ix_activity_events_user_occurred", "user_id", "occurred_at"),
+        Index("ix_activity_events_module_occurred", "module_id", "occurred_at"),
+        # particiones mensuales (activity_events_YYYYMM): las crea y retira el scheduler
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    # PostgreSQL exige la columna de particion en la PK
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True)
+    occurred_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    event_type = Column(String(32), nullable=False)  # login | lesson_completed | quiz_submitted | module_assigned
+    user_id = Column(Integer, nullable=True)  # sin FK: el registro sobrevive al borrado del usuario
+    module_id = Column(Integer, nullable=True)
+    lesson_id = Column(Integer, nullable=True)
+    data = Column(JSON, nullable=True)
+
+
+@event.listens_for(QuizAttempt.__table__, "after_create")
+@event.listens_for(ActivityEvent.__table__, "after_create")
+def _monthly_partitions(table, connection, **kw) -> None:
+    # esquemas creados con create_all (harness, datasets): mes en curso, el siguiente y DEFAULT;
+    # los meses posteriores los crea el scheduler
+    if connection.dialect.name == "postgresql":
+        ensure_monthly_partitions(connection, table.name, 1)
+
+
+# tsvector de busqueda (config spanish) por tabla: columna generada + indice GIN, solo en PostgreSQL.
+# No se mapea en el ORM (SQLite no la tiene); SearchService la referencia por nombre
+SEARCH_VECTORS = {
+    "modules": (
+        "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(description, '')), 'B')"
+    ),
+    "lessons": "setweight(to_tsvector('spanish', coalesce(title, '')), 'A')",
+    "quiz_questions": "setweight(to_tsvector('spanish', coalesce(prompt, '')), 'B')",
+    "checklist_items": "setweight(to_tsvector('spanish', coalesce(text, '')), 'B')",
+}
+
+
+def _add_search_vector(table, connection, **kw) -> None:
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table.name} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({SEARCH_VECTORS[table.name]}) STORED"
+        )
+        connection.exec_driver_sql(f"CREATE INDEX ix_{table.name}_search_vector ON {table.name} USING gin (search_vector)")
+
+
+for _model in (Module, Lesson, QuizQuestion, ChecklistItem):
+    event.listen(_model.__table__, "after_create", _add_search_vector)
@@ -0,0 +1 @@
+# Package for full-text search over training content and checklist items
@@ -0,0 +1,142 @@
+"""In-memory inverted index: the /search fallback when the database is not PostgreSQL."""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.core.invalidation import subscribe
+
+SEARCH_KEY = "search"
+WEIGHT_A = 1.0  # pesos por defecto de ts_rank para A y B
+WEIGHT_B = 0.4
+SNIPPET_WORDS = 35
+
+_WORD = re.compile(r"\w+")
+STOP_WORDS = frozenset(
+    "a al algo con como de del el ella en entre es esta este esto hay la las le lo los mas me mi mis muy ni no "
+    "o para pero por que se sin sobre su sus te tu un una uno unos y ya".split()
+)
+
+
+@dataclass
+class SearchDocument:
+    type: str
+    id: int
+    module_id: int | None
+    section_id: int | None
+    title: str
+    body: str
+    fields: Tuple[Tuple[str, float], ...]
+
+
+def fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD.findall(fold(text)) if len(word) > 1 and word not in STOP_WORDS]
+
+
+class InvertedIndex:
+    def __init__(self, documents: List[SearchDocument]):
+        self.documents = documents
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for position, document in enumerate(documents):
+            for text, weight in document.fields:
+                for word in tokenize(text):
+                    postings = self._postings[word]
+                    postings[position] = postings.get(position, 0.0) + weight
+        self._vocabulary = sorted(self._postings)
+
+    def search(
+        self, query: str, accept: Callable[[SearchDocument], bool], limit: int
+    ) -> List[Tuple[SearchDocument, float, List[str]]]:
+        """(document, rank, query terms) of the best matches, rank normalized to [0, 1)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[int, float] | None = None
+        for term in terms:
+            matched: Dict[int, float] = {}
+            for word in self._expand(term):
+                postings = self._postings[word]
+                idf = math.log(1 + len(self.documents) / len(postings))
+                for position, weight in postings.items():
+                    matched[position] = matched.get(position, 0.0) + weight * idf
+            scores = matched if scores is None else {p: s + matched[p] for p, s in scores.items() if p in matched}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        hits = [(self.documents[p], score / (score + 1), terms) for p, score in scores.items() if accept(self.documents[p])]
+        hits.sort(key=lambda hit: (-hit[1], hit[0].type, hit[0].id))
+        return hits[:limit]
+
+    def _expand(self, term: str) -> Iterable[str]:
+        start = bisect.bisect_left(self._vocabulary, term)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            yield word
+
+
+def highlight(text: str, terms: List[str]) -> str:
+    """Up to SNIPPET_WORDS words around the first match, matches wrapped in <b></b> (like ts_headline)."""
+    words = text.split()
+
+    def matches(token: str) -> bool:
+        token = fold(token)
+        return any(token.startswith(term) for term in terms)
+
+    first = next((i for i, word in enumerate(words) if any(matches(t) for t in _WORD.findall(word))), 0)
+    start = max(0, min(first - 5, len(words) - SNIPPET_WORDS))
+    window = " ".join(words[start : start + SNIPPET_WORDS])
+    return _WORD.sub(lambda m: f"<b>{m.group(0)}</b>" if matches(m.group(0)) else m.group(0), window)
+
+
+def build_index(db) -> InvertedIndex:
+    from app.modules.models import ChecklistItem, Lesson, Module, QuizQuestion
+
+    documents: List[SearchDocument] = []
+    for module_id, title, description in db.query(Module.id, Module.title, Module.description):
+        fields = ((title, WEIGHT_A), (description or "", WEIGHT_B))
+        documents.append(SearchDocument("module", module_id, module_id, None, title, description or "", fields))
+    for lesson_id, module_id, title in db.query(Lesson.id, Lesson.module_id, Lesson.title):
+        documents.append(SearchDocument("lesson", lesson_id, module_id, None, title, title, ((title, WEIGHT_A),)))
+    for question_id, module_id, prompt in db.query(QuizQuestion.id, QuizQuestion.module_id, QuizQuestion.prompt):
+        documents.append(SearchDocument("question", question_id, module_id, None, prompt, prompt, ((prompt, WEIGHT_B),)))
+    for item_id, section_id, text in db.query(ChecklistItem.id, ChecklistItem.section_id, ChecklistItem.text):
+        documents.append(SearchDocument("checklist_item", item_id, None, section_id, text, text, ((text, WEIGHT_B),)))
+    return InvertedIndex(documents)
+
+
+_index: InvertedIndex | None = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_index(db) -> InvertedIndex:
+    global _index
+    index, generation = _index, _generation
+    if index is not None:
+        return index
+    index = build_index(db)
+    with _lock:
+        # una invalidacion durante la construccion deja el indice sin guardar
+        if generation == _generation:
+            _index = index
+    return index
+
+
+def invalidate(keys=None) -> None:
+    global _index, _generation
+    with _lock:
+        _index = None
+        _generation += 1
+
+
+subscribe(invalidate, invalidate, prefixes=(SEARCH_KEY,))
@@ -0,0 +1,31 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.deadline import deadline
+from app.core.instrumentation import query_budget
+from app.core.responses import TrustedJSONRoute
+from app.infrastructure.respository import get_db
+from app.modules.auth.auth_service import require_permissions
+from app.modules.search.search_schema import SearchHit
+from app.modules.search.search_service import SearchService
+
+router = APIRouter(prefix="/search", tags=["Search"], route_class=TrustedJSONRoute)
+
+
+@router.get(
+    "",
+    response_model=List[SearchHit],
+    dependencies=[Depends(deadline(5)), Depends(query_budget(8))],
+)
+def search(
+    q: str = Query(..., min_length=2, max_length=200, description='terminos; admite "frase exacta", OR y -excluir'),
+    types: str | None = Query(None, description="module,lesson,question,checklist_item"),
+    limit: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_LIMIT),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.view"])),
+):
+    service = SearchService(db)
+    return service.search(current_user, q, types, limit)
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    type: str  # module | lesson | question | checklist_item
+    id: int
+    module_id: int | None = None
+    section_id: int | None = None
+    title: str
+    snippet: str  # fragmento con los terminos encontrados entre <b></b>
+    rank: float
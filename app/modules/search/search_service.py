@@ -0,0 +1,118 @@
+from typing import List, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, String, cast, func, literal, literal_column, null, select, union_all
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.modules.models import ChecklistItem, Lesson, Module, ModuleAssignment, QuizQuestion, User
+from app.modules.search.search_index import get_index, highlight
+from app.modules.search.search_schema import SearchHit
+from app.modules.training.training_service import FULL_ACCESS_ROLES
+
+SEARCH_TYPES = ("module", "lesson", "question", "checklist_item")
+# la configuracion debe coincidir con la de las columnas generadas (models.SEARCH_VECTORS)
+_CONFIG = literal_column("'spanish'::regconfig")
+_HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15"
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, current_user: User, q: str, types: str | None = None, limit: int | None = None) -> List[SearchHit]:
+        """Ranked hits the user may open: modules they have access to and, with checklist.view, checklist items."""
+        wanted = self._parse_types(types)
+        if not any(p.code == "checklist.view" for r in current_user.roles for p in r.permissions):
+            wanted.discard("checklist_item")
+        limit = limit or settings.SEARCH_DEFAULT_LIMIT
+        if not q.strip() or not wanted:
+            return []
+        full_access = any(r.code in FULL_ACCESS_ROLES for r in current_user.roles)
+        if self.db.get_bind().dialect.name == "postgresql":
+            return self._search_postgres(q, wanted, None if full_access else current_user.id, limit)
+        return self._search_memory(q, wanted, None if full_access else current_user.id, limit)
+
+    def _search_postgres(self, q: str, wanted: Set[str], user_id: int | None, limit: int) -> List[SearchHit]:
+        query = func.websearch_to_tsquery(_CONFIG, q)
+        assigned = select(ModuleAssignment.module_id).where(ModuleAssignment.user_id == user_id)
+
+        def source(kind: str, model, module_id, section_id, title, body):
+            vector = literal_column(f"{model.__tablename__}.search_vector")
+            statement = select(
+                literal(kind, String).label("type"),
+                model.id.label("id"),
+                cast(null() if module_id is None else module_id, Integer).label("module_id"),
+                cast(null() if section_id is None else section_id, Integer).label("section_id"),
+                title.label("title"),
+                body.label("body"),
+                func.ts_rank(vector, query, 32).label("rank"),
+            ).where(vector.op("@@")(query))
+            if user_id is not None and module_id is not None:
+                statement = statement.where(module_id.in_(assigned))
+            return statement
+
+        sources = {
+            "module": (Module, Module.id, None, Module.title, Module.description),
+            "lesson": (Lesson, Lesson.module_id, None, Lesson.title, Lesson.title),
+            "question": (QuizQuestion, QuizQuestion.module_id, None, QuizQuestion.prompt, QuizQuestion.prompt),
+            "checklist_item": (ChecklistItem, None, ChecklistItem.section_id, ChecklistItem.text, ChecklistItem.text),
+        }
+        candidates = union_all(*(source(kind, *sources[kind]) for kind in SEARCH_TYPES if kind in wanted)).subquery()
+        ranked = (
+            select(candidates)
+            .order_by(candidates.c.rank.desc(), candidates.c.type, candidates.c.id)
+            .limit(limit)
+            .subquery()
+        )
+        # ts_headline es caro: solo para las filas que se devuelven
+        rows = self.db.execute(
+            select(
+                ranked.c.type,
+                ranked.c.id,
+                ranked.c.module_id,
+                ranked.c.section_id,
+                ranked.c.title,
+                func.ts_headline(_CONFIG, ranked.c.body, query, _HEADLINE_OPTIONS).label("snippet"),
+                ranked.c.rank,
+            ).order_by(ranked.c.rank.desc(), ranked.c.type, ranked.c.id)
+        ).all()
+        return [SearchHit(**row._mapping) for row in rows]
+
+    def _search_memory(self, q: str, wanted: Set[str], user_id: int | None, limit: int) -> List[SearchHit]:
+        allowed = None
+        if user_id is not None:
+            allowed = {
+                module_id
+                for (module_id,) in self.db.query(ModuleAssignment.module_id).filter(ModuleAssignment.user_id == user_id)
+            }
+
+        def accept(document) -> bool:
+            if document.type not in wanted:
+                return False
+            return allowed is None or document.module_id is None or document.module_id in allowed
+
+        return [
+            SearchHit(
+                type=document.type,
+                id=document.id,
+                module_id=document.module_id,
+                section_id=document.section_id,
+                title=document.title,
+                snippet=highlight(document.body, terms),
+                rank=rank,
+            )
+            for document, rank, terms in get_index(self.db).search(q, accept, limit)
+        ]
+
+    def _parse_types(self, raw: str | None) -> Set[str]:
+        if raw is None:
+            return set(SEARCH_TYPES)
+        names = {name.strip() for name in raw.split(",") if name.strip()}
+        unknown = names - set(SEARCH_TYPES)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Valores no validos en types: {sorted(unknown)}",
+            )
+        return names
@@ -0,0 +1,169 @@
+"""Rollup of quiz attempts older than QUIZ_ATTEMPTS_HOT_MONTHS into quiz_attempt_summaries."""
+
+import logging
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.partitions import add_months, attached_partitions, current_month, ensure_monthly_partitions
+
+logger = logging.getLogger("sst.quiz_archive")
+
+TABLE = "quiz_attempts"
+LOCK_NOT_AVAILABLE = "55P03"  # SQLSTATE de lock_timeout
+
+_BATCH = "{alias}.id >= :low AND {alias}.id < :high AND {alias}.created_at < :cutoff"
+
+# resumen + borrado en la misma transaccion: los lectores (TrainingService) ven las filas o su resumen,
+# nunca ambos. La fusion con el resumen existente no depende del orden en que se archiven las filas
+_MERGE = """
+ON CONFLICT (user_id, module_id) DO UPDATE SET
+    attempts = s.attempts + excluded.attempts,
+    best_score = CASE WHEN excluded.best_score > s.best_score THEN excluded.best_score ELSE s.best_score END,
+    first_pass_score = CASE
+        WHEN s.first_passed_at IS NULL OR excluded.first_passed_at < s.first_passed_at THEN excluded.first_pass_score
+        ELSE s.first_pass_score END,
+    first_passed_at = CASE
+        WHEN s.first_passed_at IS NULL OR excluded.first_passed_at < s.first_passed_at THEN excluded.first_passed_at
+        ELSE s.first_passed_at END,
+    last_score = CASE WHEN excluded.last_attempt_at >= s.last_attempt_at THEN excluded.last_score ELSE s.last_score END,
+    last_attempt_at = CASE
+        WHEN excluded.last_attempt_at >= s.last_attempt_at THEN excluded.last_attempt_at
+        ELSE s.last_attempt_at END
+"""
+
+_COLUMNS = "(user_id, module_id, attempts, best_score, first_passed_at, first_pass_score, last_score, last_attempt_at)"
+
+_ROLLUP = f"""
+INSERT INTO quiz_attempt_summaries AS s {_COLUMNS}
+SELECT a.user_id, a.module_id, COUNT(*), MAX(a.score),
+    MIN(CASE WHEN a.passed THEN a.created_at END),
+    (SELECT p.score FROM {{source}} p
+     WHERE p.user_id = a.user_id AND p.module_id = a.module_id AND p.passed AND {{where_p}}
+     ORDER BY p.created_at, p.id LIMIT 1),
+    (SELECT l.score FROM {{source}} l
+     WHERE l.user_id = a.user_id AND l.module_id = a.module_id AND {{where_l}}
+     ORDER BY l.created_at DESC, l.id DESC LIMIT 1),
+    MAX(a.created_at)
+FROM {{source}} a
+WHERE {{where_a}}
+GROUP BY a.user_id, a.module_id
+{_MERGE}"""
+
+# PostgreSQL: el lote se borra y se resume en una sola sentencia; cada fila se resume exactamente una vez
+_MOVE_BATCH = f"""
+WITH moved AS (
+    DELETE FROM {{source}} WHERE {{batch}} RETURNING id, user_id, module_id, score, passed, created_at
+), rolled AS (
+    INSERT INTO quiz_attempt_summaries AS s {_COLUMNS}
+    SELECT user_id, module_id, COUNT(*), MAX(score),
+        MIN(created_at) FILTER (WHERE passed),
+        (ARRAY_AGG(score ORDER BY created_at, id) FILTER (WHERE passed))[1],
+        (ARRAY_AGG(score ORDER BY created_at DESC, id DESC))[1],
+        MAX(created_at)
+    FROM moved
+    GROUP BY user_id, module_id
+    {_MERGE}
+    RETURNING 1
+)
+SELECT COUNT(*) FROM moved
+"""
+
+
+def _roll_up(db: Session, source: str, condition: str | None = None, params: dict | None = None) -> int:
+    """Adds the attempts of `source` (only those matching `condition`, written for alias {alias}) to the summaries."""
+    where = {alias: condition.format(alias=alias) if condition else "1 = 1" for alias in ("a", "p", "l")}
+    statement = _ROLLUP.format(source=source, where_a=where["a"], where_p=where["p"], where_l=where["l"])
+    return db.execute(_with_cutoff(statement) if params else text(statement), params or {}).rowcount
+
+
+def _with_cutoff(statement: str):
+    return text(statement).bindparams(bindparam("cutoff", type_=DateTime))
+
+
+def archive_attempts(db: Session, batch_size: int) -> int:
+    """Creates upcoming partitions and archives the cold ones; returns partitions/rows affected."""
+    cutoff = add_months(current_month(), -settings.QUIZ_ATTEMPTS_HOT_MONTHS)
+    if db.get_bind().dialect.name != "postgresql":
+        return _archive_rows(db, TABLE, cutoff, batch_size)
+
+    affected = ensure_monthly_partitions(db, TABLE, settings.QUIZ_ATTEMPTS_PARTITIONS_AHEAD)
+    db.commit()
+    steps = []
+    for name, (lower, upper) in sorted(attached_partitions(db, TABLE).items(), key=lambda item: item[1][1] or cutoff):
+        if upper is not None and upper <= cutoff:
+            steps.append(partial(_archive_partition, db, name))
+        elif lower is None or lower < cutoff:
+            # particion que cruza el corte (la tabla anterior adjuntada entera, DEFAULT): por lotes
+            steps.append(partial(_archive_rows, db, name, cutoff, batch_size))
+    for step in steps:
+        try:
+            affected += step()
+        except OperationalError as exc:
+            db.rollback()
+            if getattr(exc.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                raise
+            # tabla ocupada: se reintenta en la siguiente pasada del scheduler
+            logger.warning("quiz_attempts ocupada, el archivado sigue en la siguiente ejecucion")
+            break
+    return affected
+
+
+def _lock(db: Session, name: str) -> None:
+    # sin escrituras en `name` entre el resumen y el DETACH; sin hacer cola mas de lock_timeout
+    db.execute(text(f"SET LOCAL lock_timeout = '{settings.QUIZ_ATTEMPTS_LOCK_TIMEOUT}'"))
+    db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+
+
+def _archive_partition(db: Session, name: str) -> int:
+    _lock(db, name)
+    groups = _roll_up(db, name)
+    db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+    schema = settings.QUIZ_ATTEMPTS_ARCHIVE_SCHEMA
+    if schema:
+        # el archivo no debe impedir borrar usuarios o modulos
+        foreign_keys = db.execute(
+            text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"),
+            {"name": name},
+        ).scalars().all()
+        for constraint in foreign_keys:
+            db.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+        db.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+    else:
+        db.execute(text(f"DROP TABLE {name}"))
+    db.commit()
+    outcome = f"archivada en {schema}" if schema else "borrada"
+    logger.info("Particion %s resumida (%s usuario/modulo) y %s", name, groups, outcome)
+    return 1
+
+
+def _archive_rows(db: Session, source: str, cutoff: datetime, batch_size: int) -> int:
+    """Summarizes and deletes the rows of `source` older than `cutoff`, one short transaction per id range."""
+    # los intentos son append-only y nacen con created_at = ahora: lo anterior al corte ya no cambia y
+    # no hace falta bloquear la tabla, solo las filas de cada lote
+    low, high = db.execute(
+        _with_cutoff(f"SELECT MIN(id), MAX(id) FROM {source} WHERE created_at < :cutoff"), {"cutoff": cutoff}
+    ).one()
+    db.commit()
+    if low is None:
+        return 0
+    postgres = db.get_bind().dialect.name == "postgresql"
+    deleted = 0
+    for start in range(low, high + 1, batch_size):
+        params = {"low": start, "high": start + batch_size, "cutoff": cutoff}
+        if postgres:
+            statement = _MOVE_BATCH.format(source=source, batch=_BATCH.format(alias=source))
+            deleted += db.execute(_with_cutoff(statement), params).scalar()
+        else:
+            _roll_up(db, source, _BATCH, params)
+            statement = f"DELETE FROM {source} WHERE {_BATCH.format(alias=source)}"
+            deleted += db.execute(_with_cutoff(statement), params).rowcount
+        db.commit()
+    if deleted:
+        logger.info("%s intentos anteriores a %s resumidos y borrados de %s", deleted, f"{cutoff:%Y-%m}", source)
+    return deleted
@@ -0,0 +1,215 @@
+"""Completion certificates (PDF), rendered off the request and stored by content hash."""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse
+
+from app.config.settings import settings
+from app.core.http_cache import etag_matches
+
+logger = logging.getLogger("sst.certificates")
+
+TEMPLATE_VERSION = 1
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 horizontal en puntos
+
+
+@dataclass(frozen=True)
+class CertificateData:
+    user_id: int
+    user_name: str
+    module_id: int
+    module_title: str
+    score: int
+    passed_at: datetime
+
+    @property
+    def key(self) -> str:
+        # renombrar usuario o modulo da otro certificado en vez de servir uno desactualizado
+        payload = {**asdict(self), "passed_at": self.passed_at.isoformat(), "template": TEMPLATE_VERSION}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    @property
+    def filename(self) -> str:
+        return f"certificado-modulo{self.module_id}-usuario{self.user_id}.pdf"
+
+
+def certificate_path(key: str) -> Path:
+    return Path(settings.CERTIFICATES_DIR, key[:2], f"{key}.pdf")
+
+
+def ensure_rendered(data: CertificateData) -> Path:
+    """Path of the certificate, rendering it first when the file does not exist yet."""
+    path = certificate_path(data.key)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # escritura atomica: un lector concurrente ve el archivo completo o ninguno
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(render_pdf(data))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def certificate_response(request: Request, data: CertificateData, path: Path) -> Response:
+    # la clave es el hash del contenido: sirve como ETag fuerte sin leer el archivo
+    headers = {"ETag": f'"{data.key}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, media_type="application/pdf", filename=data.filename, headers=headers)
+
+
+# -------------------------
+# PDF
+# -------------------------
+def _pdf_text(value: str) -> bytes:
+    encoded = value.encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _centered(text: str, size: int, y: int, font: str = "F1") -> bytes:
+    # ancho aproximado de Helvetica: sin tabla de metricas, suficiente para centrar
+    width = len(text) * size * (0.56 if font == "F2" else 0.5)
+    x = max(40, (PAGE_WIDTH - width) / 2)
+    return b"BT /%s %d Tf %.1f %d Td %s Tj ET\n" % (font.encode(), size, x, y, _pdf_text(text))
+
+
+def render_pdf(data: CertificateData) -> bytes:
+    content = b"".join(
+        [
+            b"2 w 30 30 782 535 re S 0.5 w 40 40 762 515 re S\n",
+            _centered("CERTIFICADO DE APROBACION", 28, 470, "F2"),
+            _centered("Se certifica que", 14, 420),
+            _centered(data.user_name, 24, 380, "F2"),
+            _centered("aprobo el modulo de capacitacion", 14, 340),
+            _centered(data.module_title, 20, 300, "F2"),
+            _centered(f"con un puntaje de {data.score}% el {data.passed_at:%d/%m/%Y}", 14, 260),
+            _centered(f"{settings.APP_NAME} - certificado {data.key[:12].upper()}", 9, 70),
+        ]
+    )
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> "
+        b"/Contents 4 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Length %d >>\nstream\n%sendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# -------------------------
+# Pool
+# -------------------------
+class CertificatePool:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="sst-certificates")
+            return self._executor
+
+    def schedule(self, module_id: int, user_id: int) -> None:
+        """Renders the user's certificate in the background (no-op if one is already queued)."""
+        key = (module_id, user_id)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._get_executor().submit(self._render_for, key)
+
+    def render_all(self, records: List[CertificateData]) -> List[Path]:
+        return list(self._get_executor().map(ensure_rendered, records))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _render_for(self, key: Tuple[int, int]) -> None:
+        from app.config.database import SessionLocal
+        from app.modules.training.training_service import TrainingService
+
+        module_id, user_id = key
+        db = SessionLocal()
+        try:
+            for data in TrainingService(db).certificate_records(module_id, [user_id]):
+                ensure_rendered(data)
+        except Exception:
+            # la descarga lo vuelve a intentar en linea
+            logger.exception("No se pudo generar el certificado del modulo %s para el usuario %s", module_id, user_id)
+        finally:
+            db.close()
+            with self._lock:
+                self._pending.discard(key)
+
+
+pool = CertificatePool(settings.CERTIFICATE_WORKERS)
+
+
+def stop_certificates() -> None:
+    pool.shutdown()
+
+
+# -------------------------
+# ZIP
+# -------------------------
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable: zipfile falls back to data descriptors and never seeks back."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def zip_stream(entries: Iterable[Tuple[str, Path]]) -> Iterator[bytes]:
+    """ZIP of (name, path) entries, yielded file by file; memory stays at one file."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in entries:
+            archive.write(path, name)
+            yield sink.drain()
+    yield sink.drain()
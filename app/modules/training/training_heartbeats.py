@@ -0,0 +1,219 @@
+"""Lesson time-on-task from player heartbeats, aggregated in memory and upserted in batches."""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Integer, case, cast, extract, func
+
+from app.config.settings import settings
+from app.core.invalidation import subscribe
+
+logger = logging.getLogger("sst.heartbeats")
+
+Key = Tuple[int, int]  # (user_id, lesson_id)
+
+
+class HeartbeatAggregator:
+    def __init__(self, interval_seconds: int, access_cache_size: int):
+        self.interval_seconds = interval_seconds
+        self.access_cache_size = access_cache_size
+        self._lock = threading.Lock()
+        # [segundos, heartbeats, primer, ultimo] por par pendiente de escribir
+        self._pending: Dict[Key, list] = {}
+        self._last_beat: Dict[Key, float] = {}
+        # acceso al modulo ya comprobado (LRU acotado); se vacia al cambiar las asignaciones
+        self._allowed: "OrderedDict[Key, None]" = OrderedDict()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -------------------------
+    # Acceso
+    # -------------------------
+    def is_allowed(self, key: Key) -> bool:
+        with self._lock:
+            if key not in self._allowed:
+                return False
+            self._allowed.move_to_end(key)
+            return True
+
+    def allow(self, key: Key) -> None:
+        with self._lock:
+            self._allowed[key] = None
+            while len(self._allowed) > self.access_cache_size:
+                self._allowed.popitem(last=False)
+
+    def forget_access(self) -> None:
+        with self._lock:
+            self._allowed.clear()
+
+    # -------------------------
+    # Agregacion
+    # -------------------------
+    def record(self, user_id: int, lesson_id: int) -> bool:
+        key = (user_id, lesson_id)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_beat.get(key)
+            if last is not None and now - last < self.interval_seconds / 2:
+                return False
+            self._last_beat[key] = now
+            # solo el tiempo real desde el heartbeat anterior; el primero cuenta un intervalo
+            credit = self.interval_seconds if last is None else min(round(now - last), self.interval_seconds)
+            seen = datetime.utcnow()
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [credit, 1, seen, seen]
+            else:
+                entry[0] += credit
+                entry[1] += 1
+                entry[3] = seen
+        return True
+
+    def pending_seconds(self, keys: Iterable[Key]) -> Dict[Key, int]:
+        with self._lock:
+            return {key: self._pending[key][0] for key in keys if key in self._pending}
+
+    def flush(self) -> int:
+        """Writes every pending pair with one upsert; returns pairs written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # los pares sin heartbeat reciente ya no necesitan el anti-rebote
+            horizon = time.monotonic() - 2 * self.interval_seconds
+            self._last_beat = {key: beat for key, beat in self._last_beat.items() if beat >= horizon}
+        if not pending:
+            return 0
+        try:
+            upsert_time_on_task(pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        return len(pending)
+
+    def _restore(self, pending: Dict[Key, list]) -> None:
+        with self._lock:
+            for key, (seconds, beats, first, last) in pending.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [seconds, beats, first, last]
+                else:
+                    entry[0] += seconds
+                    entry[1] += beats
+                    entry[2] = min(entry[2], first)
+
+    # -------------------------
+    # Hilo de flush
+    # -------------------------
+    def start(self, flush_seconds: float) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(flush_seconds,), name="sst-heartbeats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.error("No se pudo escribir el tiempo en leccion pendiente al apagar: %s", exc)
+
+    def _run(self, flush_seconds: float) -> None:
+        while not self._stop.wait(flush_seconds):
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.warning("Flush de heartbeats fallo; se reintenta: %s", exc)
+
+
+def upsert_time_on_task(pending: Dict[Key, list]) -> None:
+    from app.config.database import get_engine
+    from app.modules.models import LessonTimeOnTask
+
+    engine = get_engine()
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = LessonTimeOnTask.__table__
+    rows = [
+        {"user_id": user_id, "lesson_id": lesson_id, "seconds": seconds, "heartbeats": beats,
+         "first_seen_at": first, "last_seen_at": last}
+        for (user_id, lesson_id), (seconds, beats, first, last) in pending.items()
+    ]
+    stmt = insert(table)
+    # tope por flush: lo transcurrido desde el last_seen_at guardado mas un intervalo; con varios
+    # workers recibiendo al mismo usuario la suma no supera el tiempo de reloj
+    if engine.dialect.name == "postgresql":
+        elapsed = extract("epoch", stmt.excluded.last_seen_at - table.c.last_seen_at)
+    else:
+        days = func.julianday(stmt.excluded.last_seen_at) - func.julianday(table.c.last_seen_at)
+        elapsed = func.round(days * 86400)
+    limit = case((elapsed > 0, elapsed), else_=0) + settings.LESSON_HEARTBEAT_SECONDS
+    added = cast(case((stmt.excluded.seconds > limit, limit), else_=stmt.excluded.seconds), Integer)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.lesson_id],
+        set_={
+            "seconds": table.c.seconds + added,
+            "heartbeats": table.c.heartbeats + stmt.excluded.heartbeats,
+            "last_seen_at": case(
+                (stmt.excluded.last_seen_at > table.c.last_seen_at, stmt.excluded.last_seen_at),
+                else_=table.c.last_seen_at,
+            ),
+        },
+    )
+    with engine.begin() as connection:
+        connection.execute(stmt, rows)
+
+
+_aggregator: HeartbeatAggregator | None = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator() -> HeartbeatAggregator:
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = HeartbeatAggregator(settings.LESSON_HEARTBEAT_SECONDS, settings.LESSON_HEARTBEAT_ACCESS_CACHE)
+                _aggregator.start(settings.LESSON_HEARTBEAT_FLUSH_SECONDS)
+    return _aggregator
+
+
+def start_heartbeats() -> None:
+    get_aggregator()
+
+
+def stop_heartbeats() -> None:
+    if _aggregator is not None:
+        _aggregator.stop()
+
+
+def _on_invalidate(keys: List[str]) -> None:
+    # assign_module publica quiz:<module_id>; las asignaciones pudieron cambiar
+    if _aggregator is not None:
+        _aggregator.forget_access()
+
+
+def _on_flush() -> None:
+    if _aggregator is not None:
+        _aggregator.forget_access()
+
+
+subscribe(_on_invalidate, _on_flush, prefixes=("quiz:",))
+atexit.register(stop_heartbeats)
+
+if hasattr(os, "register_at_fork"):
+    def _reset_after_fork() -> None:
+        global _aggregator
+        _aggregator = None
+
+    os.register_at_fork(after_in_child=_reset_after_fork)
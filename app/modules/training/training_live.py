@@ -0,0 +1,183 @@
+"""Live module progress over Server-Sent Events."""
+
+import asyncio
+import json
+import threading
+from typing import Dict, List, Set
+
+from app.config.settings import settings
+from app.core.invalidation import subscribe
+
+PROGRESS_PREFIX = "progress:"
+_MAX_KEYS = 50  # por encima se publica el comodin: el payload de NOTIFY tiene limite
+_RESYNC = object()
+
+
+def progress_keys(module_id: int, user_ids=None) -> List[str]:
+    if user_ids is None or len(user_ids) > _MAX_KEYS:
+        return [f"{PROGRESS_PREFIX}{module_id}:*"]
+    return [f"{PROGRESS_PREFIX}{module_id}:{user_id}" for user_id in sorted(user_ids)]
+
+
+class Subscription:
+    def __init__(self, module_id: int, viewer_id: int, sees_all: bool, queue_size: int):
+        self.module_id = module_id
+        self.viewer_id = viewer_id
+        self.sees_all = sees_all
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def can_see(self, assigned_by: int | None) -> bool:
+        return self.sees_all or assigned_by == self.viewer_id
+
+    def offer(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.resync()
+
+    def resync(self) -> None:
+        # cliente lento: se descartan los deltas y se le manda un snapshot nuevo
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_RESYNC)
+
+
+class ProgressHub:
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._dirty: Dict[int, Set[int | None]] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._pump: asyncio.Task | None = None
+
+    def connections(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    def add(self, subscription: Subscription) -> None:
+        loop = asyncio.get_running_loop()
+        if self._pump is None or self._pump.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._pump = self._loop.create_task(self._run())
+        with self._lock:
+            self._subscriptions.setdefault(subscription.module_id, set()).add(subscription)
+
+    def remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            subs = self._subscriptions.get(subscription.module_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscriptions[subscription.module_id]
+
+    # llamado desde hilos (after_commit de la peticion o listener del bus)
+    def on_keys(self, keys: List[str]) -> None:
+        marked = False
+        with self._lock:
+            for key in keys:
+                module_part, _, user_part = key[len(PROGRESS_PREFIX):].partition(":")
+                if not module_part.isdigit() or int(module_part) not in self._subscriptions:
+                    continue
+                user_id = int(user_part) if user_part.isdigit() else None
+                self._dirty.setdefault(int(module_part), set()).add(user_id)
+                marked = True
+        if marked:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def on_flush(self) -> None:
+        with self._lock:
+            for module_id in self._subscriptions:
+                self._dirty.setdefault(module_id, set()).add(None)
+        if self._loop is not None and self._subscriptions:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            for module_id, user_ids in dirty.items():
+                await self._deliver(module_id, user_ids)
+
+    async def _deliver(self, module_id: int, user_ids: Set[int | None]) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(module_id, ()))
+        if not subscriptions:
+            return
+        if None in user_ids:
+            for subscription in subscriptions:
+                subscription.resync()
+            return
+        try:
+            rows, removed = await run_off_loop(_compute_deltas, module_id, sorted(user_ids))
+        except Exception:
+            for subscription in subscriptions:
+                subscription.resync()
+            return
+        for subscription in subscriptions:
+            for assigned_by, row in rows:
+                if subscription.can_see(assigned_by):
+                    subscription.offer(("progress", row.model_dump_json()))
+            for user_id in removed:
+                subscription.offer(("removed", json.dumps({"user_id": user_id})))
+
+
+async def run_off_loop(fn, *args):
+    # run_in_executor no copia el contexto: estas consultas no cuentan en el query budget de la peticion
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _compute_deltas(module_id: int, user_ids: List[int]):
+    from app.config.database import SessionLocal
+    from app.modules.training.training_service import TrainingService
+
+    db = SessionLocal()
+    try:
+        return TrainingService(db).progress_deltas(module_id, user_ids)
+    finally:
+        db.close()
+
+
+def _snapshot(subscription: Subscription) -> str:
+    from app.config.database import SessionLocal
+    from app.modules.training.training_service import TrainingService
+
+    db = SessionLocal()
+    try:
+        report = TrainingService(db).progress_report_for(
+            subscription.module_id, subscription.viewer_id, subscription.sees_all
+        )
+        return report.model_dump_json()
+    finally:
+        db.close()
+
+
+def format_event(event: str, data: str) -> bytes:
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+async def progress_stream(subscription: Subscription):
+    """SSE body: snapshot, then deltas; keep-alive comments while idle."""
+    # suscrito antes del snapshot: un commit intermedio llega como delta (a lo sumo repetido)
+    hub.add(subscription)
+    try:
+        yield format_event("snapshot", await run_off_loop(_snapshot, subscription))
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), settings.LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if item is _RESYNC:
+                snapshot = await run_off_loop(_snapshot, subscription)
+                yield format_event("snapshot", snapshot)
+            else:
+                yield format_event(*item)
+    finally:
+        hub.remove(subscription)
+
+
+hub = ProgressHub()
+subscribe(hub.on_keys, hub.on_flush, prefixes=(PROGRESS_PREFIX,))
@@ -0,0 +1,59 @@
+"""Lesson asset delivery (GET /training/lessons/{lesson_id}/media/{asset})."""
+
+import os
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+
+from app.config.settings import settings
+from app.core.http_cache import etag_matches
+
+
+class MediaFileResponse(FileResponse):
+    chunk_size = settings.MEDIA_CHUNK_SIZE
+
+
+def lesson_media_root(lesson_id: int) -> Path:
+    return Path(settings.MEDIA_ROOT, "lessons", str(lesson_id)).resolve()
+
+
+def resolve_asset(lesson_id: int, asset: str) -> tuple[Path, os.stat_result]:
+    """Path and stat of a lesson asset; 404 for missing files and paths outside the lesson folder."""
+    root = lesson_media_root(lesson_id)
+    path = (root / asset).resolve()
+    try:
+        if not path.is_relative_to(root):
+            raise FileNotFoundError(asset)
+        stat_result = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso no encontrado")
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso no encontrado")
+    return path, stat_result
+
+
+def media_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def media_response(request: Request, path: Path, stat_result: os.stat_result) -> Response:
+    etag = media_etag(stat_result)
+    # privado (requiere autorizacion); reemplazar un archivo en su sitio tarda MEDIA_CACHE_MAX_AGE en llegar
+    # a los clientes: las versiones nuevas se suben con otro nombre
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = MediaFileResponse(path, headers=headers, stat_result=stat_result)
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header:
+        # el proxy lee el archivo con sendfile y resuelve los Range; el worker no toca el contenido
+        if header.lower() == "x-accel-redirect":
+            relative = path.relative_to(Path(settings.MEDIA_ROOT).resolve()).as_posix()
+            target = settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative)
+        else:
+            target = str(path)
+        response = Response(headers={**headers, header: target}, media_type=response.media_type)
+    return response
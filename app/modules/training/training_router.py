@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.core.deadline import deadline
+from app.core.http_cache import http_cache
+from app.core.idempotency import idempotent
+from app.core.instrumentation import query_budget
+from app.core.pagination import Page, PageParams, page_params, page_response
+from app.core.responses import TrustedJSONRoute
 from app.infrastructure.respository import get_db
-from app.modules.auth.auth_service import require_permissions
+from app.modules.auth.auth_service import require_claims, require_permissions
 from app.modules.training.training_schema import (
     LessonCompletionRequest,
     LessonCompletionResponse,
@@ -13,26 +20,60 @@ from app.modules.training.training_schema import (
     ModuleProgressOut,
     ModuleUpdateRequest,
     ModuleWithLessons,
+    MyTrainingOut,
     QuizOut,
     QuizResult,
     QuizSubmission,
     UserSummary,
 )
+from app.modules.training.training_certificates import certificate_response, zip_stream
+from app.modules.training.training_live import progress_stream
+from app.modules.training.training_media import media_response
 from app.modules.training.training_service import TrainingService
 
-router = APIRouter(prefix="/training", tags=["Training"])
+router = APIRouter(prefix="/training", tags=["Training"], route_class=TrustedJSONRoute)
 
 
-@router.get("/modules", response_model=list[ModuleOut])
+@router.get(
+    "/modules",
+    response_model=list[ModuleOut] | Page[ModuleOut],
+    dependencies=[Depends(query_budget(7))],
+)
 def list_modules(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user=Depends(require_permissions(["training.view"])),
 ):
     service = TrainingService(db)
-    return service.list_modules(current_user)
+    return page_response(service.list_modules(current_user, page), page, response)
 
 
-@router.get("/modules/{module_id}/lessons", response_model=ModuleWithLessons)
+@router.get(
+    "/me",
+    response_model=MyTrainingOut,
+    dependencies=[Depends(query_budget(6))],
+)
+def my_training(
+    include: str | None = Query(None, description="user,modules,lessons,checklist"),
+    user_fields: str | None = Query(None, alias="fields[user]"),
+    module_fields: str | None = Query(None, alias="fields[module]"),
+    lesson_fields: str | None = Query(None, alias="fields[lesson]"),
+    checklist_fields: str | None = Query(None, alias="fields[checklist]"),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.view"])),
+):
+    service = TrainingService(db)
+    fields = {"user": user_fields, "module": module_fields, "lesson": lesson_fields, "checklist": checklist_fields}
+    result, spec = service.my_training(current_user, include, fields)
+    return Response(result.model_dump_json(include=spec), media_type="application/json")
+
+
+@router.get(
+    "/modules/{module_id}/lessons",
+    response_model=ModuleWithLessons,
+    dependencies=[Depends(query_budget(8))],
+)
 def get_module_lessons(
     module_id: int,
     db: Session = Depends(get_db),
@@ -42,7 +83,11 @@ def get_module_lessons(
     return service.module_lessons(module_id, current_user)
 
 
-@router.post("/lessons/{lesson_id}/complete", response_model=LessonCompletionResponse)
+@router.post(
+    "/lessons/{lesson_id}/complete",
+    response_model=LessonCompletionResponse,
+    dependencies=[Depends(idempotent(["training.complete"])), Depends(query_budget(13))],
+)
 def complete_lesson(
     lesson_id: int,
     payload: LessonCompletionRequest,
@@ -64,13 +109,58 @@ def complete_lesson(
     )
 
 
-@router.get("/modules/{module_id}/quiz", response_model=QuizOut)
+@router.api_route(
+    "/lessons/{lesson_id}/media/{asset:path}",
+    methods=["GET", "HEAD"],
+    response_class=Response,
+    dependencies=[Depends(query_budget(4))],
+)
+def get_lesson_media(
+    lesson_id: int,
+    asset: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.view"])),
+):
+    service = TrainingService(db)
+    path, stat_result = service.lesson_media(lesson_id, asset, current_user)
+    # la descarga puede durar minutos: la conexion vuelve al pool antes de enviar el archivo
+    db.close()
+    return media_response(request, path, stat_result)
+
+
+@router.post(
+    "/lessons/{lesson_id}/heartbeat",
+    status_code=204,
+    dependencies=[Depends(query_budget(2))],
+)
+def lesson_heartbeat(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    claims: dict = Depends(require_claims(["training.view"])),
+):
+    service = TrainingService(db)
+    service.record_heartbeat(lesson_id, claims)
+
+
+@router.get(
+    "/modules/{module_id}/quiz",
+    response_model=QuizOut,
+    dependencies=[
+        Depends(http_cache(lambda params: [f"quiz:{params['module_id']}"], ["training.view"], per_user=True)),
+        Depends(query_budget(6)),
+    ],
+)
 def get_quiz(module_id: int, db: Session = Depends(get_db), current_user=Depends(require_permissions(["training.view"]))):
     service = TrainingService(db)
     return service.get_quiz(module_id, current_user)
 
 
-@router.post("/modules/{module_id}/quiz/submit", response_model=QuizResult)
+@router.post(
+    "/modules/{module_id}/quiz/submit",
+    response_model=QuizResult,
+    dependencies=[Depends(idempotent(["training.quiz"])), Depends(query_budget(8))],
+)
 def submit_quiz(
     module_id: int,
     payload: QuizSubmission,
@@ -84,6 +174,7 @@ def submit_quiz(
 @router.post(
     "/modules",
     response_model=ModuleOut,
+    dependencies=[Depends(query_budget(10))],
 )
 def create_module(
     payload: ModuleCreateRequest,
@@ -97,6 +188,7 @@ def create_module(
 @router.put(
     "/modules/{module_id}",
     response_model=ModuleOut,
+    dependencies=[Depends(query_budget(10))],
 )
 def update_module(
     module_id: int,
@@ -111,6 +203,7 @@ def update_module(
 @router.delete(
     "/modules/{module_id}",
     status_code=204,
+    dependencies=[Depends(query_budget(12))],
 )
 def delete_module(
     module_id: int,
@@ -124,6 +217,7 @@ def delete_module(
 @router.post(
     "/modules/{module_id}/assign",
     response_model=ModuleAssignmentOut,
+    dependencies=[Depends(query_budget(9))],
 )
 def assign_module(
     module_id: int,
@@ -135,9 +229,48 @@ def assign_module(
     return service.assign_module(module_id, payload, current_user)
 
 
+@router.get(
+    "/modules/{module_id}/certificate",
+    response_class=Response,
+    dependencies=[Depends(query_budget(4))],
+)
+def get_certificate(
+    module_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.view"])),
+):
+    service = TrainingService(db)
+    data, path = service.certificate(module_id, current_user)
+    db.close()
+    return certificate_response(request, data, path)
+
+
+@router.get(
+    "/modules/{module_id}/certificates.zip",
+    response_class=StreamingResponse,
+    dependencies=[Depends(query_budget(4))],
+)
+def get_crew_certificates(
+    module_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.monitor"])),
+):
+    service = TrainingService(db)
+    entries = service.crew_certificates(module_id, current_user)
+    # el ZIP se arma mientras se envia: la conexion vuelve al pool antes
+    db.close()
+    return StreamingResponse(
+        zip_stream(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="certificados-modulo{module_id}.zip"'},
+    )
+
+
 @router.get(
     "/modules/{module_id}/progress",
     response_model=ModuleProgressOut,
+    dependencies=[Depends(deadline(15)), Depends(query_budget(10))],
 )
 def module_progress(
     module_id: int,
@@ -148,11 +281,31 @@ def module_progress(
     return service.module_progress_report(module_id, current_user)
 
 
+@router.get(
+    "/modules/{module_id}/progress/stream",
+    response_class=StreamingResponse,
+    dependencies=[Depends(query_budget(5))],
+)
+def module_progress_stream(
+    module_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_permissions(["training.monitor"])),
+):
+    service = TrainingService(db)
+    subscription = service.progress_subscription(module_id, current_user)
+    db.close()  # el stream puede durar horas: la conexion vuelve al pool ya
+    return StreamingResponse(
+        progress_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/assignable-users",
-    response_model=list[UserSummary],
-    dependencies=[Depends(require_permissions(["training.assign"]))],
+    response_model=list[UserSummary] | Page[UserSummary],
+    dependencies=[Depends(query_budget(5)), Depends(require_permissions(["training.assign"]))],
 )
-def list_assignable_users(db: Session = Depends(get_db)):
+def list_assignable_users(response: Response, page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
     service = TrainingService(db)
-    return service.list_assignable_users()
+    return page_response(service.list_assignable_users(page), page, response)
@@ -2,6 +2,9 @@ from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, ConfigDict, EmailStr
 
+from app.modules.auth.auth_schema import UserOut
+from app.modules.checklist.checklist_schema import ChecklistSectionOut
+
 
 class ModuleOut(BaseModel):
     id: int
@@ -27,6 +30,7 @@ class LessonOut(BaseModel):
     type: str
     image: Optional[str] = None
     completed: bool
+    time_spent_seconds: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -125,9 +129,16 @@ class UserProgressOut(BaseModel):
     quiz_completed: bool
     last_score: Optional[int] = None
     last_attempt_at: Optional[datetime] = None
+    time_spent_seconds: int = 0
 
 
 class ModuleProgressOut(BaseModel):
     module_id: int
     module_title: str
     users: List[UserProgressOut]
+
+
+class MyTrainingOut(BaseModel):
+    user: Optional[UserOut] = None
+    modules: Optional[List[ModuleWithLessons]] = None
+    checklist: Optional[List[ChecklistSectionOut]] = None
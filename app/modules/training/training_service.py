@@ -1,10 +1,33 @@
+import os
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Tuple
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-
-from app.modules.models import Lesson, Module, ModuleAssignment, QuizAttempt, QuizOption, QuizQuestion, User, UserLessonProgress
+from sqlalchemy import and_, func, select, union_all
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.config.settings import settings
+from app.core.activity import log_event
+from app.core.invalidation import publish
+from app.core.pagination import Page, PageParams, paginate
+from app.modules.auth.auth_schema import UserOut
+from app.modules.auth.auth_service import AuthService
+from app.modules.checklist.checklist_schema import ChecklistSectionOut
+from app.modules.models import (
+    Lesson,
+    LessonTimeOnTask,
+    Module,
+    ModuleAssignment,
+    QuizAttempt,
+    QuizAttemptSummary,
+    QuizOption,
+    QuizQuestion,
+    User,
+    UserLessonProgress,
+)
+from app.modules.search.search_index import SEARCH_KEY
 from app.modules.training.training_schema import (
     LessonOut,
     ModuleAssignmentOut,
@@ -14,11 +37,34 @@ from app.modules.training.training_schema import (
     ModuleProgressOut,
     ModuleUpdateRequest,
     ModuleWithLessons,
+    MyTrainingOut,
     QuizOut,
     QuizResult,
     UserProgressOut,
     UserSummary,
 )
+from app.modules.training.training_heartbeats import get_aggregator
+from app.modules.training.training_certificates import CertificateData, ensure_rendered, pool as certificate_pool
+from app.modules.training.training_live import Subscription, hub, progress_keys
+from app.modules.training.training_media import resolve_asset
+
+FULL_ACCESS_ROLES = {"superadmin", "leader"}
+MY_TRAINING_SECTIONS = ("user", "modules", "lessons", "checklist")
+MY_TRAINING_TYPES = {"user": UserOut, "module": ModuleOut, "lesson": LessonOut, "checklist": ChecklistSectionOut}
+
+
+def _parse_fieldset(raw: str | None, allowed: Iterable[str], label: str) -> Set[str] | None:
+    """Comma separated names; None when the parameter was not sent."""
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Valores no validos en {label}: {sorted(unknown)}",
+        )
+    return names
 
 
 class TrainingService:
@@ -28,9 +74,14 @@ class TrainingService:
     # -------------------------
     # Public API
     # -------------------------
-    def list_modules(self, current_user: User) -> List[ModuleOut]:
-        modules = self._modules_for_user(current_user)
-        return [self._build_module_out(module, current_user.id) for module in modules]
+    def list_modules(self, current_user: User, page: PageParams | None = None) -> Page[ModuleOut]:
+        modules, next_cursor, total = paginate(self._modules_query(current_user), [Module.id], page)
+        progress = self._progress_by_module([module.id for module in modules], current_user.id)
+        return Page[ModuleOut](
+            items=[self._build_module_out(module, progress[module.id]) for module in modules],
+            next_cursor=next_cursor,
+            total=total,
+        )
 
     def module_lessons(self, module_id: int, current_user: User) -> ModuleWithLessons:
         module = self._get_module(module_id)
@@ -44,31 +95,74 @@ class TrainingService:
         )
 
         completed_lesson_ids = {
-            lp.lesson_id
-            for lp in self.db.query(UserLessonProgress).filter(
+            lesson_id
+            for (lesson_id,) in self.db.query(UserLessonProgress.lesson_id)
+            .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
+            .filter(
+                Lesson.module_id == module_id,
                 UserLessonProgress.user_id == current_user.id,
                 UserLessonProgress.completed.is_(True),
             )
         }
 
-        module_info = self._build_module_out(module, current_user.id, lessons_override=len(lessons))
+        progress = (len(lessons), len(completed_lesson_ids), self._quiz_completed(module_id, current_user.id))
+        module_info = self._build_module_out(module, progress)
+        time_spent = self._time_by_lesson([lesson.id for lesson in lessons], current_user.id)
 
-        lesson_list = [
-            LessonOut(
-                id=lesson.id,
-                title=lesson.title,
-                duration=lesson.duration,
-                type=lesson.type,
-                image=lesson.image,
-                completed=lesson.id in completed_lesson_ids,
-            )
-            for lesson in lessons
-        ]
+        lesson_list = [self._build_lesson_out(lesson, completed_lesson_ids, time_spent) for lesson in lessons]
 
         return ModuleWithLessons(module=module_info, lessons=lesson_list)
 
+    def my_training(
+        self, current_user: User, include: str | None, fields: Dict[str, str | None]
+    ) -> Tuple[MyTrainingOut, dict]:
+        """Home screen in one response; returns the payload and the model_dump include spec."""
+        # include elige secciones (user, modules, lessons, checklist) y fields[<tipo>] los atributos;
+        # las secciones no pedidas no se consultan
+        sections = _parse_fieldset(include, MY_TRAINING_SECTIONS, "include") or set(MY_TRAINING_SECTIONS)
+        fieldsets = {
+            name: _parse_fieldset(fields.get(name), model.model_fields, f"fields[{name}]")
+            for name, model in MY_TRAINING_TYPES.items()
+        }
+        if "lessons" in sections:
+            sections.add("modules")
+        if not any(p.code == "checklist.view" for r in current_user.roles for p in r.permissions):
+            sections.discard("checklist")
+
+        result = MyTrainingOut()
+        spec: dict = {}
+        if "user" in sections:
+            result.user = AuthService(self.db)._serialize_user(current_user)
+            spec["user"] = fieldsets["user"] or True
+
+        modules = self._modules_for_user(current_user) if sections & {"modules", "checklist"} else []
+        if "modules" in sections:
+            with_time = fieldsets["lesson"] is None or "time_spent_seconds" in fieldsets["lesson"]
+            result.modules = self._modules_with_lessons(modules, current_user.id, "lessons" in sections, with_time)
+            module_spec: dict = {"module": fieldsets["module"] or True}
+            if "lessons" in sections:
+                module_spec["lessons"] = {"__all__": fieldsets["lesson"] or True}
+            spec["modules"] = {"__all__": module_spec}
+        if "checklist" in sections:
+            # la seccion ya viene con el modulo (joinedload): sin consultas extra
+            linked = {}
+            for module in modules:
+                if module.section and module.section.id not in linked:
+                    linked[module.section.id] = ChecklistSectionOut(
+                        id=module.section.id,
+                        title=module.section.title,
+                        items_completed=module.section.items_completed,
+                        items_total=module.section.items_total,
+                        percentage=module.section.percentage,
+                        status=module.section.status,
+                        checklist_module_id=module.id,
+                    )
+            result.checklist = list(linked.values())
+            spec["checklist"] = {"__all__": fieldsets["checklist"] or True}
+        return result, spec
+
     def complete_lesson(self, lesson_id: int, current_user: User, completed: bool) -> Tuple[UserLessonProgress, Module]:
-        lesson = self.db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        lesson = self.db.query(Lesson).options(joinedload(Lesson.module)).filter(Lesson.id == lesson_id).first()
         if not lesson:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leccion no encontrada")
 
@@ -89,10 +183,39 @@ class TrainingService:
 
         progress.completed = completed
         progress.completed_at = datetime.utcnow() if completed else None
+        module = lesson.module
+        log_event(
+            self.db,
+            "lesson_completed" if completed else "lesson_uncompleted",
+            current_user.id,
+            module_id=lesson.module_id,
+            lesson_id=lesson_id,
+        )
+        publish(self.db, *progress_keys(lesson.module_id, [current_user.id]))
         self.db.commit()
         self.db.refresh(progress)
-        self.db.refresh(lesson)
-        return progress, lesson.module
+        return progress, module
+
+    def record_heartbeat(self, lesson_id: int, claims: dict) -> None:
+        """Credits time on task from the token claims; only the first heartbeat per (user, lesson) queries."""
+        user_id = int(claims["sub"])
+        aggregator = get_aggregator()
+        key = (user_id, lesson_id)
+        if not aggregator.is_allowed(key):
+            row = self.db.query(Lesson.module_id).filter(Lesson.id == lesson_id).first()
+            if not row:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leccion no encontrada")
+            if not FULL_ACCESS_ROLES.intersection(claims.get("roles") or []):
+                self._ensure_assigned(row.module_id, user_id)
+            aggregator.allow(key)
+        aggregator.record(user_id, lesson_id)
+
+    def lesson_media(self, lesson_id: int, asset: str, current_user: User) -> Tuple[Path, os.stat_result]:
+        row = self.db.query(Lesson.module_id).filter(Lesson.id == lesson_id).first()
+        if not row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leccion no encontrada")
+        self._ensure_module_access(row.module_id, current_user)
+        return resolve_asset(lesson_id, asset)
 
     def get_quiz(self, module_id: int, current_user: User) -> QuizOut:
         module = self._get_module(module_id)
@@ -100,6 +223,7 @@ class TrainingService:
 
         questions = (
             self.db.query(QuizQuestion)
+            .options(selectinload(QuizQuestion.options))
             .filter(QuizQuestion.module_id == module_id)
             .order_by(QuizQuestion.display_order, QuizQuestion.id)
             .all()
@@ -155,8 +279,21 @@ class TrainingService:
             passed=passed,
         )
         self.db.add(attempt)
+        log_event(
+            self.db,
+            "quiz_submitted",
+            current_user.id,
+            module_id=module_id,
+            score=score,
+            correct_answers=correct,
+            total_questions=total,
+            passed=passed,
+        )
+        publish(self.db, *progress_keys(module_id, [current_user.id]))
         self.db.commit()
         self.db.refresh(attempt)
+        if passed:
+            certificate_pool.schedule(module_id, current_user.id)
 
         return QuizResult(
             module_id=module_id,
@@ -178,9 +315,12 @@ class TrainingService:
             owner_id=current_user.id,
         )
         self.db.add(module)
+        publish(self.db, SEARCH_KEY)
+        if module.checklist_section_id:
+            publish(self.db, "checklist")
         self.db.commit()
-        self.db.refresh(module)
-        return self._build_module_out(module, current_user.id)
+        module = self._get_module(module.id)
+        return self._build_module_out(module, self._module_progress(module.id, current_user.id))
 
     def update_module(self, module_id: int, payload: ModuleUpdateRequest, current_user: User) -> ModuleOut:
         module = self._get_module(module_id)
@@ -193,14 +333,24 @@ class TrainingService:
         module.due_to_checklist = payload.due_to_checklist
         module.checklist_section_id = payload.checklist_section_id
         module.quiz_required = payload.quiz_required
+        publish(self.db, "checklist", f"quiz:{module_id}", SEARCH_KEY)
         self.db.commit()
-        self.db.refresh(module)
-        return self._build_module_out(module, current_user.id)
+        module = self._get_module(module_id)
+        return self._build_module_out(module, self._module_progress(module_id, current_user.id))
 
     def delete_module(self, module_id: int, current_user: User) -> None:
         module = self._get_module(module_id)
         self._ensure_can_manage_module(module, current_user)
-        self.db.delete(module)
+        # borrado por lotes en lugar de la cascada del ORM, que carga cada coleccion
+        lesson_ids = self.db.query(Lesson.id).filter(Lesson.module_id == module_id).scalar_subquery()
+        question_ids = self.db.query(QuizQuestion.id).filter(QuizQuestion.module_id == module_id).scalar_subquery()
+        self.db.query(UserLessonProgress).filter(UserLessonProgress.lesson_id.in_(lesson_ids)).delete(synchronize_session=False)
+        self.db.query(LessonTimeOnTask).filter(LessonTimeOnTask.lesson_id.in_(lesson_ids)).delete(synchronize_session=False)
+        self.db.query(QuizOption).filter(QuizOption.question_id.in_(question_ids)).delete(synchronize_session=False)
+        for model in (Lesson, QuizQuestion, QuizAttempt, QuizAttemptSummary, ModuleAssignment):
+            self.db.query(model).filter(model.module_id == module_id).delete(synchronize_session=False)
+        self.db.query(Module).filter(Module.id == module_id).delete(synchronize_session=False)
+        publish(self.db, "checklist", f"quiz:{module_id}", SEARCH_KEY)
         self.db.commit()
 
     def assign_module(self, module_id: int, payload: ModuleAssignmentRequest, current_user: User) -> ModuleAssignmentOut:
@@ -208,6 +358,8 @@ class TrainingService:
         user_ids = set(payload.user_ids)
         if not user_ids:
             self.db.query(ModuleAssignment).filter(ModuleAssignment.module_id == module_id).delete()
+            publish(self.db, f"quiz:{module_id}", *progress_keys(module_id))
+            log_event(self.db, "module_assigned", current_user.id, module_id=module_id, cleared=True)
             self.db.commit()
             return ModuleAssignmentOut(module_id=module_id, user_ids=[])
 
@@ -233,12 +385,21 @@ class TrainingService:
         for uid in to_add:
             self.db.add(ModuleAssignment(module_id=module_id, user_id=uid, assigned_by=current_user.id))
 
+        publish(self.db, f"quiz:{module_id}", *progress_keys(module_id, to_add | to_remove))
+        log_event(
+            self.db,
+            "module_assigned",
+            current_user.id,
+            module_id=module_id,
+            added=sorted(to_add),
+            removed=sorted(to_remove),
+        )
         self.db.commit()
         return ModuleAssignmentOut(module_id=module_id, user_ids=sorted(list(user_ids)))
 
-    def list_assignable_users(self) -> List[UserSummary]:
-        users = self.db.query(User).all()
-        return [
+    def list_assignable_users(self, page: PageParams | None = None) -> Page[UserSummary]:
+        users, next_cursor, total = paginate(self.db.query(User).options(selectinload(User.roles)), [User.id], page)
+        items = [
             UserSummary(
                 id=user.id,
                 name=user.name,
@@ -247,88 +408,319 @@ class TrainingService:
             )
             for user in users
         ]
+        return Page[UserSummary](items=items, next_cursor=next_cursor, total=total)
+
+    def certificate(self, module_id: int, current_user: User) -> Tuple[CertificateData, Path]:
+        """The caller's certificate; rendered inline if the background job has not written it yet."""
+        self._ensure_module_access(module_id, current_user)
+        records = self.certificate_records(module_id, [current_user.id])
+        if not records:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Certificado no disponible: el modulo no esta aprobado",
+            )
+        return records[0], ensure_rendered(records[0])
+
+    def crew_certificates(self, module_id: int, current_user: User) -> List[Tuple[str, Path]]:
+        """(file name, path) of every certificate of the module the caller may audit (progress report scope)."""
+        self._get_module(module_id)
+        user_ids = None
+        if not self._is_superadmin(current_user):
+            user_ids = [
+                user_id
+                for (user_id,) in self.db.query(ModuleAssignment.user_id).filter(
+                    ModuleAssignment.module_id == module_id, ModuleAssignment.assigned_by == current_user.id
+                )
+            ]
+        records = self.certificate_records(module_id, user_ids)
+        paths = certificate_pool.render_all(records)
+        return [(data.filename, path) for data, path in zip(records, paths)]
+
+    def certificate_records(self, module_id: int, user_ids: List[int] | None = None) -> List[CertificateData]:
+        """Certificate data of the users (all when None) that passed the module quiz, from their first pass."""
+        first_pass = select(QuizAttempt.user_id, func.min(QuizAttempt.created_at).label("passed_at")).where(
+            QuizAttempt.module_id == module_id, QuizAttempt.passed.is_(True)
+        )
+        archived = select(
+            QuizAttemptSummary.user_id,
+            QuizAttemptSummary.first_pass_score.label("score"),
+            QuizAttemptSummary.first_passed_at.label("passed_at"),
+        ).where(QuizAttemptSummary.module_id == module_id, QuizAttemptSummary.first_passed_at.is_not(None))
+        if user_ids is not None:
+            first_pass = first_pass.where(QuizAttempt.user_id.in_(user_ids))
+            archived = archived.where(QuizAttemptSummary.user_id.in_(user_ids))
+        first_pass = first_pass.group_by(QuizAttempt.user_id).subquery()
+        live = select(QuizAttempt.user_id, QuizAttempt.score, QuizAttempt.created_at.label("passed_at")).join(
+            first_pass,
+            and_(
+                QuizAttempt.user_id == first_pass.c.user_id,
+                QuizAttempt.module_id == module_id,
+                QuizAttempt.created_at == first_pass.c.passed_at,
+                QuizAttempt.passed.is_(True),
+            ),
+        )
+        # resumen y filas vivas se pueden solapar en el tiempo (archivado por lotes): gana el aprobado mas antiguo
+        passes = union_all(archived, live).subquery()
+        rows = (
+            self.db.query(User.id, User.name, Module.title, passes.c.score, passes.c.passed_at)
+            .join(passes, passes.c.user_id == User.id)
+            .join(Module, Module.id == module_id)
+            .order_by(User.id, passes.c.passed_at)
+            .all()
+        )
+        records: Dict[int, CertificateData] = {}
+        for user_id, name, title, score, passed_at in rows:
+            records.setdefault(user_id, CertificateData(user_id, name, module_id, title, score, passed_at))
+        return list(records.values())
 
     def module_progress_report(self, module_id: int, current_user: User) -> ModuleProgressOut:
+        return self.progress_report_for(module_id, current_user.id, self._is_superadmin(current_user))
+
+    def progress_report_for(self, module_id: int, viewer_id: int, sees_all: bool) -> ModuleProgressOut:
         module = self._get_module(module_id)
-        assignments_query = self.db.query(ModuleAssignment).filter(ModuleAssignment.module_id == module_id)
-        if not self._is_superadmin(current_user):
-            assignments_query = assignments_query.filter(ModuleAssignment.assigned_by == current_user.id)
+        assignments_query = self._assignments_query(module_id)
+        if not sees_all:
+            assignments_query = assignments_query.filter(ModuleAssignment.assigned_by == viewer_id)
         assignments = assignments_query.all()
+        progress_rows = [row for _, row in self._progress_rows(module_id, assignments)]
+        return ModuleProgressOut(module_id=module.id, module_title=module.title, users=progress_rows)
 
-        progress_rows: List[UserProgressOut] = []
-        for assignment in assignments:
-            lessons_total, lessons_completed, quiz_completed = self._module_progress(module_id, assignment.user_id)
-            latest_attempt = (
-                self.db.query(QuizAttempt)
-                .filter(QuizAttempt.module_id == module_id, QuizAttempt.user_id == assignment.user_id)
-                .order_by(QuizAttempt.created_at.desc())
-                .first()
-            )
-            progress_rows.append(
-                UserProgressOut(
-                    user=UserSummary(
-                        id=assignment.user.id,
-                        name=assignment.user.name,
-                        email=assignment.user.email,
-                        roles=[r.code for r in assignment.user.roles],
-                    ),
-                    completed_lessons=lessons_completed,
-                    total_lessons=lessons_total,
-                    quiz_completed=quiz_completed,
-                    last_score=latest_attempt.score if latest_attempt else None,
-                    last_attempt_at=latest_attempt.created_at if latest_attempt else None,
-                )
+    def progress_subscription(self, module_id: int, current_user: User) -> Subscription:
+        self._get_module(module_id)
+        if hub.connections() >= settings.LIVE_MAX_CONNECTIONS:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiadas conexiones de seguimiento en vivo, intente mas tarde",
             )
+        return Subscription(module_id, current_user.id, self._is_superadmin(current_user), settings.LIVE_QUEUE_SIZE)
 
-        return ModuleProgressOut(module_id=module.id, module_title=module.title, users=progress_rows)
+    def progress_deltas(self, module_id: int, user_ids: List[int]) -> Tuple[List[Tuple[int | None, UserProgressOut]], List[int]]:
+        """Current rows of `user_ids` as (assigned_by, row) plus the users no longer assigned (live stream)."""
+        assignments = self._assignments_query(module_id).filter(ModuleAssignment.user_id.in_(user_ids)).all()
+        assigned = {assignment.user_id for assignment in assignments}
+        return self._progress_rows(module_id, assignments), sorted(set(user_ids) - assigned)
 
     # -------------------------
     # Helpers
     # -------------------------
+    def _assignments_query(self, module_id: int):
+        return (
+            self.db.query(ModuleAssignment)
+            .options(joinedload(ModuleAssignment.user).selectinload(User.roles))
+            .filter(ModuleAssignment.module_id == module_id)
+        )
+
+    def _progress_rows(
+        self, module_id: int, assignments: List[ModuleAssignment]
+    ) -> List[Tuple[int | None, UserProgressOut]]:
+        user_ids = [assignment.user_id for assignment in assignments]
+        progress = self._progress_by_user(module_id, user_ids)
+        latest_attempts = self._latest_attempts(module_id, user_ids)
+        time_spent = self._time_by_user(module_id, user_ids)
+
+        rows: List[Tuple[int | None, UserProgressOut]] = []
+        for assignment in assignments:
+            lessons_total, lessons_completed, quiz_completed = progress[assignment.user_id]
+            last_score, last_attempt_at = latest_attempts.get(assignment.user_id, (None, None))
+            row = UserProgressOut(
+                user=UserSummary(
+                    id=assignment.user.id,
+                    name=assignment.user.name,
+                    email=assignment.user.email,
+                    roles=[r.code for r in assignment.user.roles],
+                ),
+                completed_lessons=lessons_completed,
+                total_lessons=lessons_total,
+                quiz_completed=quiz_completed,
+                last_score=last_score,
+                last_attempt_at=last_attempt_at,
+                time_spent_seconds=time_spent.get(assignment.user_id, 0),
+            )
+            rows.append((assignment.assigned_by, row))
+        return rows
+
     def _module_progress(self, module_id: int, user_id: int) -> Tuple[int, int, bool]:
-        lessons_total = (
-            self.db.query(Lesson).filter(Lesson.module_id == module_id).count()
+        return self._progress_by_module([module_id], user_id)[module_id]
+
+    def _progress_by_module(self, module_ids: List[int], user_id: int) -> Dict[int, Tuple[int, int, bool]]:
+        """(total, completed, quiz_completed) per module for one user, in three grouped queries."""
+        if not module_ids:
+            return {}
+        totals = dict(
+            self.db.query(Lesson.module_id, func.count(Lesson.id))
+            .filter(Lesson.module_id.in_(module_ids))
+            .group_by(Lesson.module_id)
+            .all()
         )
-        lessons_completed = (
-            self.db.query(UserLessonProgress)
-            .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
+        completed = dict(
+            self.db.query(Lesson.module_id, func.count(UserLessonProgress.id))
+            .join(UserLessonProgress, UserLessonProgress.lesson_id == Lesson.id)
             .filter(
-                Lesson.module_id == module_id,
+                Lesson.module_id.in_(module_ids),
                 UserLessonProgress.user_id == user_id,
                 UserLessonProgress.completed.is_(True),
             )
-            .count()
+            .group_by(Lesson.module_id)
+            .all()
+        )
+        passed = self._passed_modules(module_ids, user_id)
+        return {mid: (totals.get(mid, 0), completed.get(mid, 0), mid in passed) for mid in module_ids}
+
+    def _passed_modules(self, module_ids: List[int], user_id: int) -> Set[int]:
+        live = self.db.query(QuizAttempt.module_id).filter(
+            QuizAttempt.module_id.in_(module_ids),
+            QuizAttempt.user_id == user_id,
+            QuizAttempt.passed.is_(True),
         )
-        quiz_completed = self._quiz_completed(module_id, user_id)
-        return lessons_total, lessons_completed, quiz_completed
+        archived = self.db.query(QuizAttemptSummary.module_id).filter(
+            QuizAttemptSummary.module_id.in_(module_ids),
+            QuizAttemptSummary.user_id == user_id,
+            QuizAttemptSummary.first_passed_at.is_not(None),
+        )
+        return {module_id for (module_id,) in live.union(archived)}
 
-    def _quiz_completed(self, module_id: int, user_id: int) -> bool:
-        return (
-            self.db.query(QuizAttempt)
+    def _progress_by_user(self, module_id: int, user_ids: List[int]) -> Dict[int, Tuple[int, int, bool]]:
+        """(total, completed, quiz_completed) per user for one module, in three grouped queries."""
+        if not user_ids:
+            return {}
+        lessons_total = self.db.query(Lesson).filter(Lesson.module_id == module_id).count()
+        completed = dict(
+            self.db.query(UserLessonProgress.user_id, func.count(UserLessonProgress.id))
+            .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
             .filter(
-                QuizAttempt.module_id == module_id,
-                QuizAttempt.user_id == user_id,
-                QuizAttempt.passed.is_(True),
+                Lesson.module_id == module_id,
+                UserLessonProgress.user_id.in_(user_ids),
+                UserLessonProgress.completed.is_(True),
+            )
+            .group_by(UserLessonProgress.user_id)
+            .all()
+        )
+        live = self.db.query(QuizAttempt.user_id).filter(
+            QuizAttempt.module_id == module_id,
+            QuizAttempt.user_id.in_(user_ids),
+            QuizAttempt.passed.is_(True),
+        )
+        archived = self.db.query(QuizAttemptSummary.user_id).filter(
+            QuizAttemptSummary.module_id == module_id,
+            QuizAttemptSummary.user_id.in_(user_ids),
+            QuizAttemptSummary.first_passed_at.is_not(None),
+        )
+        passed = {user_id for (user_id,) in live.union(archived)}
+        return {uid: (lessons_total, completed.get(uid, 0), uid in passed) for uid in user_ids}
+
+    def _latest_attempts(self, module_id: int, user_ids: List[int]) -> Dict[int, Tuple[int, datetime]]:
+        """(score, created_at) of each user's latest attempt, from the summary when only archived ones remain."""
+        if not user_ids:
+            return {}
+        ranked = (
+            select(
+                QuizAttempt.user_id,
+                QuizAttempt.score,
+                QuizAttempt.created_at,
+                func.row_number()
+                .over(
+                    partition_by=QuizAttempt.user_id,
+                    order_by=(QuizAttempt.created_at.desc(), QuizAttempt.id.desc()),
+                )
+                .label("rn"),
+            )
+            .where(QuizAttempt.module_id == module_id, QuizAttempt.user_id.in_(user_ids))
+            .subquery()
+        )
+        live = select(ranked.c.user_id, ranked.c.score, ranked.c.created_at).where(ranked.c.rn == 1)
+        archived = select(
+            QuizAttemptSummary.user_id, QuizAttemptSummary.last_score, QuizAttemptSummary.last_attempt_at
+        ).where(QuizAttemptSummary.module_id == module_id, QuizAttemptSummary.user_id.in_(user_ids))
+        latest: Dict[int, Tuple[int, datetime]] = {}
+        for user_id, score, created_at in self.db.execute(union_all(live, archived)):
+            if user_id not in latest or created_at > latest[user_id][1]:
+                latest[user_id] = (score, created_at)
+        return latest
+
+    def _time_by_lesson(self, lesson_ids: List[int], user_id: int) -> Dict[int, int]:
+        """Stored seconds per lesson plus what this worker has not flushed yet."""
+        if not lesson_ids:
+            return {}
+        totals = dict(
+            self.db.query(LessonTimeOnTask.lesson_id, LessonTimeOnTask.seconds).filter(
+                LessonTimeOnTask.user_id == user_id,
+                LessonTimeOnTask.lesson_id.in_(lesson_ids),
             )
-            .count()
-            > 0
         )
+        for (_, lesson_id), seconds in get_aggregator().pending_seconds((user_id, lid) for lid in lesson_ids).items():
+            totals[lesson_id] = totals.get(lesson_id, 0) + seconds
+        return totals
+
+    def _time_by_user(self, module_id: int, user_ids: List[int]) -> Dict[int, int]:
+        """Stored seconds per user in the module (lags up to LESSON_HEARTBEAT_FLUSH_SECONDS)."""
+        if not user_ids:
+            return {}
+        rows = (
+            self.db.query(LessonTimeOnTask.user_id, func.sum(LessonTimeOnTask.seconds))
+            .join(Lesson, Lesson.id == LessonTimeOnTask.lesson_id)
+            .filter(Lesson.module_id == module_id, LessonTimeOnTask.user_id.in_(user_ids))
+            .group_by(LessonTimeOnTask.user_id)
+            .all()
+        )
+        return {user_id: int(seconds or 0) for user_id, seconds in rows}
+
+    def _quiz_completed(self, module_id: int, user_id: int) -> bool:
+        return module_id in self._passed_modules([module_id], user_id)
+
+    def _modules_with_lessons(
+        self, modules: List[Module], user_id: int, with_lessons: bool, with_time: bool
+    ) -> List[ModuleWithLessons]:
+        """Modules with progress (and lessons) for one user; constant query count."""
+        module_ids = [module.id for module in modules]
+        if not module_ids:
+            return []
+        if not with_lessons:
+            progress = self._progress_by_module(module_ids, user_id)
+            return [ModuleWithLessons(module=self._build_module_out(m, progress[m.id]), lessons=[]) for m in modules]
+
+        lessons = (
+            self.db.query(Lesson)
+            .filter(Lesson.module_id.in_(module_ids))
+            .order_by(Lesson.module_id, Lesson.display_order, Lesson.id)
+            .all()
+        )
+        lesson_ids = [lesson.id for lesson in lessons]
+        completed_ids = set()
+        if lesson_ids:
+            completed_ids = {
+                lesson_id
+                for (lesson_id,) in self.db.query(UserLessonProgress.lesson_id).filter(
+                    UserLessonProgress.user_id == user_id,
+                    UserLessonProgress.lesson_id.in_(lesson_ids),
+                    UserLessonProgress.completed.is_(True),
+                )
+            }
+        passed = self._passed_modules(module_ids, user_id)
+        time_spent = self._time_by_lesson(lesson_ids, user_id) if with_time else {}
+
+        by_module: Dict[int, List[LessonOut]] = defaultdict(list)
+        for lesson in lessons:
+            by_module[lesson.module_id].append(self._build_lesson_out(lesson, completed_ids, time_spent))
+        result = []
+        for module in modules:
+            lesson_list = by_module.get(module.id, [])
+            progress = (len(lesson_list), sum(1 for lesson in lesson_list if lesson.completed), module.id in passed)
+            result.append(ModuleWithLessons(module=self._build_module_out(module, progress), lessons=lesson_list))
+        return result
 
     def _modules_for_user(self, current_user: User) -> List[Module]:
+        return self._modules_query(current_user).order_by(Module.id).all()
+
+    def _modules_query(self, current_user: User):
+        query = self.db.query(Module).options(joinedload(Module.section))
         if self._has_full_access(current_user):
-            return self.db.query(Module).all()
-        assigned_ids = [
-            ma.module_id
-            for ma in self.db.query(ModuleAssignment).filter(ModuleAssignment.user_id == current_user.id)
-        ]
-        if not assigned_ids:
-            return []
-        return self.db.query(Module).filter(Module.id.in_(assigned_ids)).all()
+            return query
+        return query.join(ModuleAssignment, ModuleAssignment.module_id == Module.id).filter(
+            ModuleAssignment.user_id == current_user.id
+        )
 
-    def _build_module_out(self, module: Module, viewer_id: int, lessons_override: int | None = None) -> ModuleOut:
-        lessons_total, lessons_completed, quiz_completed = self._module_progress(module.id, viewer_id)
-        if lessons_override is not None:
-            lessons_total = lessons_override
+    def _build_module_out(self, module: Module, progress: Tuple[int, int, bool]) -> ModuleOut:
+        lessons_total, lessons_completed, quiz_completed = progress
         due_to_checklist = module.due_to_checklist
         if module.section and module.section.status == "deficiente":
             due_to_checklist = True
@@ -347,9 +739,19 @@ class TrainingService:
             owner_id=module.owner_id,
         )
 
+    def _build_lesson_out(self, lesson: Lesson, completed_ids: Set[int], time_spent: Dict[int, int]) -> LessonOut:
+        return LessonOut(
+            id=lesson.id,
+            title=lesson.title,
+            duration=lesson.duration,
+            type=lesson.type,
+            image=lesson.image,
+            completed=lesson.id in completed_ids,
+            time_spent_seconds=time_spent.get(lesson.id, 0),
+        )
+
     def _has_full_access(self, user: User) -> bool:
-        role_codes = {r.code for r in user.roles}
-        return "superadmin" in role_codes or "leader" in role_codes
+        return any(r.code in FULL_ACCESS_ROLES for r in user.roles)
 
     def _is_superadmin(self, user: User) -> bool:
         return any(r.code == "superadmin" for r in user.roles)
@@ -357,9 +759,12 @@ class TrainingService:
     def _ensure_module_access(self, module_id: int, user: User) -> None:
         if self._has_full_access(user):
             return
+        self._ensure_assigned(module_id, user.id)
+
+    def _ensure_assigned(self, module_id: int, user_id: int) -> None:
         assignment = (
             self.db.query(ModuleAssignment)
-            .filter(ModuleAssignment.module_id == module_id, ModuleAssignment.user_id == user.id)
+            .filter(ModuleAssignment.module_id == module_id, ModuleAssignment.user_id == user_id)
             .first()
         )
         if not assignment:
@@ -372,7 +777,7 @@ class TrainingService:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo el dueno puede modificar el modulo")
 
     def _get_module(self, module_id: int) -> Module:
-        module = self.db.query(Module).filter(Module.id == module_id).first()
+        module = self.db.query(Module).options(joinedload(Module.section)).filter(Module.id == module_id).first()
         if not module:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Modulo no encontrado")
         return module
@@ -0,0 +1,251 @@
+"""Production runner: preforked uvicorn workers sharing one listening socket.
+
+    python -m app.serve                       # workers sized from CPUs and the DB budget
+    python -m app.serve --workers 4 --port 8010 --max-requests 5000
+"""
+
+import argparse
+import glob
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from app.config.settings import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger("sst.serve")
+
+
+def available_cpus() -> int:
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - macOS/Windows
+        count = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota:
+        count = min(count, max(1, math.ceil(quota)))
+    return count
+
+
+def _cgroup_cpu_quota() -> float | None:
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as fh:  # cgroup v2
+            quota, period = fh.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="utf-8") as fh:  # cgroup v1
+            quota = int(fh.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="utf-8") as fh:
+            period = int(fh.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def db_connection_budget() -> int | None:
+    """Connections this service may open in total; None when unknown (no limit applied)."""
+    if settings.DB_CONNECTION_BUDGET is not None:
+        return settings.DB_CONNECTION_BUDGET
+    if not settings.DATABASE_URL.startswith("postgresql"):
+        return None
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    # conexion desechable antes del fork: NullPool no deja nada abierto en el padre
+    probe = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        with probe.connect() as connection:
+            max_connections = int(connection.execute(text("SHOW max_connections")).scalar())
+            reserved = int(connection.execute(text("SHOW superuser_reserved_connections")).scalar())
+    except Exception as exc:
+        logger.warning("No se pudo consultar max_connections: %s", exc)
+        return None
+    finally:
+        probe.dispose()
+    return max(0, max_connections - reserved - settings.DB_RESERVED_CONNECTIONS)
+
+
+def plan_workers() -> tuple[int, dict]:
+    # min(CPUs * SERVE_WORKERS_PER_CORE, presupuesto de conexiones // (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    cpus = available_cpus()
+    by_cpu = max(1, int(cpus * settings.SERVE_WORKERS_PER_CORE))
+    per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    budget = db_connection_budget()
+    by_db = max(1, budget // per_worker) if budget is not None else None
+    workers = min(by_cpu, by_db) if by_db is not None else by_cpu
+    return workers, {"cpus": cpus, "by_cpu": by_cpu, "db_budget": budget, "by_db": by_db}
+
+
+def clear_metrics_dir() -> None:
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics_*.json*")):
+        os.remove(path)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, args) -> None:
+    import uvicorn
+
+    class DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # /health/ready pasa a 503 mientras se drenan las conexiones abiertas
+            app.state.draining = True
+            super().handle_exit(sig, frame)
+
+    max_requests = None
+    if args.max_requests:
+        max_requests = args.max_requests + random.randint(0, max(0, args.max_requests_jitter))
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keepalive,
+        log_level=args.log_level,
+        proxy_headers=True,
+    )
+    DrainingServer(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Keeps `workers` forked children alive until SIGTERM/SIGINT."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, args):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.args = args
+        self.children: dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(self.app, self.sock, self.args)
+            except BaseException:
+                logger.exception("Worker %s termino con error", os.getpid())
+                code = 1
+            finally:
+                try:
+                    registry.flush()  # os._exit no ejecuta atexit
+                finally:
+                    os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Worker %s iniciado", pid)
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            self._reap(respawn=True)
+            time.sleep(0.2)
+
+        logger.info("Apagando %s workers (gracia %ss)", len(self.children), self.args.graceful_timeout)
+        for pid in list(self.children):
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning("Worker %s no termino a tiempo; SIGKILL", pid)
+            _signal(pid, signal.SIGKILL)
+            self._reap(respawn=False)
+        return 0
+
+    def _reap(self, respawn: bool) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info("Worker %s salio (codigo %s, %.0fs)", pid, code, time.monotonic() - started)
+            try:
+                registry.fold_exited(pid)
+            except OSError as exc:
+                logger.warning("No se pudieron acumular las metricas del worker %s: %s", pid, exc)
+            if respawn and not self.stopping:
+                if code != 0 and time.monotonic() - started < 1:
+                    time.sleep(1)  # evita un bucle de forks si el worker falla al arrancar
+                self.spawn()
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--max-requests", type=int, default=settings.SERVE_MAX_REQUESTS, help="0 desactiva el reciclado")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVE_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVE_GRACEFUL_TIMEOUT)
+    parser.add_argument("--keepalive", type=int, default=settings.SERVE_KEEPALIVE)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar el plan de workers")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    workers, plan = (args.workers, {"override": True}) if args.workers else plan_workers()
+    logger.info("Workers: %s %s", workers, plan)
+    if args.dry_run:
+        return 0
+
+    if not hasattr(os, "fork"):  # pragma: no cover - Windows: sin preload
+        import uvicorn
+
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers,
+                    limit_max_requests=args.max_requests or None, timeout_graceful_shutdown=args.graceful_timeout)
+        return 0
+
+    clear_metrics_dir()
+    sock = bind_socket(args.host, args.port)
+    from app.main import create_app
+
+    app = create_app()  # preload: los workers heredan rutas, esquemas y modelos ya importados
+    return Supervisor(app, sock, workers, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
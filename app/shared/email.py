@@ -1,10 +1,12 @@
-import smtplib
-from email.mime.text import MIMEText
 from app.config.settings import settings
 
 
 def send_email(recipient: str, subject: str, body: str) -> None:
     """Simple SMTP sender; replace config with your provider."""
+    # smtplib/email se cargan solo al enviar (arranque en frio del worker)
+    import smtplib
+    from email.mime.text import MIMEText
+
     message = MIMEText(body)
     message["Subject"] = subject
     message["From"] = settings.SMTP_FROM
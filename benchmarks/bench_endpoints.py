@@ -0,0 +1,342 @@
+"""Throughput and latency benchmark for the hot endpoints (in-process, PostgreSQL or SQLite).
+
+    python -m benchmarks.bench_endpoints --scale small
+    python -m benchmarks.bench_endpoints --scale medium --baseline benchmarks/results/base.json --threshold 0.15
+    python -m benchmarks.bench_endpoints --strict   # cada ruta con query_budget una vez, SQL_STRICT_MODE=true
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# rutas con presupuesto que --strict no puede llamar, con el motivo
+STRICT_SKIPPED = {
+    "GET /training/modules/{module_id}/progress/stream": "SSE sin fin: el transporte ASGI espera el cuerpo completo",
+}
+
+
+def resolve_database_url(url: str | None, require_postgres: bool) -> str:
+    if url:
+        from sqlalchemy import create_engine, text
+
+        try:
+            probe = create_engine(url)
+            with probe.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            probe.dispose()
+            return url
+        except Exception as exc:
+            if require_postgres:
+                raise SystemExit(f"No se pudo conectar a {url}: {exc}")
+            print(f"[bench] PostgreSQL no disponible ({exc.__class__.__name__}); usando SQLite", file=sys.stderr)
+    path = Path(tempfile.gettempdir()) / "sst_bench.sqlite3"
+    return f"sqlite:///{path}"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+    }
+
+
+async def run_scenario(client, scenario: dict, requests: int, concurrency: int, warmup: int) -> dict:
+    async def one() -> tuple[float, bool]:
+        started = time.perf_counter()
+        response = await client.request(
+            scenario["method"], scenario["path"], headers=scenario.get("headers"), json=scenario.get("json")
+        )
+        return (time.perf_counter() - started) * 1000, response.status_code < 400
+
+    for _ in range(warmup):
+        await one()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        async with semaphore:
+            elapsed, ok = await one()
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(app, spec, args) -> dict:
+    import httpx
+
+    from benchmarks.generate_dataset import ADMIN_EMAIL, DEFAULT_PASSWORD, WORKER_EMAIL, assigned_modules
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def token_for(email: str) -> dict:
+            response = await client.post("/auth/login", json={"email": email, "password": DEFAULT_PASSWORD})
+            response.raise_for_status()
+            return {"Authorization": f"Bearer {response.json()['tokens']['access_token']}"}
+
+        admin, worker = await token_for(ADMIN_EMAIL), await token_for(WORKER_EMAIL)
+        module_id = assigned_modules(2, spec)[0]
+        quiz = (await client.get(f"/training/modules/{module_id}/quiz", headers=worker)).json()
+        answers = [{"question_id": q["id"], "option_id": q["options"][0]["id"]} for q in quiz["questions"]]
+
+        scenarios = [
+            {"name": "login", "method": "POST", "path": "/auth/login",
+             "json": {"email": WORKER_EMAIL, "password": DEFAULT_PASSWORD}, "weight": 0.1},
+            {"name": "auth_me", "method": "GET", "path": "/auth/me", "headers": worker},
+            {"name": "list_modules", "method": "GET", "path": "/training/modules", "headers": worker},
+            {"name": "list_modules_full_access", "method": "GET", "path": "/training/modules", "headers": admin},
+            {"name": "module_lessons", "method": "GET", "path": f"/training/modules/{module_id}/lessons", "headers": worker},
+            {"name": "get_quiz", "method": "GET", "path": f"/training/modules/{module_id}/quiz", "headers": worker},
+            {"name": "submit_quiz", "method": "POST", "path": f"/training/modules/{module_id}/quiz/submit",
+             "headers": worker, "json": {"answers": answers}},
+            {"name": "module_progress_report", "method": "GET", "path": f"/training/modules/{module_id}/progress",
+             "headers": admin},
+            {"name": "checklist_list", "method": "GET", "path": "/checklist/", "headers": worker},
+        ]
+        selected = set(args.only or [])
+        results = {}
+        for scenario in scenarios:
+            if selected and scenario["name"] not in selected:
+                continue
+            requests = max(5, int(args.requests * scenario.get("weight", 1.0)))
+            results[scenario["name"]] = await run_scenario(client, scenario, requests, args.concurrency, args.warmup)
+            print(f"[bench] {scenario['name']:<26} {results[scenario['name']]}", file=sys.stderr)
+        return results
+
+
+def budgeted_routes(routes, prefix: str = "") -> set[str]:
+    """"METHOD /path" of every route declaring a query_budget dependency."""
+    found = set()
+    for route in routes:
+        included = getattr(route, "original_router", None)  # include_router() de FastAPI >= 0.140
+        if included is not None:
+            found |= budgeted_routes(included.routes, prefix + route.include_context.prefix)
+            continue
+        dependant = getattr(route, "dependant", None)
+        if dependant and any(hasattr(dep.call, "max_queries") for dep in dependant.dependencies):
+            path = re.sub(r"\{(\w+):\w+\}", r"{\1}", prefix + route.path)  # {asset:path} -> {asset}
+            found.update(f"{method} {path}" for method in route.methods - {"HEAD"})
+    return found
+
+
+async def run_strict(app, spec) -> list[str]:
+    """Calls each budgeted route once with SQL_STRICT_MODE on; returns the failures."""
+    import httpx
+
+    from app.core.exceptions import LazyLoadError, QueryBudgetExceeded
+    from benchmarks.generate_dataset import ADMIN_EMAIL, DEFAULT_PASSWORD, WORKER_EMAIL, assigned_modules, lessons_of
+
+    failures: list[str] = []
+    called: set[str] = set()
+    stamp = f"{time.time_ns()}"  # codigos/correos unicos aunque se use --skip-seed
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(method: str, template: str, headers: dict | None = None, **kwargs):
+            called.add(f"{method} {template.split('?')[0]}")
+            path = template.format(**kwargs.pop("path_params", {}))
+            try:
+                response = await client.request(method, path, headers=headers, **kwargs)
+            except (QueryBudgetExceeded, LazyLoadError) as exc:
+                failures.append(f"{method} {path}: {exc.__class__.__name__}: {exc}")
+                return None
+            if response.status_code >= 500:
+                failures.append(f"{method} {path}: HTTP {response.status_code}")
+            print(f"[strict] {method} {path} -> {response.status_code} {response.headers.get('Server-Timing', '')}",
+                  file=sys.stderr)
+            return response
+
+        async def login(email: str) -> dict:
+            response = await call("POST", "/auth/login", json={"email": email, "password": DEFAULT_PASSWORD})
+            response.raise_for_status()
+            return response.json()
+
+        admin_session, worker_session = await login(ADMIN_EMAIL), await login(WORKER_EMAIL)
+        admin = {"Authorization": f"Bearer {admin_session['tokens']['access_token']}"}
+        worker = {"Authorization": f"Bearer {worker_session['tokens']['access_token']}"}
+        module_id = assigned_modules(2, spec)[0]
+        lesson_id = lessons_of(module_id, spec)[0]
+        ids = {"module_id": module_id, "lesson_id": lesson_id, "section_id": 1, "user_id": spec.users}
+
+        await call("POST", "/auth/verify-otp", json={"pending_token": "invalido", "code": "000000"})
+        await call("POST", "/auth/refresh", json={"refresh_token": worker_session["tokens"]["refresh_token"]})
+        await call("GET", "/auth/me", worker)
+        await call("GET", "/auth/roles", admin)
+        await call("GET", "/auth/permissions", admin)
+        permission = f"strict.{stamp}"
+        await call("POST", "/auth/permissions", admin,
+                   json={"code": permission, "module": "strict", "action": stamp})
+        role = await call("POST", "/auth/roles", admin,
+                          json={"name": f"Strict {stamp}", "code": f"strict-{stamp}", "permission_codes": ["training.view"]})
+        role_id = role.json()["id"] if role is not None and role.status_code < 400 else 1
+        await call("PUT", "/auth/roles/{role_id}", admin, path_params={"role_id": role_id},
+                   json={"name": f"Strict {stamp}", "code": f"strict-{stamp}", "permission_codes": ["training.view"]})
+        await call("POST", "/auth/roles/{role_id}/permissions", admin, path_params={"role_id": role_id},
+                   json={"permission_codes": ["training.view", permission]})
+        await call("POST", "/auth/users/{user_id}/roles", admin, path_params=ids, json={"role_codes": ["worker"]})
+        await call("POST", "/auth/users/import", admin, json=[
+            {"email": f"strict-{stamp}@example.com", "name": "Strict", "password": DEFAULT_PASSWORD, "roles": ["worker"]},
+        ])
+
+        await call("GET", "/training/modules", worker)
+        await call("GET", "/training/me?include=user,modules,lessons,checklist", worker)
+        await call("GET", "/training/modules/{module_id}/lessons", worker, path_params=ids)
+        await call("POST", "/training/lessons/{lesson_id}/complete", worker, path_params=ids, json={"completed": True})
+        await call("GET", "/training/lessons/{lesson_id}/media/{asset}", worker,
+                   path_params={**ids, "asset": "strict.mp4"})
+        await call("POST", "/training/lessons/{lesson_id}/heartbeat", worker, path_params=ids)
+        quiz = await call("GET", "/training/modules/{module_id}/quiz", worker, path_params=ids)
+        questions = quiz.json()["questions"] if quiz is not None and quiz.status_code == 200 else []
+        answers = [{"question_id": q["id"], "option_id": q["options"][0]["id"]} for q in questions]
+        await call("POST", "/training/modules/{module_id}/quiz/submit", worker, path_params=ids,
+                   json={"answers": answers})
+        await call("GET", "/training/modules/{module_id}/certificate", worker, path_params=ids)
+        await call("GET", "/training/modules/{module_id}/certificates.zip", admin, path_params=ids)
+        await call("GET", "/training/modules/{module_id}/progress", admin, path_params=ids)
+        await call("GET", "/training/assignable-users", admin)
+        module = {"title": f"Strict {stamp}", "description": "strict", "icon": "shield", "color": "#000000",
+                  "quiz_required": False}
+        created = await call("POST", "/training/modules", admin, json=module)
+        new_id = created.json()["id"] if created is not None and created.status_code < 400 else module_id
+        await call("PUT", "/training/modules/{module_id}", admin, path_params={"module_id": new_id}, json=module)
+        await call("POST", "/training/modules/{module_id}/assign", admin, path_params={"module_id": new_id},
+                   json={"user_ids": [2, spec.users]})
+        await call("DELETE", "/training/modules/{module_id}", admin, path_params={"module_id": new_id})
+
+        await call("GET", "/checklist/", worker)
+        await call("GET", "/checklist/{section_id}", worker, path_params=ids)
+        await call("GET", "/search?q=seguridad", worker)
+
+    for route in sorted(budgeted_routes(app.routes) - called - set(STRICT_SKIPPED)):
+        failures.append(f"{route}: ruta con presupuesto sin llamar en --strict")
+    return failures
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns human readable regressions: p95 slower or throughput lower than threshold allows."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {result['throughput_rps']} rps")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errores {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    from benchmarks.generate_dataset import PRESETS, generate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--require-postgres", action="store_true")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones medidas por escenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="limitar a estos escenarios")
+    parser.add_argument("--skip-seed", action="store_true", help="reutilizar los datos ya cargados")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, help="resultado previo contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.15, help="regresion tolerada (0.15 = 15%%)")
+    parser.add_argument("--strict", action="store_true", help="llamar cada ruta con presupuesto en SQL_STRICT_MODE")
+    args = parser.parse_args(argv)
+
+    database_url = resolve_database_url(args.database_url, args.require_postgres)
+    # app.config.settings lee el entorno al importarse: configurar antes de importar app.*
+    os.environ["DATABASE_URL"] = database_url
+    if args.strict:
+        os.environ["SQL_STRICT_MODE"] = "true"
+    else:
+        os.environ.setdefault("SQL_STRICT_MODE", "false")
+
+    from app.config.database import get_engine
+
+    engine = get_engine()
+    spec = PRESETS[args.scale]
+    if not args.skip_seed:
+        started = time.perf_counter()
+        generate(engine, spec, log=lambda message: print(message, file=sys.stderr))
+        print(f"[bench] dataset '{args.scale}' cargado en {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    from app.main import app
+
+    if args.strict:
+        failures = asyncio.run(run_strict(app, spec))
+        for line in failures:
+            print(f"[strict] FALLO {line}", file=sys.stderr)
+        print(f"[strict] {len(budgeted_routes(app.routes))} rutas con presupuesto, {len(failures)} fallos", file=sys.stderr)
+        return 1 if failures else 0
+
+    scenarios = asyncio.run(run_all(app, spec, args))
+    result = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_revision": git_revision(),
+            "scale": args.scale,
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": scenarios,
+    }
+
+    output = args.output or RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}_{args.scale}_{engine.dialect.name}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"[bench] resultados en {output}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.threshold)
+        for line in regressions:
+            print(f"[bench] REGRESION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
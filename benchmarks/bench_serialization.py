@@ -0,0 +1,148 @@
+"""Serialization cost of the large list endpoints: FastAPI response_model vs trusted encoding.
+
+    python -m benchmarks.bench_serialization --scale medium --skip-seed
+    python -m benchmarks.bench_serialization --scale medium --end-to-end
+"""
+
+import argparse
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from benchmarks.bench_endpoints import RESULTS_DIR, resolve_database_url, summarize
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> dict:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def payloads(db, spec) -> dict:
+    from app.modules.auth.auth_service import AuthService
+    from app.modules.training.training_schema import ModuleOut, ModuleProgressOut
+    from app.modules.training.training_service import TrainingService
+    from benchmarks.generate_dataset import ADMIN_EMAIL, assigned_modules
+
+    admin = AuthService(db)._get_user_with_relations(email=ADMIN_EMAIL)
+    service = TrainingService(db)
+    module_id = assigned_modules(2, spec)[0]
+    return {
+        "list_modules": (list[ModuleOut], service.list_modules(admin).items),
+        "module_progress_report": (ModuleProgressOut, service.module_progress_report(module_id, admin)),
+    }
+
+
+def _dump(content):
+    return [item.model_dump() for item in content] if isinstance(content, list) else content.model_dump()
+
+
+def micro(db, spec, repeat: int) -> dict:
+    import orjson
+    from pydantic import TypeAdapter
+
+    from app.config.settings import settings
+    from app.core.responses import dumps
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    results = {}
+    for name, (response_model, content) in payloads(db, spec).items():
+        adapter = TypeAdapter(response_model)
+        fastapi_body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        body = dumps(content)
+        if json.loads(fastapi_body) != json.loads(body):
+            raise SystemExit(f"{name}: la salida directa no coincide con la de response_model")
+
+        entry = {
+            "bytes": len(body),
+            "fastapi": time_calls(lambda: adapter.dump_json(adapter.validate_python(content, from_attributes=True)), repeat),
+            "trusted": time_calls(lambda: dumps(content), repeat),
+            "orjson": time_calls(lambda: orjson.dumps(_dump(content)), repeat),
+            "gzip": time_calls(lambda: gzip.compress(body, settings.COMPRESSION_GZIP_LEVEL, mtime=0), repeat),
+            "gzip_bytes": len(gzip.compress(body, settings.COMPRESSION_GZIP_LEVEL, mtime=0)),
+        }
+        if brotli is not None:
+            entry["br"] = time_calls(lambda: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY), repeat)
+            entry["br_bytes"] = len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY))
+        speedup = entry["fastapi"]["mean_ms"] / entry["trusted"]["mean_ms"] if entry["trusted"]["mean_ms"] else 0.0
+        print(
+            f"[serial] {name:<24} {entry['bytes']:>9,} B  fastapi {entry['fastapi']['mean_ms']:.3f}ms  "
+            f"trusted {entry['trusted']['mean_ms']:.3f}ms  (x{speedup:.1f})  orjson {entry['orjson']['mean_ms']:.3f}ms  "
+            f"gzip {entry['gzip_bytes']:,} B en {entry['gzip']['mean_ms']:.3f}ms",
+            file=sys.stderr,
+        )
+        results[name] = entry
+    return results
+
+
+def end_to_end(args, database_url: str) -> dict:
+    results = {}
+    for flag in ("false", "true"):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as fh:
+            output = Path(fh.name)
+        env = {**os.environ, "FAST_SERIALIZATION": flag, "DATABASE_URL": database_url}
+        command = [
+            sys.executable, "-m", "benchmarks.bench_endpoints", "--scale", args.scale, "--skip-seed",
+            "--database-url", database_url, "--requests", str(args.requests),
+            "--only", "list_modules_full_access", "module_progress_report", "--output", str(output),
+        ]
+        subprocess.run(command, env=env, check=True)
+        results[f"fast_serialization={flag}"] = json.loads(output.read_text())["scenarios"]
+        output.unlink()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    from benchmarks.generate_dataset import PRESETS, generate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--repeat", type=int, default=200, help="repeticiones por medicion")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones por escenario en --end-to-end")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--end-to-end", action="store_true")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    database_url = resolve_database_url(args.database_url, require_postgres=False)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SQL_STRICT_MODE", "false")
+
+    from app.config.database import SessionLocal, engine
+
+    spec = PRESETS[args.scale]
+    if not args.skip_seed:
+        generate(engine, spec, log=lambda message: print(message, file=sys.stderr))
+
+    db = SessionLocal()
+    try:
+        result = {"scale": args.scale, "dialect": engine.dialect.name, "micro": micro(db, spec, args.repeat)}
+    finally:
+        db.close()
+    if args.end_to_end:
+        result["end_to_end"] = end_to_end(args, database_url)
+
+    output = args.output or RESULTS_DIR / f"serialization_{args.scale}_{engine.dialect.name}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"[serial] resultados en {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
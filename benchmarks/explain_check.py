@@ -0,0 +1,180 @@
+"""Query plan regression check for the service layer (PostgreSQL only).
+
+    python -m benchmarks.explain_check --database-url postgresql+psycopg2://... --preset medium
+    python -m benchmarks.explain_check --database-url ... --skip-seed --verbose
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Callable
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+@dataclass
+class Check:
+    name: str
+    run: Callable
+    # tablas que el metodo recorre completas a proposito (listados sin filtro)
+    allow_seq_scan: set = field(default_factory=set)
+
+
+def _checks() -> list[Check]:
+    from app.core.pagination import PageParams, encode_cursor
+    from app.modules.auth.auth_schema import RoleUpdateRequest
+    from app.modules.auth.auth_service import AuthService
+    from app.modules.checklist.checklist_service import ChecklistService
+    from app.modules.search.search_service import SearchService
+    from app.modules.training.training_service import TrainingService
+
+    return [
+        Check("AuthService.login_lookup", lambda db, ctx: AuthService(db)._get_user_with_relations(email=ctx["worker_email"])),
+        Check("AuthService.get_current_user", lambda db, ctx: AuthService(db)._get_user_with_relations(user_id=ctx["worker"].id)),
+        Check("AuthService.refresh_session", lambda db, ctx: AuthService(db).refresh_session("token-inexistente")),
+        Check("AuthService.list_roles", lambda db, ctx: AuthService(db).list_roles(), {"roles", "role_permissions", "permissions"}),
+        Check("AuthService.update_role", lambda db, ctx: AuthService(db).update_role(
+            ctx["role"].id, RoleUpdateRequest(name=ctx["role"].name, code=ctx["role"].code, permission_codes=ctx["role_permissions"])
+        )),
+        Check("TrainingService.list_modules", lambda db, ctx: TrainingService(db).list_modules(ctx["worker"])),
+        Check("TrainingService.list_modules(full)", lambda db, ctx: TrainingService(db).list_modules(ctx["admin"]), {"modules"}),
+        Check("TrainingService.list_modules(page)", lambda db, ctx: TrainingService(db).list_modules(
+            ctx["admin"], PageParams(limit=50, cursor=encode_cursor([ctx["module_id"]]))
+        )),
+        Check("TrainingService.list_assignable_users(page)", lambda db, ctx: TrainingService(db).list_assignable_users(
+            PageParams(limit=50, cursor=encode_cursor([ctx["worker"].id]))
+        )),
+        Check("TrainingService.module_lessons", lambda db, ctx: TrainingService(db).module_lessons(ctx["module_id"], ctx["worker"])),
+        Check("TrainingService.get_quiz", lambda db, ctx: TrainingService(db).get_quiz(ctx["module_id"], ctx["worker"])),
+        Check("TrainingService.submit_quiz", lambda db, ctx: TrainingService(db).submit_quiz(ctx["module_id"], ctx["worker"], [])),
+        Check("TrainingService.complete_lesson", lambda db, ctx: TrainingService(db).complete_lesson(ctx["lesson_id"], ctx["worker"], True)),
+        Check("TrainingService.module_progress_report", lambda db, ctx: TrainingService(db).module_progress_report(ctx["module_id"], ctx["admin"])),
+        Check("ChecklistService.list_sections", lambda db, ctx: ChecklistService(db).list_sections(), {"checklist_sections", "modules"}),
+        Check("ChecklistService.section_detail", lambda db, ctx: ChecklistService(db).section_detail(ctx["section_id"])),
+        Check("SearchService.search", lambda db, ctx: SearchService(db).search(ctx["worker"], "seguridad extintor")),
+        Check("SearchService.search(full)", lambda db, ctx: SearchService(db).search(ctx["admin"], "seguridad extintor")),
+    ]
+
+
+def _context(db, spec) -> dict:
+    from app.modules.auth.auth_service import AuthService
+    from app.modules.models import Lesson, Role
+    from benchmarks.generate_dataset import ADMIN_EMAIL, WORKER_EMAIL, assigned_modules
+
+    auth = AuthService(db)
+    module_id = assigned_modules(2, spec)[0]
+    role = db.query(Role).filter(Role.code == "supervisor").first()
+    return {
+        "admin": auth._get_user_with_relations(email=ADMIN_EMAIL),
+        "worker": auth._get_user_with_relations(email=WORKER_EMAIL),
+        "worker_email": WORKER_EMAIL,
+        "module_id": module_id,
+        "lesson_id": db.query(Lesson.id).filter(Lesson.module_id == module_id).order_by(Lesson.id).first()[0],
+        "section_id": 1,
+        "role": role,
+        "role_permissions": [p.code for p in role.permissions],
+    }
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def explain(raw_connection, statement: str, parameters) -> dict:
+    with raw_connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        return cursor.fetchone()[0][0]["Plan"]
+
+
+def run_checks(engine, spec, min_rows: int, verbose: bool = False) -> list[str]:
+    from fastapi import HTTPException
+    from sqlalchemy import text
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.instrumentation import capture_statements
+
+    with engine.connect() as conn:
+        large = {
+            name
+            for name, rows in conn.execute(
+                text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p') AND relnamespace = 'public'::regnamespace")
+            )
+            if rows >= min_rows
+        }
+    print(f"[explain] tablas grandes (>= {min_rows:,} filas): {', '.join(sorted(large)) or '-'}", file=sys.stderr)
+
+    Session = sessionmaker(bind=engine, autoflush=False)
+    violations: list[str] = []
+    raw = engine.raw_connection()
+    try:
+        for check in _checks():
+            db = Session()
+            try:
+                ctx = _context(db, spec)
+                with capture_statements() as captured:
+                    try:
+                        check.run(db, ctx)
+                    except HTTPException:
+                        pass
+            finally:
+                db.rollback()
+                db.close()
+
+            for statement, parameters in captured.statements:
+                if not statement.lstrip().upper().startswith(EXPLAINABLE) or isinstance(parameters, list):
+                    continue
+                plan = explain(raw, statement, parameters)
+                raw.rollback()
+                scans = [t for t in _seq_scans(plan) if t in large and t not in check.allow_seq_scan]
+                if verbose:
+                    print(f"[explain] {check.name}: cost={plan['Total Cost']} {' '.join(statement.split())[:160]}", file=sys.stderr)
+                for table in scans:
+                    violations.append(f"{check.name}: Seq Scan sobre {table} en: {' '.join(statement.split())[:240]}")
+    finally:
+        raw.close()
+    return violations
+
+
+def main(argv: list[str] | None = None) -> int:
+    from benchmarks.generate_dataset import PRESETS, generate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required=False)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--min-rows", type=int, default=10_000)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--json", action="store_true", help="imprimir las violaciones como JSON")
+    args = parser.parse_args(argv)
+
+    if not args.database_url or not args.database_url.startswith("postgresql"):
+        parser.error("se requiere una base PostgreSQL (--database-url o BENCH_DATABASE_URL)")
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SQL_STRICT_MODE", "false")
+
+    from app.config.database import get_engine
+
+    engine = get_engine()
+
+    spec = PRESETS[args.preset]
+    if not args.skip_seed:
+        generate(engine, spec, log=lambda message: print(message, file=sys.stderr))
+
+    violations = run_checks(engine, spec, args.min_rows, args.verbose)
+    if args.json:
+        print(json.dumps(violations, indent=2))
+    for line in violations:
+        print(f"[explain] VIOLACION {line}", file=sys.stderr)
+    print(f"[explain] {len(violations)} violaciones", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
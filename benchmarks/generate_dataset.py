@@ -0,0 +1,370 @@
+"""Deterministic synthetic dataset at production-like scale.
+
+    python -m benchmarks.generate_dataset --preset xl --database-url postgresql+psycopg2://...
+    python -m benchmarks.generate_dataset --users 50000 --modules 500 --lessons 10000 --reset
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import create_engine, insert, text
+
+ADMIN_EMAIL = "bench-admin@example.com"
+WORKER_EMAIL = "bench-worker@example.com"
+DEFAULT_PASSWORD = "Bench12345"
+CHUNK_ROWS = 50_000
+
+# Codigos RBAC de seed_data() mas los que usa el codigo (superadmin/leader, training.manage/assign/monitor)
+PERMISSIONS = [
+    ("training.view", "training", "view", "Ver modulos y lecciones"),
+    ("training.complete", "training", "complete", "Marcar lecciones como completadas"),
+    ("training.quiz", "training", "quiz", "Presentar y enviar quiz"),
+    ("checklist.view", "checklist", "view", "Consultar checklist"),
+    ("roles.manage", "admin", "manage_roles", "CRUD roles y permisos"),
+    ("users.manage", "admin", "manage_users", "Asignar roles a usuarios"),
+    ("training.manage", "training", "manage", "Crear y editar modulos"),
+    ("training.assign", "training", "assign", "Asignar modulos a usuarios"),
+    ("training.monitor", "training", "monitor", "Ver avance de los asignados"),
+]
+ROLES = [
+    ("admin", "Administrador", ["training.view", "training.complete", "training.quiz", "checklist.view", "roles.manage", "users.manage"]),
+    ("supervisor", "Supervisor SST", ["training.view", "training.complete", "training.quiz", "checklist.view"]),
+    ("worker", "Colaborador", ["training.view", "training.complete", "training.quiz"]),
+    ("superadmin", "Superadministrador", [code for code, *_ in PERMISSIONS]),
+    ("leader", "Lider SST", ["training.view", "training.manage", "training.assign", "training.monitor", "checklist.view"]),
+]
+# reparto de roles para los usuarios generados (el resto son worker)
+ROLE_MIX = [("leader", 0.01), ("supervisor", 0.03), ("admin", 0.001)]
+LESSON_TYPES = ["video", "document", "interactive"]
+SECTION_STATUSES = ["pendiente", "deficiente", "aprobado"]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    users: int = 1000
+    modules: int = 20
+    lessons: int = 200
+    questions_per_module: int = 8
+    options_per_question: int = 4
+    sections: int = 20
+    items_per_section: int = 50
+    assignments_per_user: int = 5
+    completion_ratio: float = 0.6
+    attempts_per_assignment: int = 2
+    seed: int = 42
+
+
+PRESETS = {
+    "small": DatasetSpec(users=200, modules=10, lessons=80, sections=10, items_per_section=20),
+    "medium": DatasetSpec(users=5000, modules=100, lessons=2000, sections=100, items_per_section=200, assignments_per_user=8),
+    "xl": DatasetSpec(
+        users=50000, modules=500, lessons=10000, questions_per_module=10, sections=500, items_per_section=2000,
+        assignments_per_user=10, attempts_per_assignment=3,
+    ),
+}
+
+
+def assigned_modules(user_id: int, spec: DatasetSpec) -> list[int]:
+    return sorted({((user_id * 7 + k) % spec.modules) + 1 for k in range(spec.assignments_per_user)})
+
+
+def lessons_of(module_id: int, spec: DatasetSpec) -> range:
+    """Lesson ids are contiguous per module so they can be derived without lookups."""
+    per_module, extra = divmod(spec.lessons, spec.modules)
+    start = (module_id - 1) * per_module + min(module_id - 1, extra) + 1
+    return range(start, start + per_module + (1 if module_id <= extra else 0))
+
+
+# -------------------------
+# Row streams (columns, rows)
+# -------------------------
+def _permissions(spec):
+    return ("id", "code", "module", "action", "description"), (
+        (i, code, module, action, desc) for i, (code, module, action, desc) in enumerate(PERMISSIONS, start=1)
+    )
+
+
+def _roles(spec):
+    return ("id", "code", "name", "description"), (
+        (i, code, name, None) for i, (code, name, _) in enumerate(ROLES, start=1)
+    )
+
+
+def _role_permissions(spec):
+    perm_ids = {code: i for i, (code, *_) in enumerate(PERMISSIONS, start=1)}
+    return ("role_id", "permission_id"), (
+        (role_id, perm_ids[code]) for role_id, (_, _, codes) in enumerate(ROLES, start=1) for code in codes
+    )
+
+
+def _user_role_code(user_id: int, rng: random.Random) -> str:
+    if user_id == 1:
+        return "superadmin"
+    if user_id == 2:
+        # supervisor: permisos de training.* y checklist.view, sin acceso total a modulos
+        return "supervisor"
+    roll = rng.random()
+    for code, share in ROLE_MIX:
+        if roll < share:
+            return code
+        roll -= share
+    return "worker"
+
+
+def _users(spec, hashed_password: str, now: datetime):
+    def rows():
+        for uid in range(1, spec.users + 1):
+            if uid == 1:
+                email, name, two_factor = ADMIN_EMAIL, "Bench Admin", False
+            elif uid == 2:
+                email, name, two_factor = WORKER_EMAIL, "Bench Worker", False
+            else:
+                email, name, two_factor = f"user{uid}@example.com", f"Usuario {uid}", True
+            yield uid, email, name, hashed_password, True, two_factor, None, now - timedelta(days=uid % 365)
+
+    return ("id", "email", "name", "hashed_password", "is_active", "two_factor_enabled", "last_login_at", "created_at"), rows()
+
+
+def _user_roles(spec):
+    rng = random.Random(spec.seed + 1)
+    role_ids = {code: i for i, (code, *_) in enumerate(ROLES, start=1)}
+    return ("user_id", "role_id"), ((uid, role_ids[_user_role_code(uid, rng)]) for uid in range(1, spec.users + 1))
+
+
+def _sections(spec):
+    rng = random.Random(spec.seed + 2)
+
+    def rows():
+        for sid in range(1, spec.sections + 1):
+            completed = rng.randint(0, spec.items_per_section)
+            pct = completed * 100 // spec.items_per_section if spec.items_per_section else 0
+            yield sid, f"Seccion {sid}", rng.choice(SECTION_STATUSES), completed, spec.items_per_section, pct
+
+    return ("id", "title", "status", "items_completed", "items_total", "percentage"), rows()
+
+
+def _items(spec):
+    rng = random.Random(spec.seed + 3)
+    return ("section_id", "text", "status"), (
+        (sid, f"Requisito {n} de la seccion {sid}: verificar registros y evidencias", rng.choice(["compliant", "non-compliant"]))
+        for sid in range(1, spec.sections + 1)
+        for n in range(1, spec.items_per_section + 1)
+    )
+
+
+def _modules(spec):
+    rng = random.Random(spec.seed + 4)
+    return ("id", "title", "description", "icon", "color", "due_to_checklist", "checklist_section_id", "quiz_required", "owner_id"), (
+        (
+            mid,
+            f"Modulo {mid}",
+            f"Capacitacion {mid} sobre seguridad y salud en el trabajo",
+            f"M{mid % 100}",
+            f"#{rng.randrange(0x1000000):06X}",
+            rng.random() < 0.2,
+            mid if mid <= spec.sections else None,
+            True,
+            1,
+        )
+        for mid in range(1, spec.modules + 1)
+    )
+
+
+def _lessons(spec):
+    rng = random.Random(spec.seed + 5)
+    return ("id", "module_id", "title", "duration", "type", "image", "display_order"), (
+        (lid, mid, f"Leccion {order} del modulo {mid}", f"{rng.randint(3, 25)} min", rng.choice(LESSON_TYPES), None, order)
+        for mid in range(1, spec.modules + 1)
+        for order, lid in enumerate(lessons_of(mid, spec), start=1)
+    )
+
+
+def _questions(spec):
+    return ("id", "module_id", "prompt", "display_order"), (
+        ((mid - 1) * spec.questions_per_module + order, mid, f"Pregunta {order} del modulo {mid}", order)
+        for mid in range(1, spec.modules + 1)
+        for order in range(1, spec.questions_per_module + 1)
+    )
+
+
+def _options(spec):
+    rng = random.Random(spec.seed + 6)
+    total_questions = spec.modules * spec.questions_per_module
+
+    def rows():
+        for qid in range(1, total_questions + 1):
+            correct = rng.randrange(spec.options_per_question)
+            for n in range(spec.options_per_question):
+                yield qid, f"Opcion {n + 1}", n == correct
+
+    return ("question_id", "text", "is_correct"), rows()
+
+
+def _assignments(spec, now):
+    return ("module_id", "user_id", "assigned_by", "assigned_at"), (
+        (mid, uid, 1, now - timedelta(days=(uid + mid) % 90))
+        for uid in range(1, spec.users + 1)
+        for mid in assigned_modules(uid, spec)
+    )
+
+
+def _progress(spec, now):
+    rng = random.Random(spec.seed + 7)
+
+    def rows():
+        for uid in range(1, spec.users + 1):
+            for mid in assigned_modules(uid, spec):
+                lesson_ids = lessons_of(mid, spec)
+                done = int(len(lesson_ids) * spec.completion_ratio * rng.random() * 2)
+                for lid in lesson_ids[: min(done, len(lesson_ids))]:
+                    yield uid, lid, True, now - timedelta(minutes=rng.randrange(60 * 24 * 180))
+
+    return ("user_id", "lesson_id", "completed", "completed_at"), rows()
+
+
+def _attempts(spec, now):
+    rng = random.Random(spec.seed + 8)
+    total = spec.questions_per_module
+
+    def rows():
+        # ids explicitos: la PK (id, created_at) no es autoincremental en SQLite
+        attempt_id = 0
+        for uid in range(1, spec.users + 1):
+            for mid in assigned_modules(uid, spec):
+                for _ in range(rng.randint(0, spec.attempts_per_assignment)):
+                    correct = rng.randint(0, total)
+                    score = correct * 100 // total if total else 0
+                    attempt_id += 1
+                    created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 365))
+                    yield attempt_id, uid, mid, score, correct, total, score >= 80, created_at
+
+    return ("id", "user_id", "module_id", "score", "correct_answers", "total_questions", "passed", "created_at"), rows()
+
+
+def table_streams(spec: DatasetSpec, hashed_password: str) -> list[tuple[str, Callable[[], tuple]]]:
+    now = datetime.utcnow().replace(microsecond=0)
+    return [
+        ("permissions", lambda: _permissions(spec)),
+        ("roles", lambda: _roles(spec)),
+        ("role_permissions", lambda: _role_permissions(spec)),
+        ("users", lambda: _users(spec, hashed_password, now)),
+        ("user_roles", lambda: _user_roles(spec)),
+        ("checklist_sections", lambda: _sections(spec)),
+        ("checklist_items", lambda: _items(spec)),
+        ("modules", lambda: _modules(spec)),
+        ("lessons", lambda: _lessons(spec)),
+        ("quiz_questions", lambda: _questions(spec)),
+        ("quiz_options", lambda: _options(spec)),
+        ("module_assignments", lambda: _assignments(spec, now)),
+        ("user_lesson_progress", lambda: _progress(spec, now)),
+        ("quiz_attempts", lambda: _attempts(spec, now)),
+    ]
+
+
+# -------------------------
+# Loaders
+# -------------------------
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    chunk: list[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_chunk(cursor, table: str, columns: Sequence[str], chunk: list[tuple]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in chunk:
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def load_table(conn, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    from app.config.database import Base
+
+    raw = conn.connection.dbapi_connection
+    use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+    total = 0
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        if use_copy:
+            with raw.cursor() as cursor:
+                _copy_chunk(cursor, table, columns, chunk)
+        else:
+            conn.execute(insert(Base.metadata.tables[table]), [dict(zip(columns, row)) for row in chunk])
+        total += len(chunk)
+    return total
+
+
+def _reset_sequences(conn) -> None:
+    tables = ("permissions", "roles", "users", "checklist_sections", "modules", "lessons", "quiz_questions", "quiz_attempts")
+    for table in tables:
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"))
+
+
+def generate(engine, spec: DatasetSpec, password: str = DEFAULT_PASSWORD, reset: bool = True, log=print) -> dict:
+    """Loads the dataset in one transaction and returns rows per table."""
+    from app.config.database import Base
+    from app.core.security import hash_password
+
+    import app.modules.models  # noqa: F401 - registra las tablas en Base.metadata
+
+    if reset:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+
+    hashed = hash_password(password)
+    counts = {}
+    with engine.begin() as conn:
+        for table, stream in table_streams(spec, hashed):
+            started = time.perf_counter()
+            columns, rows = stream()
+            counts[table] = load_table(conn, table, columns, rows)
+            log(f"[datagen] {table:<22} {counts[table]:>10,} filas en {time.perf_counter() - started:6.1f}s")
+        if conn.dialect.name == "postgresql":
+            _reset_sequences(conn)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--reset", action="store_true", help="drop_all/create_all antes de cargar")
+    for field, default in asdict(DatasetSpec()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=None)
+    args = parser.parse_args(argv)
+
+    overrides = {field: getattr(args, field) for field in asdict(DatasetSpec()) if getattr(args, field) is not None}
+    spec = replace(PRESETS[args.preset], **overrides)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    from app.config.settings import settings
+
+    engine = create_engine(settings.DATABASE_URL)
+    log = lambda message: print(message, file=sys.stderr)  # noqa: E731
+    log(f"[datagen] {engine.url.render_as_string(hide_password=True)} {spec}")
+    started = time.perf_counter()
+    counts = generate(engine, spec, password=args.password, reset=args.reset, log=log)
+    log(f"[datagen] {sum(counts.values()):,} filas en {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Import-time / cold-start budget check, measured with `python -X importtime`.
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --import-budget-ms 300 --create-budget-ms 1200 --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBES = {
+    "import": "import app.main",
+    "create_app": "import app.main; app.main.create_app()",
+}
+# modulos que solo deben cargarse al primer uso (driver, tokens, correo). El dialecto PostgreSQL no:
+# los modelos declaran opciones postgresql_* (particiones, indices parciales) y SQLAlchemy lo carga
+DEFERRED_MODULES = ("psycopg2", "jose", "smtplib", "email.mime")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(code: str) -> tuple[float, dict[str, int]]:
+    """(total ms, cumulative us per imported module) for one fresh interpreter."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    modules: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        _self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(cumulative_us)
+        if len(indent) == 1:
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget-ms", type=float, default=350.0)
+    parser.add_argument("--create-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="modulos app.* mas costosos a listar")
+    args = parser.parse_args(argv)
+
+    budgets = {"import": args.import_budget_ms, "create_app": args.create_budget_ms}
+    failures = []
+    for probe, code in PROBES.items():
+        runs = [measure(code) for _ in range(args.runs)]
+        total_ms, modules = min(runs, key=lambda run: run[0])
+        print(f"[import] {probe:<11} {total_ms:8.1f}ms (presupuesto {budgets[probe]:.0f}ms)", file=sys.stderr)
+        if total_ms > budgets[probe]:
+            failures.append(f"{probe}: {total_ms:.1f}ms > {budgets[probe]:.0f}ms")
+
+        if probe == "create_app":
+            own = sorted(((us, name) for name, us in modules.items() if name.startswith("app.")), reverse=True)
+            for us, name in own[: args.top]:
+                print(f"[import]     {us / 1000:8.1f}ms {name}", file=sys.stderr)
+            eager = [name for name in modules if name.startswith(DEFERRED_MODULES)]
+            if eager:
+                failures.append(f"create_app importa modulos diferidos: {', '.join(sorted(eager))}")
+
+    for line in failures:
+        print(f"[import] FALLO {line}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())